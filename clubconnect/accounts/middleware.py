@@ -1,5 +1,17 @@
-from django.utils import timezone
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
 from django.core.cache import cache
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+from dashboard import metrics
 from .models import User
 
 class UpdateLastSeenMiddleware:
@@ -17,4 +29,143 @@ class UpdateLastSeenMiddleware:
                 cache.set(cache_key, now, 60)
         
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the per-view latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current_request = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = []
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.sql_ms += duration
+            self.queries.append((sql, duration))
+
+    def top_queries(self, limit=5):
+        """Queries grouped by SQL text, most total time first, so N+1 patterns stand out"""
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, duration in self.queries:
+            grouped[sql][0] += 1
+            grouped[sql][1] += duration
+        return sorted(((sql, count, ms) for sql, (count, ms) in grouped.items()), key=lambda q: -q[2])[:limit]
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        request_metrics = _current_request.get()
+        if request_metrics is None:
+            return super().render(context, request)
+        # A view rendering one template inside another's tag would otherwise count twice
+        request_metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.template_depth -= 1
+            if request_metrics.template_depth == 0:
+                request_metrics.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, adding each template a view renders to the
+    request's template time. Included and extended templates render inside the
+    one the view asked for, so only that one is timed.
+    """
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class ViewHistogram:
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.queries = 0
+
+    def observe(self, total_ms, metrics):
+        self.count += 1
+        self.total_ms += total_ms
+        self.sql_ms += metrics.sql_ms
+        self.template_ms += metrics.template_ms
+        self.queries += len(metrics.queries)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if total_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+
+_view_histograms = defaultdict(ViewHistogram)
+_view_histograms_lock = threading.Lock()
+
+
+def view_histograms():
+    """A consistent copy of the per-view histograms collected by this process"""
+    with _view_histograms_lock:
+        return {view: dict(vars(histogram), buckets=list(histogram.buckets))
+                for view, histogram in _view_histograms.items()}
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = _current_request.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        with _view_histograms_lock:
+            _view_histograms[view].observe(total_ms, request_metrics)
+        metrics.record_request(
+            view, request.method, response.status_code, total_ms / 1000, len(request_metrics.queries),
+            request_metrics.sql_ms / 1000,
+        )
+
+        response['Server-Timing'] = (
+            f'sql;dur={request_metrics.sql_ms:.1f};desc="{len(request_metrics.queries)} queries", '
+            f'tpl;dur={request_metrics.template_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+
+        if total_ms >= self.slow_ms:
+            top = '\n'.join(
+                f'  {ms:8.1f} ms  x{count:<4} {sql[:300]}' for sql, count, ms in request_metrics.top_queries()
+            )
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms total, %d queries in %.0f ms, templates %.0f ms\n%s",
+                request.method, request.path, view, total_ms, len(request_metrics.queries), request_metrics.sql_ms,
+                request_metrics.template_ms, top,
+            )
+        return response
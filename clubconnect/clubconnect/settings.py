@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,9 +65,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'clubconnect.urls'
 
+# The Django backend, timing the templates each request renders for its
+# Server-Timing header (see accounts/middleware.py)
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'accounts.middleware.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -149,6 +155,66 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Unread counters, feeds, tag facets and live update events live in the
+# cache, so every process serving the site must share it. Set REDIS_URL
+# (e.g. redis://localhost:6379/0) whenever more than one process runs: web
+# workers, or web plus `manage.py run_tasks`. Without it each process keeps its
+# own in-memory cache, which is only right for a single runserver process.
+# The backends are Django's own, counting hits and misses for /metrics.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'dashboard.metrics.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'dashboard.metrics.LocMemCache',
+        }
+    }
+
+# Pub/sub backend behind the /live/ notification stream. LocalPubSub only
+# reaches tabs connected to the same process; CachePubSub goes through the
+# shared cache so every process sees every event. The stream is only served
+# under ASGI (clubconnect.asgi:application); under WSGI /live/ answers 204 and
+# pages poll the unread count endpoints instead.
+LIVE_UPDATES_BACKEND = 'dashboard.live.CachePubSub' if REDIS_URL else 'dashboard.live.LocalPubSub'
+
+# Requests slower than this are logged with their most expensive queries
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+# Each worker process writes its metric snapshots here and /metrics merges
+# them, so every worker on a host must share this directory.
+METRICS_DIR = Path(tempfile.gettempdir()) / 'clubconnect-metrics'
+
+# Snapshot of the search box autocomplete index, written by
+# `manage.py build_autocomplete_index` and loaded by every web process, so it
+# must be on a path they all share. See clubs/autocomplete.py.
+AUTOCOMPLETE_SNAPSHOT = Path(tempfile.gettempdir()) / 'clubconnect-autocomplete.pickle'
+
+# Addresses allowed to scrape /metrics without logging in as an admin
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# New activity from clubs with fewer approved members than this is pushed into
+# each follower's cached feed; bigger clubs are merged in when the feed is read.
+# See clubs/feed.py and the bench_feed command.
+FEED_FANOUT_MAX_MEMBERS = 500
+
+# Notifications and QR codes are background tasks (clubs/taskqueue.py), queued
+# for `manage.py run_tasks` workers. Workers need REDIS_URL too: tasks update
+# cached counters and publish live updates, which must reach the web processes.
+# TASK_QUEUE_EAGER=1 runs each task in-process after its request commits
+# instead, for tests and local development without a worker.
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER') == '1'
+
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -0,0 +1,145 @@
+"""
+Materialized activity timeline.
+
+Creating, editing or deleting an announcement, event or club post updates its
+``ActivityItem`` row (see clubs/signals.py), so a feed page is a single indexed
+query on that table instead of three queries merged and sorted in Python.
+
+Pages are keyset paginated on ``(created_at, id)``: the cursor handed to the
+client encodes the last item it has seen, and the next page starts strictly
+after it, so paging deep into the feed costs the same as the first page and
+items created meanwhile never shift or repeat entries.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.text import Truncator
+
+from .models import ActivityItem, Announcement, Club, ClubPost, Event, Membership
+
+SUMMARY_LENGTH = 300
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def announcement_fields(announcement):
+    return {'club_id': announcement.club_id, 'title': announcement.title, 'summary': announcement.content}
+
+
+def event_fields(event):
+    return {'club_id': event.club_id, 'title': event.title, 'summary': event.description,
+            'location': event.location, 'starts_at': event.start_time}
+
+
+def post_fields(post):
+    return {'club_id': post.club_id, 'title': post.title, 'summary': post.content}
+
+
+# item_type -> (model, function returning the row's fields, source fields that function reads)
+ACTIVITY_MODELS = {
+    'announcement': (Announcement, announcement_fields, {'club', 'club_id', 'title', 'content'}),
+    'event': (Event, event_fields, {'club', 'club_id', 'title', 'description', 'location', 'start_time'}),
+    'post': (ClubPost, post_fields, {'club', 'club_id', 'title', 'content'}),
+}
+
+
+def item_type_for(model):
+    for item_type, (activity_model, _, _) in ACTIVITY_MODELS.items():
+        if issubclass(model, activity_model):
+            return item_type
+    return None
+
+
+def build_item(item_type, instance):
+    fields = ACTIVITY_MODELS[item_type][1](instance)
+    fields['title'] = fields['title'][:200]
+    fields['summary'] = Truncator(fields['summary']).chars(SUMMARY_LENGTH)
+    return ActivityItem(item_type=item_type, object_id=instance.pk, created_at=instance.created_at, **fields)
+
+
+def record_activity(instance, update_fields=None):
+    """Create or refresh the instance's timeline row; returns ``(item, created)``, or None if untouched"""
+    item_type = item_type_for(type(instance))
+    if update_fields is not None and not set(update_fields) & ACTIVITY_MODELS[item_type][2]:
+        return None
+    item = build_item(item_type, instance)
+    return ActivityItem.objects.update_or_create(
+        item_type=item_type, object_id=instance.pk,
+        defaults={field: getattr(item, field) for field in
+                  ('club_id', 'title', 'summary', 'location', 'starts_at', 'created_at')},
+    )
+
+
+def remove_activity(instance):
+    ActivityItem.objects.filter(item_type=item_type_for(type(instance)), object_id=instance.pk).delete()
+
+
+def rebuild_activity(batch_size=2000):
+    """Replace every timeline row with one freshly built from its source row"""
+    ActivityItem.objects.all().delete()
+    total = 0
+    for item_type, (model, _, _) in ACTIVITY_MODELS.items():
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(build_item(item_type, instance))
+            if len(batch) >= batch_size:
+                ActivityItem.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        ActivityItem.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def encode_cursor(item):
+    return f'{(item.created_at - EPOCH) // timedelta(microseconds=1)}.{item.pk}'
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor; raises ValueError for anything malformed"""
+    micros, _, pk = cursor.partition('.')
+    pk = int(pk)
+    if not 0 < pk < 2 ** 63:
+        # Past a BIGINT the database driver itself raises OverflowError
+        raise ValueError(f"Cursor id out of range: {pk}")
+    try:
+        return EPOCH + timedelta(microseconds=int(micros)), pk
+    except OverflowError as error:
+        raise ValueError(f"Cursor time out of range: {micros}") from error
+
+
+def followed_club_ids(user):
+    """Clubs whose activity belongs in the user's personal feed: approved memberships and favorites"""
+    member_of = Membership.objects.filter(user=user, status='approved').values_list('club_id', flat=True)
+    favorites = Club.favorited_by.through.objects.filter(user=user).values_list('club_id', flat=True)
+    return set(member_of.union(favorites))
+
+
+def activity_page(club_ids=None, cursor=None, limit=20):
+    """
+    One page of the timeline, newest first, and the cursor for the next page
+    (None on the last page). ``club_ids`` limits the feed to those clubs plus
+    general announcements; None means everything.
+    """
+    items = ActivityItem.objects.select_related('club').order_by('-created_at', '-id')
+    if club_ids is not None:
+        items = items.filter(Q(club_id__in=club_ids) | Q(club__isnull=True))
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        items = items.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    page = list(items[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def serialize_item(item):
+    return {
+        'type': item.item_type,
+        'title': item.title,
+        'summary': item.summary,
+        'club': item.club.name if item.club else 'General',
+        'link': reverse('club_detail', args=[item.club_id]) if item.club_id else None,
+        'location': item.location,
+        'starts_at': item.starts_at.isoformat() if item.starts_at else None,
+        'created_at': item.created_at.isoformat(),
+    }
@@ -0,0 +1,278 @@
+"""
+In-memory prefix index behind the search box typeahead.
+
+Each process holds a sorted list of ``(term, kind, id)`` entries, one per word
+of a club, event or user name (plus club tags), and answers a prefix lookup
+with a bisect and a short scan. The index is never built inside a request:
+
+- ``manage.py build_autocomplete_index`` reads clubs, events and users once and
+  writes the sorted index to the ``AUTOCOMPLETE_SNAPSHOT`` file, stamped with
+  the journal version it was read at. Run it on deploy and at least daily
+  (more often than ``JOURNAL_TIMEOUT``); seed_load runs it too.
+- Processes load that snapshot on first use, which is one file read.
+- Saves and deletes append a change to a journal in the shared cache and bump
+  ``autocomplete_version``. Before each lookup a process compares that version
+  with the one it has applied and replays the entries it missed.
+- A process that can't replay (entries expired, counter reset, or more than
+  ``MAX_REPLAY`` behind) reloads the snapshot if a newer one was written, and
+  otherwise skips ahead and serves slightly stale suggestions until the next
+  one, logging a warning.
+
+The snapshot file must be readable by every web process (one host, or a
+shared volume), and the journal needs the shared cache (REDIS_URL).
+"""
+import logging
+import os
+import pickle
+import re
+import threading
+from bisect import bisect_left, insort
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from accounts.models import User
+from .models import Club, Event
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'autocomplete_version'
+JOURNAL_TIMEOUT = 60 * 60 * 24
+# Entries examined per lookup; bounds latency for very short prefixes
+MAX_SCAN = 500
+# A process further behind than this reloads the snapshot rather than replaying the journal
+MAX_REPLAY = 1000
+KINDS = ('club', 'event', 'user')
+
+
+def journal_key(version):
+    return f'autocomplete_journal_{version}'
+
+
+def terms_for(label, extra=''):
+    words = re.findall(r'\w+', f'{label} {extra}'.lower())
+    terms = set(words)
+    # The whole name too, so "robotics cl" still matches "Robotics Club"
+    full = ' '.join(re.findall(r'\w+', label.lower()))
+    if full:
+        terms.add(full)
+    return sorted(terms)
+
+
+def club_entry(club):
+    return {
+        'kind': 'club', 'id': club.pk, 'label': club.name,
+        'terms': terms_for(club.name, club.domain_tags.replace(',', ' ')),
+    }
+
+
+def event_entry(event):
+    return {'kind': 'event', 'id': event.pk, 'label': event.title, 'club_id': event.club_id,
+            'terms': terms_for(event.title)}
+
+
+def user_entry(user):
+    full_name = f'{user.first_name} {user.last_name}'.strip()
+    return {
+        'kind': 'user', 'id': user.pk, 'label': f'{user.username} ({full_name})' if full_name else user.username,
+        'username': user.username,
+        'terms': terms_for(user.username, full_name),
+    }
+
+
+def url_for(entry):
+    if entry['kind'] == 'club':
+        return reverse('club_detail', args=[entry['id']])
+    if entry['kind'] == 'event':
+        return reverse('club_detail', args=[entry['club_id']])
+    return f"{reverse('search')}?{urlencode({'q': entry['username']})}"
+
+
+# Fields each entry is built from; saves touching none of them leave the index alone
+INDEXED_FIELDS = {
+    'club': {'name', 'domain_tags'},
+    'event': {'title', 'club', 'club_id'},
+    'user': {'username', 'first_name', 'last_name'},
+}
+
+
+def entry_for(instance):
+    if isinstance(instance, Club):
+        return club_entry(instance)
+    if isinstance(instance, Event):
+        return event_entry(instance)
+    return user_entry(instance)
+
+
+def kind_for(instance):
+    if isinstance(instance, Club):
+        return 'club'
+    if isinstance(instance, Event):
+        return 'event'
+    return 'user'
+
+
+def snapshot_path():
+    return Path(settings.AUTOCOMPLETE_SNAPSHOT)
+
+
+def build_snapshot():
+    """Write the full index to the snapshot file; returns the number of entries"""
+    # Read the version first: changes made while the tables are read are replayed on top
+    version = cache.get(VERSION_KEY, 0)
+    entries = {}
+    for club in Club.objects.only('id', 'name', 'domain_tags').iterator(chunk_size=2000):
+        entries[('club', club.pk)] = club_entry(club)
+    for event in Event.objects.only('id', 'title', 'club_id').iterator(chunk_size=2000):
+        entries[('event', event.pk)] = event_entry(event)
+    for user in User.objects.only('id', 'username', 'first_name', 'last_name').iterator(chunk_size=2000):
+        entries[('user', user.pk)] = user_entry(user)
+    keys = sorted((term, kind, pk) for (kind, pk), entry in entries.items() for term in entry['terms'])
+
+    path = snapshot_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed into place, so readers never see half a file
+    partial = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(partial, 'wb') as f:
+        pickle.dump({'version': version, 'entries': entries, 'keys': keys}, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(partial, path)
+    return len(entries)
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.entries = {}
+        self.version = None
+        self.snapshot_mtime = None
+
+    def _add(self, entry):
+        ref = (entry['kind'], entry['id'])
+        self._remove(ref)
+        self.entries[ref] = entry
+        for term in entry['terms']:
+            insort(self.keys, (term, entry['kind'], entry['id']))
+
+    def _remove(self, ref):
+        entry = self.entries.pop(ref, None)
+        if entry is None:
+            return
+        for term in entry['terms']:
+            key = (term, ref[0], ref[1])
+            i = bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    def _apply(self, change):
+        if change['op'] == 'delete':
+            self._remove((change['kind'], change['id']))
+        else:
+            self._add(change['entry'])
+
+    def load_snapshot(self):
+        """Load the snapshot file if it changed since we last loaded it; False if there was nothing new"""
+        try:
+            mtime = snapshot_path().stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.snapshot_mtime:
+            return False
+        with open(snapshot_path(), 'rb') as f:
+            snapshot = pickle.load(f)
+        with self.lock:
+            self.entries, self.keys = snapshot['entries'], snapshot['keys']
+            self.version, self.snapshot_mtime = snapshot['version'], mtime
+        return True
+
+    def replay(self, current):
+        """Apply the journal up to ``current``; False if we're too far behind or entries have expired"""
+        if current < self.version or current - self.version > MAX_REPLAY:
+            return False
+        wanted = [journal_key(v) for v in range(self.version + 1, current + 1)]
+        found = cache.get_many(wanted)
+        if len(found) < len(wanted):
+            return False
+        with self.lock:
+            for key in wanted:
+                self._apply(found[key])
+            self.version = current
+        return True
+
+    def sync(self):
+        """Bring the local index up to the shared version"""
+        if self.snapshot_mtime is None:
+            # Until a snapshot exists this is one stat per lookup
+            self.load_snapshot()
+        current = cache.get(VERSION_KEY, 0)
+        if self.version == current:
+            return
+        if self.version is not None and self.replay(current):
+            return
+        if self.load_snapshot() and (self.version == current or self.replay(current)):
+            return
+        if self.snapshot_mtime is None:
+            logger.warning("No autocomplete snapshot at %s; run build_autocomplete_index", snapshot_path())
+        else:
+            logger.warning("Autocomplete index can't catch up from version %s to %s; "
+                           "serving it as is until build_autocomplete_index runs", self.version, current)
+        self.version = current
+
+    def lookup(self, prefix, kinds=KINDS, limit=8):
+        prefix = ' '.join(re.findall(r'\w+', prefix.lower()))
+        if not prefix:
+            return []
+        self.sync()
+        matches = {}
+        with self.lock:
+            i = bisect_left(self.keys, (prefix,))
+            end = min(len(self.keys), i + MAX_SCAN)
+            while i < end and self.keys[i][0].startswith(prefix):
+                _, kind, pk = self.keys[i]
+                if kind in kinds and (kind, pk) not in matches:
+                    matches[(kind, pk)] = self.entries[(kind, pk)]
+                i += 1
+        # Names that start with the prefix first, then shorter names
+        ranked = sorted(
+            matches.values(),
+            key=lambda entry: (not entry['label'].lower().startswith(prefix), len(entry['label']), entry['label']),
+        )
+        return [
+            {'kind': entry['kind'], 'id': entry['id'], 'label': entry['label'], 'url': url_for(entry)}
+            for entry in ranked[:limit]
+        ]
+
+
+index = PrefixIndex()
+
+
+def _publish(change):
+    if cache.add(VERSION_KEY, 1, None):
+        version = 1
+    else:
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, None)
+            version = 1
+    cache.set(journal_key(version), change, JOURNAL_TIMEOUT)
+
+
+def record_save(instance, update_fields=None):
+    if update_fields is not None and not set(update_fields) & INDEXED_FIELDS[kind_for(instance)]:
+        return
+    change = {'op': 'upsert', 'entry': entry_for(instance)}
+    transaction.on_commit(lambda: _publish(change))
+
+
+def record_delete(instance):
+    change = {'op': 'delete', 'kind': kind_for(instance), 'id': instance.pk}
+    transaction.on_commit(lambda: _publish(change))
+
+
+def autocomplete(prefix, kinds=KINDS, limit=8):
+    return index.lookup(prefix, kinds, limit)
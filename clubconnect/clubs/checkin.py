@@ -0,0 +1,223 @@
+"""
+Signed, expiring check-in tokens for event QR codes.
+
+A student's QR code encodes the scan URL with a token signed by
+``django.core.signing``. The token carries the event, club and user ids, an
+expiry (the event's end plus ``CHECKIN_GRACE``) and a nonce, so it can't be
+forged or reused for another event. The nonce is a keyed hash of the
+registration rather than random, and the token has no signing timestamp, so a
+registration always gets the same token and its QR image can be cached by
+content hash (see clubs/qr.py). Door staff are authorized the same way: opening the attendance
+page gives their browser a signed scanner credential for that event, kept in a
+cookie scoped to the event's URLs.
+
+Verifying a scan is therefore pure HMAC work. The only database access on the
+happy path is the check-in itself, a conditional UPDATE that matches only an
+attendance not yet checked in, so duplicate scans and simultaneous scanners
+can't double count. Counters and points are written only when that UPDATE wins.
+
+Scanners that lose connectivity queue scans locally and sync them in bursts
+through ``check_in_batch``: one transaction, one ``bulk_update`` of the
+attendances (guarded so rows another scanner got to first aren't counted
+twice), one counter update and one batched ledger insert.
+"""
+import time
+from datetime import timedelta
+
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from .models import Club, Event, EventAttendance
+from .points import award_points, award_points_bulk
+
+# How long after an event ends its tokens still check students in
+CHECKIN_GRACE = timedelta(hours=2)
+# How long before an event starts a queued scan may be dated (doors open early, clocks drift)
+CHECKIN_OPENS = timedelta(hours=1)
+TOKEN_SALT = 'clubs.checkin.token'
+SCANNER_SALT = 'clubs.checkin.scanner'
+# How long past the tokens' expiry a door scanner may still sync scans it queued offline
+SCANNER_SYNC_WINDOW = timedelta(days=7)
+# Most scans one offline sync may carry
+SYNC_BATCH_LIMIT = 500
+
+
+class CheckinToken:
+    def __init__(self, event_id, club_id, user_id, username):
+        self.event_id = event_id
+        self.club_id = club_id
+        self.user_id = user_id
+        self.username = username
+
+
+def token_expiry(event):
+    return int((event.end_time + CHECKIN_GRACE).timestamp())
+
+
+def scanner_expiry(event):
+    return token_expiry(event) + int(SCANNER_SYNC_WINDOW.total_seconds())
+
+
+def token_nonce(event, user):
+    return salted_hmac(TOKEN_SALT, f'{event.pk}:{user.pk}').hexdigest()[:12]
+
+
+def checkin_token(event, user):
+    # The username rides along so the scanner can show who it was without a lookup
+    payload = {'e': event.pk, 'c': event.club_id, 'u': user.pk, 'm': user.username, 'x': token_expiry(event),
+               'n': token_nonce(event, user)}
+    return signing.Signer(salt=TOKEN_SALT).sign_object(payload, compress=True)
+
+
+def checkin_url(event, user, request=None):
+    path = reverse('scan_checkin', kwargs={'event_id': event.pk}) + '?token=' + checkin_token(event, user)
+    return request.build_absolute_uri(path) if request else path
+
+
+def load_signed(value, salt, at=None):
+    """The payload of a signed value; raises BadSignature, or SignatureExpired if past its expiry ``at`` (a timestamp)"""
+    payload = signing.Signer(salt=salt).unsign_object(value)
+    if not isinstance(payload, dict) or payload.get('x', 0) < (time.time() if at is None else at):
+        raise signing.SignatureExpired("Check-in credential expired")
+    return payload
+
+
+def read_checkin_token(token, event_id, scanned_at=None):
+    """The CheckinToken for ``event_id`` in ``token``; raises BadSignature if it's invalid, expired or for another event"""
+    payload = load_signed(token, TOKEN_SALT, at=scanned_at.timestamp() if scanned_at else None)
+    if payload.get('e') != event_id:
+        raise signing.BadSignature("Check-in token is for another event")
+    return CheckinToken(payload['e'], payload['c'], payload['u'], payload.get('m', ''))
+
+
+def scanner_cookie_name(event_id):
+    return f'checkin_scanner_{event_id}'
+
+
+def set_scanner_credential(request, response, event):
+    """Let the requesting user's browser scan tokens for ``event``; call only once they're known to be authorized"""
+    # Outlives the tokens so a scanner that comes back online late can still sync;
+    # each queued scan is still judged against its token's own expiry
+    credential = signing.Signer(salt=SCANNER_SALT).sign_object({'e': event.pk, 's': request.user.pk, 'x': scanner_expiry(event)})
+    # Scoped to /clubs/event/<id>/ so it's only sent with that event's requests
+    event_path = reverse('scan_checkin', kwargs={'event_id': event.pk}).rsplit('/', 2)[0] + '/'
+    response.set_cookie(
+        scanner_cookie_name(event.pk), credential, max_age=max(0, scanner_expiry(event) - int(time.time())),
+        path=event_path, secure=request.is_secure(), httponly=True, samesite='Lax',
+    )
+
+
+def scanner_id(request, event_id):
+    """Id of the staff member whose credential for ``event_id`` came with the request, or None"""
+    credential = request.COOKIES.get(scanner_cookie_name(event_id))
+    if not credential:
+        return None
+    try:
+        payload = load_signed(credential, SCANNER_SALT)
+    except signing.BadSignature:
+        return None
+    return payload['s'] if payload.get('e') == event_id else None
+
+
+def check_in(token, scanned_at=None):
+    """Check in the token's attendee; False if they were already checked in (or aren't registered)"""
+    with transaction.atomic():
+        checked_in = EventAttendance.objects.filter(
+            event_id=token.event_id, user_id=token.user_id, checked_in_via_qr=False
+        ).update(checked_in_via_qr=True, scanned_at=scanned_at or timezone.now())
+        if checked_in:
+            Event.objects.filter(pk=token.event_id).update(checked_in_count=F('checked_in_count') + 1)
+            award_points(User(pk=token.user_id), Club(pk=token.club_id), 'event_checkin', Event(pk=token.event_id))
+    return bool(checked_in)
+
+
+def scan_time(value, now):
+    """The scanner's timestamp for a queued scan, never later than ``now``; ``now`` if missing or unreadable"""
+    try:
+        scanned_at = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:
+        scanned_at = None
+    if scanned_at is None:
+        return now
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    return min(scanned_at, now)
+
+
+def check_in_batch(event, scans):
+    """
+    Check in a scanner's queued ``[{'id', 'token', 'scanned_at'}, ...]`` in one transaction.
+
+    Returns one ``{'id', 'status', 'username'}`` per scan, in order. Tokens are
+    judged at their scan time, so a queue synced after the event still counts
+    (the scanner credential allows syncing for ``SCANNER_SYNC_WINDOW`` after).
+    Scan times are the scanner's claim, so they're bounded on both sides: no
+    later than now, and no earlier than ``CHECKIN_OPENS`` before the event
+    starts; an earlier one is refused rather than letting a backdated scan
+    slip an expired token through.
+    """
+    now = timezone.now()
+    opens = event.start_time - CHECKIN_OPENS
+    results = []
+    pending = {}
+    for scan in scans:
+        scan = scan if isinstance(scan, dict) else {}
+        result = {'id': scan.get('id'), 'status': 'invalid', 'username': ''}
+        results.append(result)
+        scanned_at = scan_time(scan.get('scanned_at'), now)
+        if scanned_at < opens:
+            result['status'] = 'too_early'
+            continue
+        try:
+            token = read_checkin_token(str(scan.get('token', '')), event.pk, scanned_at)
+        except signing.SignatureExpired:
+            result['status'] = 'expired'
+            continue
+        except signing.BadSignature:
+            continue
+        result['username'] = token.username
+        if token.user_id in pending:
+            result['status'] = 'duplicate'
+            continue
+        # The first scan of a student in the queue is the one that counts
+        pending[token.user_id] = (result, scanned_at)
+
+    raced = False
+    with transaction.atomic():
+        attendances = list(
+            EventAttendance.objects.select_for_update()
+            .filter(event=event, user_id__in=pending).only('pk', 'user_id', 'checked_in_via_qr')
+        )
+        registered = {attendance.user_id for attendance in attendances}
+        attendances = [attendance for attendance in attendances if not attendance.checked_in_via_qr]
+        for attendance in attendances:
+            attendance.checked_in_via_qr = True
+            attendance.scanned_at = pending[attendance.user_id][1]
+        updated = EventAttendance.objects.filter(checked_in_via_qr=False).bulk_update(
+            attendances, ['checked_in_via_qr', 'scanned_at']
+        )
+        checked_in = {attendance.user_id for attendance in attendances}
+        if updated != len(attendances):
+            # Another scanner checked some of these in since we read them
+            transaction.set_rollback(True)
+            raced = True
+        elif checked_in:
+            Event.objects.filter(pk=event.pk).update(checked_in_count=F('checked_in_count') + len(checked_in))
+            award_points_bulk(checked_in, Club(pk=event.club_id), 'event_checkin', event)
+
+    for user_id, (result, scanned_at) in pending.items():
+        if user_id not in registered:
+            result['status'] = 'not_registered'
+        elif raced:
+            # Redo the batch one conditional check-in at a time
+            token = CheckinToken(event.pk, event.club_id, user_id, result['username'])
+            result['status'] = 'checked_in' if check_in(token, scanned_at) else 'already_checked_in'
+        else:
+            result['status'] = 'checked_in' if user_id in checked_in else 'already_checked_in'
+    return results
@@ -0,0 +1,62 @@
+"""
+Founder exports of survey responses, event attendance and membership rosters.
+
+Every export reads its rows with ``.iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+and ``values_list`` (no model instances), and is written out through the
+streaming helpers in clubs/streaming.py, so memory stays flat whatever the
+row count.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from .models import EventAttendance, Membership, SurveyResponse
+
+EXPORT_CHUNK_SIZE = 2000
+USER_COLUMNS = ['Username', 'First name', 'Last name', 'Email']
+USER_FIELDS = ('user__username', 'user__first_name', 'user__last_name', 'user__email')
+
+
+def survey_export(survey):
+    """Header and rows for a survey, one row per respondent with a column per question"""
+    questions = list(survey.questions.all())
+    header = USER_COLUMNS + ['Submitted at'] + [question.question_text for question in questions]
+
+    def rows():
+        # Responses arrive grouped by user, so only one respondent is held at a time
+        responses = (
+            SurveyResponse.objects.filter(survey=survey).order_by('user_id', 'question_id')
+            .values_list('user_id', *USER_FIELDS, 'question_id', 'answer', 'created_at')
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        for _, answers in groupby(responses, key=itemgetter(0)):
+            answers = list(answers)
+            by_question = {answer[5]: answer[6] for answer in answers}
+            yield (
+                list(answers[0][1:5]) + [max(answer[7] for answer in answers)]
+                + [by_question.get(question.pk, '') for question in questions]
+            )
+
+    return header, rows()
+
+
+def attendance_export(event):
+    header = USER_COLUMNS + ['Registered at', 'Checked in']
+    rows = (
+        EventAttendance.objects.filter(event=event).order_by('pk')
+        .values_list(*USER_FIELDS, 'checked_in_at', 'checked_in_via_qr')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return header, rows
+
+
+def roster_export(club, status=None):
+    header = USER_COLUMNS + ['Department', 'Status', 'Joined at']
+    memberships = Membership.objects.filter(club=club)
+    if status:
+        memberships = memberships.filter(status=status)
+    rows = (
+        memberships.order_by('pk')
+        .values_list(*USER_FIELDS, 'user__department', 'status', 'joined_at')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return header, rows
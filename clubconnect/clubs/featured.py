@@ -0,0 +1,108 @@
+"""
+Club of the Week.
+
+The select_featured_club command picks one club per week (Monday 00:00 local
+time to the next Monday) from the last seven days of engagement and stores it as
+a ``FeaturedClub`` row. The dashboard reads the current pick through the cache,
+so every user sees the same club all week and no request ever scans the club
+table.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import ClubPost, Event, EventAttendance, FeaturedClub
+
+FEATURED_CLUB_KEY = 'featured_club'
+# Re-read the table at least this often in case a pick was made by another process
+FEATURED_CLUB_TIMEOUT = 60 * 60
+# A club featured within this many weeks isn't picked again
+REPEAT_COOLDOWN_WEEKS = 4
+POST_WEIGHT = 2.0
+EVENT_WEIGHT = 3.0
+ATTENDANCE_WEIGHT = 1.0
+GROWTH_WEIGHT = 0.5
+
+
+def week_window(now=None):
+    """(start, end) of the week containing ``now``, in the current time zone"""
+    now = timezone.localtime(now)
+    start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=7)
+
+
+def grouped_counts(queryset, club_field):
+    return dict(queryset.values(club_field).annotate(n=Count('pk')).values_list(club_field, 'n'))
+
+
+def engagement_scores(until):
+    """Per-club engagement over the seven days before ``until``"""
+    since = until - timedelta(days=7)
+    before = since - timedelta(days=7)
+    posts = grouped_counts(ClubPost.objects.filter(created_at__gte=since, created_at__lt=until), 'club_id')
+    # Events held in the window, plus the ones already scheduled for the week ahead
+    events = grouped_counts(
+        Event.objects.filter(start_time__gte=since, start_time__lt=until + timedelta(days=7)), 'club_id'
+    )
+    # Students actually checked in at the door, by when they were scanned
+    # (checked_in_at is set at registration, so it would count sign-ups)
+    checked_in = EventAttendance.objects.filter(checked_in_via_qr=True)
+    attendance = grouped_counts(checked_in.filter(scanned_at__gte=since, scanned_at__lt=until), 'event__club_id')
+    previous = grouped_counts(checked_in.filter(scanned_at__gte=before, scanned_at__lt=since), 'event__club_id')
+
+    scores = {}
+    for club_id in set(posts) | set(events) | set(attendance):
+        growth = attendance.get(club_id, 0) - previous.get(club_id, 0)
+        scores[club_id] = (
+            POST_WEIGHT * posts.get(club_id, 0)
+            + EVENT_WEIGHT * events.get(club_id, 0)
+            + ATTENDANCE_WEIGHT * attendance.get(club_id, 0)
+            + GROWTH_WEIGHT * max(growth, 0)
+        )
+    return scores
+
+
+def select_featured_club(now=None, force=False):
+    """Store this week's pick (once per week unless ``force``); returns the FeaturedClub or None"""
+    now = now or timezone.now()
+    week_start, week_end = week_window(now)
+    existing = FeaturedClub.objects.filter(valid_from=week_start).first()
+    if existing and not force:
+        return existing
+
+    recent = set(FeaturedClub.objects.filter(
+        valid_from__gte=week_start - timedelta(weeks=REPEAT_COOLDOWN_WEEKS), valid_from__lt=week_start,
+    ).values_list('club_id', flat=True))
+    candidates = {club_id: score for club_id, score in engagement_scores(now).items() if club_id not in recent}
+    if not candidates:
+        return existing
+    # Highest score wins; ties go to the older club so the pick is deterministic
+    club_id = min(candidates, key=lambda pk: (-candidates[pk], pk))
+
+    with transaction.atomic():
+        featured, _ = FeaturedClub.objects.update_or_create(
+            valid_from=week_start,
+            defaults={'club_id': club_id, 'valid_until': week_end, 'score': candidates[club_id]},
+        )
+        transaction.on_commit(lambda: cache.delete(FEATURED_CLUB_KEY))
+    return featured
+
+
+def get_featured_club():
+    """The current Club of the Week, or the most recent one if this week's hasn't been picked yet"""
+    cached = cache.get(FEATURED_CLUB_KEY)
+    now = timezone.now()
+    if cached is not None and (cached['valid_until'] is None or cached['valid_until'] > now):
+        return cached['club']
+
+    featured = FeaturedClub.objects.filter(valid_from__lte=now).select_related('club').first()
+    club = featured.club if featured else None
+    valid_until = featured.valid_until if featured and featured.valid_until > now else None
+    timeout = FEATURED_CLUB_TIMEOUT
+    if valid_until is not None:
+        timeout = max(1, min(timeout, int((valid_until - now).total_seconds())))
+    cache.set(FEATURED_CLUB_KEY, {'club': club, 'valid_until': valid_until}, timeout)
+    return club
@@ -0,0 +1,149 @@
+"""
+Personal activity feed: fan-out on write for small clubs, fan-in for large ones.
+
+A student's feed covers the clubs they are an approved member of or have
+favorited, plus general announcements (see ``followed_club_ids``).
+
+- Small clubs (fewer than ``FEED_FANOUT_MAX_MEMBERS`` approved members): a new
+  ``ActivityItem`` is pushed onto the cached feed list of every follower whose
+  list is warm. A list holds at most ``FEED_LIST_LENGTH`` ``(created_at, id)``
+  entries, newest first.
+- Large clubs and general announcements are never pushed, because one item
+  would mean thousands of cache writes. They are merged in at read time with
+  an indexed query on the timeline.
+
+A page is therefore one cache read plus one query that combines the pushed ids
+with the large clubs' items, in ``(created_at, id)`` keyset order. Cold lists
+are rebuilt with a single query on first read. Paging past the end of a full
+list falls back to querying the timeline directly.
+
+Joining, leaving or (un)favoriting a club drops that user's list. When a club
+crosses the threshold, the large-club set changes and every list built against
+the old set is rebuilt on its next read. With the per-process LocMem cache,
+pushes only reach lists held by the same worker, so use a shared cache (Redis,
+Memcached) in multi-process deployments. Two pushes racing on one list can
+lose an entry until that list is rebuilt.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .activity import EPOCH, activity_page, decode_cursor, encode_cursor, followed_club_ids
+from .models import ActivityItem, Club, Membership
+
+FEED_LIST_LENGTH = 500
+FEED_LIST_TIMEOUT = 60 * 60 * 24
+LARGE_CLUBS_KEY = 'feed_large_clubs'
+LARGE_CLUBS_TIMEOUT = 60 * 5
+# Users whose cached lists are updated per cache round trip during a push
+PUSH_CHUNK = 500
+
+
+def fanout_threshold():
+    return getattr(settings, 'FEED_FANOUT_MAX_MEMBERS', 500)
+
+
+def feed_key(user_id):
+    return f'feed_user_{user_id}'
+
+
+def sort_key(item):
+    return (item.created_at - EPOCH) // timedelta(microseconds=1), item.pk
+
+
+def large_club_ids():
+    """Ids of the clubs delivered by fan-in, refreshed every few minutes"""
+    large = cache.get(LARGE_CLUBS_KEY)
+    if large is None:
+        large = frozenset(
+            Club.objects.filter(approved_member_count__gte=fanout_threshold()).values_list('pk', flat=True)
+        )
+        cache.set(LARGE_CLUBS_KEY, large, LARGE_CLUBS_TIMEOUT)
+    return large
+
+
+def build_feed_list(user_id, large):
+    followed = followed_club_ids(user_id)
+    small = followed - large
+    entries = [
+        sort_key(item) for item in
+        ActivityItem.objects.filter(club_id__in=small).order_by('-created_at', '-id').only('id', 'created_at')
+        [:FEED_LIST_LENGTH]
+    ] if small else []
+    feed = {'followed': followed, 'large': large, 'entries': entries}
+    cache.set(feed_key(user_id), feed, FEED_LIST_TIMEOUT)
+    return feed
+
+
+def get_feed_list(user_id):
+    large = large_club_ids()
+    feed = cache.get(feed_key(user_id))
+    if feed is None or feed['large'] != large:
+        feed = build_feed_list(user_id, large)
+    return feed
+
+
+def audience(club_id):
+    members = Membership.objects.filter(club_id=club_id, status='approved').values_list('user_id', flat=True)
+    favorites = Club.favorited_by.through.objects.filter(club_id=club_id).values_list('user_id', flat=True)
+    return set(members.union(favorites))
+
+
+def push_item(item):
+    """Fan a new timeline item out to the warm feed lists of a small club's followers"""
+    if item.club_id is None or item.club_id in large_club_ids():
+        return 0
+    entry = sort_key(item)
+    user_ids = list(audience(item.club_id))
+    pushed = 0
+    for start in range(0, len(user_ids), PUSH_CHUNK):
+        keys = [feed_key(user_id) for user_id in user_ids[start:start + PUSH_CHUNK]]
+        # Cold lists are skipped; they're rebuilt from the timeline on first read
+        feeds = cache.get_many(keys)
+        for feed in feeds.values():
+            if entry not in feed['entries']:
+                feed['entries'] = sorted(feed['entries'] + [entry], reverse=True)[:FEED_LIST_LENGTH]
+        cache.set_many(feeds, FEED_LIST_TIMEOUT)
+        pushed += len(feeds)
+    return pushed
+
+
+def schedule_push(item):
+    transaction.on_commit(lambda: push_item(item))
+
+
+def invalidate_user(user_id):
+    transaction.on_commit(lambda: cache.delete(feed_key(user_id)))
+
+
+def personal_feed(user, cursor=None, limit=20):
+    """One page of the user's personal feed, newest first, and the next page's cursor"""
+    feed = get_feed_list(user.pk)
+    after = None
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        after = ((created_at - EPOCH) // timedelta(microseconds=1), pk)
+
+    entries = [entry for entry in feed['entries'] if after is None or entry < after]
+    if len(feed['entries']) >= FEED_LIST_LENGTH and len(entries) <= limit:
+        # Past the end of the capped list: page through the timeline itself
+        return activity_page(club_ids=feed['followed'], cursor=cursor, limit=limit)
+
+    fan_in = feed['followed'] & feed['large']
+    items = ActivityItem.objects.select_related('club').filter(
+        Q(pk__in=[item_id for _, item_id in entries[:limit + 1]]) | Q(club_id__in=fan_in) | Q(club__isnull=True)
+    ).order_by('-created_at', '-id')
+    if after is not None:
+        items = items.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    page = list(items[:limit + 1])
+    if len(page) > limit:
+        next_cursor = encode_cursor(page[limit - 1])
+    elif page and len(entries) > limit + 1:
+        # Some pushed items were deleted since; the list still has older entries
+        next_cursor = encode_cursor(page[-1])
+    else:
+        next_cursor = None
+    return page[:limit], next_cursor
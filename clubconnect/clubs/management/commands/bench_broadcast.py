@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User
+from clubs.models import Notification
+from clubs.utils import create_notification, create_broadcast_notification, get_unread_notification_count
+
+
+class Command(BaseCommand):
+    help = "Compare per-user notification fan-out against a single broadcast row for a platform-wide announcement"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000, help='Number of users to broadcast to')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        user_count = options['users']
+        batch_size = options['batch_size']
+
+        # Everything runs inside a transaction that is rolled back, so the real data is untouched
+        with transaction.atomic():
+            existing = User.objects.count()
+            self.stdout.write(f"Creating {user_count} throwaway users ({existing} already present)...")
+            users = [
+                User(username=f'bench_broadcast_{i}', email=f'bench_broadcast_{i}@example.com', password='!')
+                for i in range(user_count)
+            ]
+            User.objects.bulk_create(users, batch_size=batch_size)
+
+            start = time.perf_counter()
+            create_notification(
+                User.objects.all(),
+                'announcement',
+                'Benchmark announcement',
+                'Fan-out on write',
+                '/dashboard/'
+            )
+            fanout_seconds = time.perf_counter() - start
+            fanout_rows = Notification.objects.filter(title='Benchmark announcement').count()
+
+            start = time.perf_counter()
+            create_broadcast_notification(
+                'announcement',
+                'Benchmark broadcast',
+                'Fan-out on read',
+                '/dashboard/'
+            )
+            broadcast_seconds = time.perf_counter() - start
+
+            reader = User.objects.filter(username='bench_broadcast_0').first()
+            start = time.perf_counter()
+            get_unread_notification_count(reader)
+            read_seconds = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Fan-out on write: {fanout_rows} rows in {fanout_seconds * 1000:.1f} ms")
+        self.stdout.write(f"Broadcast:        1 row in {broadcast_seconds * 1000:.1f} ms")
+        self.stdout.write(f"Unread count read path with broadcasts merged: {read_seconds * 1000:.1f} ms")
+        if broadcast_seconds:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {fanout_seconds / broadcast_seconds:.0f}x"))
@@ -0,0 +1,103 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from accounts.models import User
+from clubs import feed
+from clubs.activity import activity_page, followed_club_ids, record_activity
+from clubs.models import Club, ClubPost
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the personal feed's write path (fan-out to cached lists) and read path "
+        "(cached list merged with fan-in) at several fan-out thresholds, against pure read-time filtering. "
+        "Run against seeded data (seed_load)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--thresholds', type=int, nargs='+', default=[0, 50, 500, 10 ** 9],
+                            help="FEED_FANOUT_MAX_MEMBERS values; 0 is pure fan-in, a huge value pure fan-out")
+        parser.add_argument('--readers', type=int, default=200, help="Students whose feeds are read")
+        parser.add_argument('--pages', type=int, default=3, help="Feed pages read per student")
+        parser.add_argument('--writes', type=int, default=20, help="Posts written across clubs of every size")
+
+    def handle(self, *args, **options):
+        readers = [
+            user for user in User.objects.filter(user_type='student', membership__status='approved')
+            .distinct().order_by('pk')[:options['readers']]
+        ]
+        clubs = list(Club.objects.order_by('approved_member_count', 'pk'))
+        if not readers or not clubs:
+            raise CommandError("No students with approved memberships; seed data first (seed_load)")
+        step = max(1, len(clubs) // options['writes'])
+        writers = clubs[::step][:options['writes']]
+
+        baseline = []
+        for reader in readers:
+            followed = followed_club_ids(reader)
+            baseline.append(timed(self.read_pages, lambda cursor: activity_page(followed, cursor), options['pages'])[0])
+        self.stdout.write(f"Read-time filtering only: p50 {percentile(baseline, 0.5):.1f} ms, "
+                          f"p95 {percentile(baseline, 0.95):.1f} ms per {options['pages']} pages")
+
+        self.stdout.write(f"{'threshold':>10} {'fan-in clubs':>13} {'cold p95':>9} {'warm p50':>9} "
+                          f"{'warm p95':>9} {'push avg':>9} {'lists/push':>11}")
+        for threshold in options['thresholds']:
+            with override_settings(FEED_FANOUT_MAX_MEMBERS=threshold):
+                self.bench_threshold(threshold, readers, writers, options['pages'])
+
+    def read_pages(self, fetch, pages):
+        cursor = None
+        for _ in range(pages):
+            _, cursor = fetch(cursor)
+            if cursor is None:
+                break
+
+    def bench_threshold(self, threshold, readers, writers, pages):
+        cache.delete(feed.LARGE_CLUBS_KEY)
+        cache.delete_many([feed.feed_key(reader.pk) for reader in readers])
+        large = feed.large_club_ids()
+
+        def fetch_for(reader):
+            return lambda cursor: feed.personal_feed(reader, cursor)
+
+        cold = [timed(self.read_pages, fetch_for(reader), 1)[0] for reader in readers]
+        warm = [timed(self.read_pages, fetch_for(reader), pages)[0] for reader in readers]
+
+        # Warm every follower's list so pushes do their full work, then roll the posts back
+        push_times, touched = [], []
+        with transaction.atomic():
+            for club in writers:
+                for user_id in feed.audience(club.pk):
+                    feed.get_feed_list(user_id)
+                post = ClubPost.objects.create(club=club, author=readers[0], title='Feed benchmark', content='')
+                item, _ = record_activity(post)
+                elapsed, lists = timed(feed.push_item, item)
+                push_times.append(elapsed)
+                touched.append(lists)
+            transaction.set_rollback(True)
+
+        # The pushed entries point at rolled back rows, so drop every list the run touched
+        user_ids = {user_id for club in writers for user_id in feed.audience(club.pk)}
+        cache.delete_many([feed.feed_key(user_id) for user_id in user_ids | {reader.pk for reader in readers}])
+        cache.delete(feed.LARGE_CLUBS_KEY)
+
+        self.stdout.write(
+            f"{threshold:>10} {len(large):>13} {percentile(cold, 0.95):>9.1f} {percentile(warm, 0.5):>9.1f} "
+            f"{percentile(warm, 0.95):>9.1f} {sum(push_times) / len(push_times):>9.2f} "
+            f"{sum(touched) / len(touched):>11.0f}"
+        )
@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clubs.autocomplete import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = "Write the search box autocomplete index snapshot that web processes load"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = build_snapshot()
+        self.stdout.write(f"Wrote {total} entries to {snapshot_path()} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clubs.recommendations import TAG_WEIGHT, compute_recommendations
+
+
+class Command(BaseCommand):
+    help = "Recompute every student's club recommendations (run periodically, e.g. nightly from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help="Recommendations stored per student")
+        parser.add_argument('--tag-weight', type=float, default=TAG_WEIGHT,
+                            help="Share of club similarity taken from tag overlap (0-1)")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        students, written = compute_recommendations(
+            top_n=options['top'], tag_weight=options['tag_weight'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f"Stored {written} recommendations for {students} students in {time.perf_counter() - started:.1f}s"
+        )
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clubs.activity import rebuild_activity
+
+
+class Command(BaseCommand):
+    help = "Rebuild the activity timeline from announcements, events and club posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            total = rebuild_activity(batch_size=options['batch_size'])
+        self.stdout.write(f"Wrote {total} activity items in {time.perf_counter() - started:.1f}s")
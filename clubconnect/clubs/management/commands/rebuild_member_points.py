@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clubs.points import rebuild_member_points
+
+
+class Command(BaseCommand):
+    help = "Recompute every member's points and counts from the full points ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_member_points(batch_size=options['batch_size'])
+        self.stdout.write(f"Rebuilt {total} member totals in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from clubs.models import Club, ClubPost, Event, EventAttendance, Membership, Survey, SurveyResponse
+
+
+def count_subquery(queryset, group_field, counted='pk', distinct=False):
+    return Coalesce(Subquery(
+        queryset.values(group_field).annotate(total=Count(counted, distinct=distinct)).values('total')[:1]
+    ), 0)
+
+
+# model -> {counter field: subquery expression computing its true value}
+COUNTERS = [
+    (Club, {
+        'approved_member_count': count_subquery(
+            Membership.objects.filter(club=OuterRef('pk'), status='approved'), 'club'
+        ),
+    }),
+    (ClubPost, {
+        'like_count': count_subquery(ClubPost.likes.through.objects.filter(clubpost=OuterRef('pk')), 'clubpost'),
+    }),
+    (Event, {
+        'registration_count': count_subquery(EventAttendance.objects.filter(event=OuterRef('pk')), 'event'),
+        'checked_in_count': count_subquery(
+            EventAttendance.objects.filter(event=OuterRef('pk'), checked_in_via_qr=True), 'event'
+        ),
+    }),
+    (Survey, {
+        'respondent_count': count_subquery(
+            SurveyResponse.objects.filter(survey=OuterRef('pk')), 'survey', counted='user', distinct=True
+        ),
+    }),
+]
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized member, like, attendance and survey respondent counters and fix any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        for model, counters in COUNTERS:
+            fields = list(counters)
+            actual_names = {field: f'actual_{field}' for field in fields}
+            checked = fixed = 0
+            last_pk = 0
+
+            # Walk the table in primary key order so each batch is a short transaction
+            while True:
+                with transaction.atomic():
+                    batch = list(
+                        model.objects.filter(pk__gt=last_pk).order_by('pk')
+                        .annotate(**{actual_names[field]: expr for field, expr in counters.items()})
+                        .only('pk', *fields)[:batch_size]
+                    )
+                    if not batch:
+                        break
+                    last_pk = batch[-1].pk
+                    checked += len(batch)
+
+                    drifted = []
+                    for obj in batch:
+                        changed = False
+                        for field in fields:
+                            actual = getattr(obj, actual_names[field])
+                            if getattr(obj, field) != actual:
+                                setattr(obj, field, actual)
+                                changed = True
+                        if changed:
+                            drifted.append(obj)
+
+                    fixed += len(drifted)
+                    if drifted and not dry_run:
+                        model.objects.bulk_update(drifted, fields, batch_size=batch_size)
+
+            verb = 'would fix' if dry_run else 'fixed'
+            self.stdout.write(f"{model.__name__}: checked {checked}, {verb} {fixed}")
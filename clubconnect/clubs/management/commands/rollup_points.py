@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from clubs.points import ROLLUP_BATCH_SIZE, rollup_points
+
+
+class Command(BaseCommand):
+    help = "Fold points ledger entries awarded since the last rollup into the member totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ROLLUP_BATCH_SIZE)
+        parser.add_argument('--interval', type=float,
+                            help="Keep running, rolling up every this many seconds (leaderboards lag by at most this)")
+
+    def handle(self, *args, **options):
+        if options['interval'] is None:
+            started = time.perf_counter()
+            total = rollup_points(batch_size=options['batch_size'])
+            self.stdout.write(f"Rolled up {total} ledger entries in {time.perf_counter() - started:.1f}s")
+            return
+
+        self.stdout.write(f"Rolling up points every {options['interval']:g}s")
+        try:
+            while True:
+                try:
+                    total = rollup_points(batch_size=options['batch_size'])
+                except OperationalError as error:
+                    # e.g. SQLite busy while requests award points; try again on the next pass
+                    self.stderr.write(f"Could not roll up points: {error}")
+                else:
+                    if total:
+                        self.stdout.write(f"Rolled up {total} ledger entries")
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping")
@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from clubs.taskqueue import claim_tasks, purge_finished, requeue_stale, run_task
+
+# Seconds between sweeps for abandoned tasks and between purges of old finished ones
+REQUEUE_INTERVAL = 60
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (notifications, QR codes) on a thread or process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Tasks run at the same time")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help="Threads suit the I/O-bound tasks here; processes sidestep the GIL for CPU-bound ones")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Exit once no queued task is due")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if options['pool'] == 'process':
+            # Forked children must open their own connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='task')
+
+        if getattr(settings, 'TASK_QUEUE_EAGER', False):
+            self.stdout.write("TASK_QUEUE_EAGER is on, so web processes run tasks themselves; "
+                              "only tasks queued earlier will be picked up here")
+        if isinstance(caches['default'], LocMemCache):
+            self.stderr.write("The cache is per-process (no REDIS_URL): unread counts and live updates "
+                              "changed by tasks won't reach the web processes")
+
+        running = {}
+        finished = {}
+        last_requeue = last_purge = 0
+        self.stdout.write(f"Running tasks with {workers} {options['pool']} workers")
+        try:
+            while True:
+                now = time.monotonic()
+                claimed = []
+                try:
+                    if now - last_requeue >= REQUEUE_INTERVAL:
+                        requeued = requeue_stale()
+                        if requeued:
+                            self.stdout.write(f"Requeued {requeued} abandoned tasks")
+                        last_requeue = now
+                    if now - last_purge >= PURGE_INTERVAL:
+                        purge_finished()
+                        last_purge = now
+                    if len(running) < workers:
+                        claimed = claim_tasks(workers - len(running))
+                except OperationalError as error:
+                    # e.g. SQLite busy while tasks write; try again on the next pass
+                    self.stderr.write(f"Could not claim tasks: {error}")
+                for task_id, claim in claimed:
+                    running[executor.submit(run_task, task_id, claim)] = task_id
+
+                if running:
+                    done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task_id = running.pop(future)
+                        try:
+                            status = future.result()
+                        except Exception as error:
+                            # run_task records task errors itself; this is the pool failing
+                            self.stderr.write(f"Task {task_id} could not be run: {error!r}")
+                            status = 'error'
+                        finished[status] = finished.get(status, 0) + 1
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running tasks to finish")
+        finally:
+            executor.shutdown(wait=True)
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(finished.items())) or "nothing"
+        self.stdout.write(f"Ran {sum(finished.values())} tasks: {summary}")
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import User
+from clubs.seeding import EPOCH, DatasetSeeder, counts_for_scale, usernames
+
+
+def hash_passwords(password, salted_names):
+    return [(name, make_password(password, salt=salt)) for name, salt in salted_names]
+
+
+class Command(BaseCommand):
+    help = "Fill the database with a deterministic synthetic dataset for load testing and benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Approximate total rows across all tables')
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same dataset')
+        parser.add_argument('--epoch', type=datetime.fromisoformat, default=EPOCH,
+                            help=f'Date the seeded schedule is centred on (default {EPOCH.date()})')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--password', default='loadtest',
+                            help='Password for every generated user; empty for unusable passwords')
+        parser.add_argument('--unique-salts', action='store_true',
+                            help='Hash every password with its own salt instead of sharing one hash (slow)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used for password hashing with --unique-salts')
+        for name in counts_for_scale(0):
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                                help=f'Override the number of {name.replace("_", " ")}')
+
+    def handle(self, *args, **options):
+        counts = counts_for_scale(options['rows'])
+        for name in counts:
+            if options[name] is not None:
+                counts[name] = options[name]
+
+        if User.objects.filter(username__startswith='load_').exists():
+            raise CommandError("The database already has generated users; run `flush` first")
+
+        started = time.perf_counter()
+        passwords = {}
+        if options['password']:
+            passwords = self.hash_passwords(counts, options['password'], options['seed'],
+                                            options['workers'] if options['unique_salts'] else 0)
+            self.stdout.write(f"Hashed {len(passwords)} passwords in {time.perf_counter() - started:.1f}s")
+
+        epoch = options['epoch']
+        if epoch.tzinfo is None:
+            epoch = epoch.replace(tzinfo=timezone.utc)
+        seeder = DatasetSeeder(counts, seed=options['seed'], batch_size=options['batch_size'],
+                               stdout=self.stdout, passwords=passwords, epoch=epoch)
+        with transaction.atomic():
+            seeder.seed()
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s"))
+
+    def hash_passwords(self, counts, password, seed, workers):
+        # Salts derive from the seed so the same seed always produces the same hashes
+        names = [name for group in usernames(counts).values() for name in group]
+        if not workers:
+            hashed = make_password(password, salt=hashlib.sha256(str(seed).encode()).hexdigest()[:22])
+            return dict.fromkeys(names, hashed)
+
+        salted_names = [(name, hashlib.sha256(f'{seed}:{name}'.encode()).hexdigest()[:22]) for name in names]
+        if workers == 1:
+            return dict(hash_passwords(password, salted_names))
+
+        chunks = [salted_names[i::workers * 4] for i in range(workers * 4)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+            results = executor.map(hash_passwords, [password] * len(chunks), chunks)
+            return {name: hashed for chunk in results for name, hashed in chunk}
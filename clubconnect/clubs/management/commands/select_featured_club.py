@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from clubs.featured import select_featured_club
+
+
+class Command(BaseCommand):
+    help = "Pick this week's Club of the Week from the last seven days of engagement (run weekly, e.g. Monday from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-pick even if this week already has a club")
+
+    def handle(self, *args, **options):
+        featured = select_featured_club(force=options['force'])
+        if featured is None:
+            self.stdout.write("No club had any engagement last week; nothing featured")
+            return
+        self.stdout.write(
+            f"Featured {featured.club.name} (score {featured.score:g}) "
+            f"from {featured.valid_from:%Y-%m-%d} until {featured.valid_until:%Y-%m-%d}"
+        )
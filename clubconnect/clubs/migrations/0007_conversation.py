@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_conversations(apps, schema_editor):
+    Message = apps.get_model('clubs', 'Message')
+    Conversation = apps.get_model('clubs', 'Conversation')
+
+    conversations = {}
+    for message in Message.objects.order_by('created_at', 'id').iterator(chunk_size=2000):
+        low, high = sorted((message.sender_id, message.receiver_id))
+        conversation = conversations.setdefault((low, high), Conversation(user_low_id=low, user_high_id=high))
+        conversation.last_message_id = message.id
+        conversation.last_message_preview = message.content[:200]
+        conversation.last_message_at = message.created_at
+        if not message.is_read:
+            if message.receiver_id == low:
+                conversation.unread_low += 1
+            else:
+                conversation.unread_high += 1
+    Conversation.objects.bulk_create(conversations.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0006_broadcastnotification_broadcastreceipt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_preview', models.CharField(blank=True, max_length=200)),
+                ('last_message_at', models.DateTimeField()),
+                ('unread_low', models.PositiveIntegerField(default=0)),
+                ('unread_high', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='clubs.message')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_low', '-last_message_at'], name='clubs_conve_user_lo_46601d_idx'), models.Index(fields=['user_high', '-last_message_at'], name='clubs_conve_user_hi_cef6af_idx')],
+                'unique_together': {('user_low', 'user_high')},
+            },
+        ),
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, group_field):
+    return Coalesce(Subquery(
+        queryset.values(group_field).annotate(total=Count('pk')).values('total')[:1]
+    ), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Club = apps.get_model('clubs', 'Club')
+    ClubPost = apps.get_model('clubs', 'ClubPost')
+    Event = apps.get_model('clubs', 'Event')
+    Membership = apps.get_model('clubs', 'Membership')
+    EventAttendance = apps.get_model('clubs', 'EventAttendance')
+    Like = ClubPost.likes.through
+
+    Club.objects.update(approved_member_count=count_subquery(
+        Membership.objects.filter(club=OuterRef('pk'), status='approved'), 'club'
+    ))
+    ClubPost.objects.update(like_count=count_subquery(
+        Like.objects.filter(clubpost=OuterRef('pk')), 'clubpost'
+    ))
+    Event.objects.update(
+        registration_count=count_subquery(EventAttendance.objects.filter(event=OuterRef('pk')), 'event'),
+        checked_in_count=count_subquery(
+            EventAttendance.objects.filter(event=OuterRef('pk'), checked_in_via_qr=True), 'event'
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0008_message_clubs_messa_sender__5f3414_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='club',
+            name='approved_member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clubpost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='checked_in_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='registration_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0009_club_approved_member_count_clubpost_like_count_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clubmeeting',
+            index=models.Index(fields=['status'], name='clubs_clubm_status_c8dda3_idx'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE clubs_searchdocument_fts USING fts5(
+        title, tags, body,
+        content='clubs_searchdocument', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER clubs_searchdocument_ai AFTER INSERT ON clubs_searchdocument BEGIN
+        INSERT INTO clubs_searchdocument_fts(rowid, title, tags, body)
+        VALUES (new.id, new.title, new.tags, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER clubs_searchdocument_ad AFTER DELETE ON clubs_searchdocument BEGIN
+        INSERT INTO clubs_searchdocument_fts(clubs_searchdocument_fts, rowid, title, tags, body)
+        VALUES ('delete', old.id, old.title, old.tags, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER clubs_searchdocument_au AFTER UPDATE ON clubs_searchdocument BEGIN
+        INSERT INTO clubs_searchdocument_fts(clubs_searchdocument_fts, rowid, title, tags, body)
+        VALUES ('delete', old.id, old.title, old.tags, old.body);
+        INSERT INTO clubs_searchdocument_fts(rowid, title, tags, body)
+        VALUES (new.id, new.title, new.tags, new.body);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS clubs_searchdocument_au",
+    "DROP TRIGGER IF EXISTS clubs_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS clubs_searchdocument_ai",
+    "DROP TABLE IF EXISTS clubs_searchdocument_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE clubs_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX clubs_searchdocument_vector_gin ON clubs_searchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS clubs_searchdocument_vector_gin",
+    "ALTER TABLE clubs_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_FORWARD)
+    elif vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_REVERSE)
+    elif vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_REVERSE)
+
+
+def populate_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('clubs', 'SearchDocument')
+    sources = [
+        ('club', apps.get_model('clubs', 'Club'),
+         lambda c: (c.name, c.domain_tags, f'{c.short_description}\n{c.long_description}')),
+        ('event', apps.get_model('clubs', 'Event'), lambda e: (e.title, e.location, e.description)),
+        ('announcement', apps.get_model('clubs', 'Announcement'), lambda a: (a.title, '', a.content)),
+        ('user', apps.get_model(settings.AUTH_USER_MODEL),
+         lambda u: (u.username, u.department or '', f'{u.first_name} {u.last_name}'.strip())),
+    ]
+    for object_type, model, document in sources:
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=2000):
+            title, tags, body = document(instance)
+            batch.append(SearchDocument(object_type=object_type, object_id=instance.pk, title=title[:300],
+                                        tags=tags[:300], body=body))
+        SearchDocument.objects.bulk_create(batch, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0010_clubmeeting_clubs_clubm_status_c8dda3_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('club', 'Club'), ('event', 'Event'), ('announcement', 'Announcement'), ('user', 'User')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=300)),
+                ('tags', models.CharField(blank=True, max_length=300)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('object_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
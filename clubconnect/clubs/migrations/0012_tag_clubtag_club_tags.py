@@ -0,0 +1,71 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def parse_domain_tags(apps, schema_editor):
+    Club = apps.get_model('clubs', 'Club')
+    Tag = apps.get_model('clubs', 'Tag')
+    ClubTag = apps.get_model('clubs', 'ClubTag')
+
+    names = {}
+    club_slugs = {}
+    for club in Club.objects.only('id', 'domain_tags').iterator(chunk_size=2000):
+        slugs = []
+        for raw in club.domain_tags.split(','):
+            name = ' '.join(raw.split())[:50]
+            slug = slugify(name)[:50]
+            if slug and slug not in slugs:
+                names.setdefault(slug, name)
+                slugs.append(slug)
+        club_slugs[club.id] = slugs
+
+    Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in names.items()], batch_size=1000)
+    tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+    ClubTag.objects.bulk_create([
+        ClubTag(club_id=club_id, tag_id=tag_ids[slug])
+        for club_id, slugs in club_slugs.items() for slug in slugs
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0011_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClubTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='clubs.club')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='club_links', to='clubs.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='clubs', through='clubs.ClubTag', to='clubs.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='clubtag',
+            index=models.Index(fields=['tag', 'club'], name='clubs_clubt_tag_id_71693f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='clubtag',
+            unique_together={('club', 'tag')},
+        ),
+        migrations.RunPython(parse_domain_tags, migrations.RunPython.noop),
+    ]
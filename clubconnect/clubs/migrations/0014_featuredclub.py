@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0013_clubrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeaturedClub',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valid_from', models.DateTimeField(unique=True)),
+                ('valid_until', models.DateTimeField()),
+                ('score', models.FloatField(default=0)),
+                ('selected_at', models.DateTimeField(auto_now_add=True)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='featured_weeks', to='clubs.club')),
+            ],
+            options={
+                'ordering': ['-valid_from'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def populate_activity(apps, schema_editor):
+    ActivityItem = apps.get_model('clubs', 'ActivityItem')
+    sources = [
+        ('announcement', apps.get_model('clubs', 'Announcement'), lambda a: {'title': a.title, 'summary': a.content}),
+        ('event', apps.get_model('clubs', 'Event'),
+         lambda e: {'title': e.title, 'summary': e.description, 'location': e.location, 'starts_at': e.start_time}),
+        ('post', apps.get_model('clubs', 'ClubPost'), lambda p: {'title': p.title, 'summary': p.content}),
+    ]
+    for item_type, model, fields in sources:
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=2000):
+            row = fields(instance)
+            row['title'] = row['title'][:200]
+            row['summary'] = Truncator(row['summary']).chars(300)
+            batch.append(ActivityItem(item_type=item_type, object_id=instance.pk, club_id=instance.club_id,
+                                      created_at=instance.created_at, **row))
+        ActivityItem.objects.bulk_create(batch, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0014_featuredclub'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('announcement', 'Announcement'), ('event', 'Event'), ('post', 'Post')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('summary', models.TextField(blank=True)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('club', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_items', to='clubs.club')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='clubs_activ_created_4077f6_idx'), models.Index(fields=['club', '-created_at', '-id'], name='clubs_activ_club_id_164144_idx')],
+                'unique_together': {('item_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(populate_activity, migrations.RunPython.noop),
+    ]
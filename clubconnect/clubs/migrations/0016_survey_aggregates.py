@@ -0,0 +1,57 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_aggregates(apps, schema_editor):
+    from clubs.surveys import tally_responses
+
+    Survey = apps.get_model('clubs', 'Survey')
+    SurveyResponse = apps.get_model('clubs', 'SurveyResponse')
+    SurveyQuestionStats = apps.get_model('clubs', 'SurveyQuestionStats')
+    SurveyAnswerCount = apps.get_model('clubs', 'SurveyAnswerCount')
+
+    stats, counts = tally_responses(SurveyResponse.objects.all(), SurveyQuestionStats, SurveyAnswerCount)
+    SurveyQuestionStats.objects.bulk_create(stats, batch_size=2000)
+    SurveyAnswerCount.objects.bulk_create(counts, batch_size=2000)
+
+    respondents = SurveyResponse.objects.values('survey_id').annotate(n=Count('user', distinct=True))
+    for row in respondents.iterator():
+        Survey.objects.filter(pk=row['survey_id']).update(respondent_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0015_activityitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='respondent_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SurveyQuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='clubs.surveyquestion')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveyAnswerCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='clubs.surveyquestion')),
+            ],
+            options={
+                'unique_together': {('question', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    # Existing totals become one already rolled up entry each, so a rebuild from the ledger keeps them
+    MemberPoints = apps.get_model('clubs', 'MemberPoints')
+    PointsLedgerEntry = apps.get_model('clubs', 'PointsLedgerEntry')
+    PointsLedgerEntry.objects.bulk_create([
+        PointsLedgerEntry(
+            user_id=row.user_id, club_id=row.club_id, reason='opening_balance',
+            source_type='memberpoints', source_id=row.pk, points=row.points,
+            participation_count=row.participation_count, contribution_count=row.contribution_count,
+            rolled_up=True,
+        )
+        for row in MemberPoints.objects.iterator(chunk_size=2000)
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0016_survey_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('event_checkin', 'Event check-in'), ('survey_response', 'Survey response'), ('club_post', 'Club post'), ('opening_balance', 'Opening balance')], max_length=30)),
+                ('source_type', models.CharField(max_length=30)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('points', models.IntegerField()),
+                ('participation_count', models.PositiveIntegerField(default=0)),
+                ('contribution_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rolled_up', models.BooleanField(default=False)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_ledger', to='clubs.club')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rolled_up', 'club'], name='clubs_point_rolled__5026b8_idx')],
+                'unique_together': {('user', 'club', 'reason', 'source_type', 'source_id')},
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
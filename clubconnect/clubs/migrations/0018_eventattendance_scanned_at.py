@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0017_pointsledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventattendance',
+            name='scanned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
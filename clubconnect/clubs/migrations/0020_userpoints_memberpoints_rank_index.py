@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_user_points(apps, schema_editor):
+    MemberPoints = apps.get_model('clubs', 'MemberPoints')
+    UserPoints = apps.get_model('clubs', 'UserPoints')
+    totals = MemberPoints.objects.values('user_id').annotate(total=Sum('points')).order_by()
+    UserPoints.objects.bulk_create(
+        (UserPoints(user_id=row['user_id'], points=row['total']) for row in totals.iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0019_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memberpoints',
+            index=models.Index(fields=['club', '-points', 'user'], name='clubs_membe_club_id_21d3c7_idx'),
+        ),
+        migrations.CreateModel(
+            name='UserPoints',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='total_points', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-points', 'user'], name='clubs_userp_points_6f342d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_user_points, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Club(models.Model):
     name = models.CharField(max_length=100)
@@ -14,6 +15,11 @@ class Club(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     favorited_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='favorite_clubs', blank=True)
+    # Normalized from domain_tags on every save; see clubs/tags.py
+    tags = models.ManyToManyField('Tag', through='ClubTag', related_name='clubs', blank=True)
+    # Denormalized counters, kept in step with F() updates by the views and
+    # corrected by the reconcile_counters command
+    approved_member_count = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return self.name
@@ -26,6 +32,30 @@ class Club(models.Model):
             reps.append(self.vice_president)
         return list(set(reps))
 
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+class ClubTag(models.Model):
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='club_links')
+    
+    class Meta:
+        unique_together = ('club', 'tag')
+        indexes = [
+            # Browsing by tag walks tag -> clubs
+            models.Index(fields=['tag', 'club']),
+        ]
+    
+    def __str__(self):
+        return f"{self.club.name} - {self.tag.name}"
+
 class Event(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='events')
     title = models.CharField(max_length=100)
@@ -36,6 +66,8 @@ class Event(models.Model):
     image = models.ImageField(upload_to='event_images/', null=True, blank=True)
     qr_code = models.ImageField(upload_to='event_qr_codes/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    registration_count = models.PositiveIntegerField(default=0)
+    checked_in_count = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return self.title
@@ -69,9 +101,90 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # Serves the cursor-paginated history between two users
+            models.Index(fields=['sender', 'receiver', 'id']),
+        ]
+    
     def __str__(self):
         return f"From {self.sender.username} to {self.receiver.username}"
 
+# One row per pair of users, kept up to date as messages are sent so the inbox
+# is a single query instead of a scan over every message
+class Conversation(models.Model):
+    # user_low always holds the smaller user id so each pair maps to one row
+    user_low = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_preview = models.CharField(max_length=200, blank=True)
+    last_message_at = models.DateTimeField()
+    unread_low = models.PositiveIntegerField(default=0)
+    unread_high = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('user_low', 'user_high')
+        indexes = [
+            models.Index(fields=['user_low', '-last_message_at']),
+            models.Index(fields=['user_high', '-last_message_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_low.username} <-> {self.user_high.username}"
+    
+    @staticmethod
+    def pair(user_a_id, user_b_id):
+        return (user_a_id, user_b_id) if user_a_id <= user_b_id else (user_b_id, user_a_id)
+    
+    @classmethod
+    def for_pair(cls, user_a_id, user_b_id):
+        low, high = cls.pair(user_a_id, user_b_id)
+        return cls.objects.filter(user_low_id=low, user_high_id=high)
+    
+    @classmethod
+    def record_message(cls, message):
+        """Move the conversation's last message forward and bump the receiver's unread count"""
+        from django.db import IntegrityError, transaction
+        low, high = cls.pair(message.sender_id, message.receiver_id)
+        unread_field = 'unread_low' if message.receiver_id == low else 'unread_high'
+        changes = {
+            'last_message': message,
+            'last_message_preview': message.content[:200],
+            'last_message_at': message.created_at,
+        }
+        updated = cls.objects.filter(user_low_id=low, user_high_id=high).update(
+            **changes, **{unread_field: models.F(unread_field) + 1}
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_low_id=low, user_high_id=high, **changes, **{unread_field: 1})
+        except IntegrityError:
+            # Another request created the row first
+            cls.objects.filter(user_low_id=low, user_high_id=high).update(
+                **changes, **{unread_field: models.F(unread_field) + 1}
+            )
+    
+    @classmethod
+    def refresh_preview(cls, message):
+        """Keep the preview in sync when the latest message is edited or unsent"""
+        cls.for_pair(message.sender_id, message.receiver_id).filter(last_message=message).update(
+            last_message_preview=message.content[:200]
+        )
+    
+    @classmethod
+    def mark_read(cls, reader_id, other_id):
+        low, _ = cls.pair(reader_id, other_id)
+        unread_field = 'unread_low' if reader_id == low else 'unread_high'
+        cls.for_pair(reader_id, other_id).update(**{unread_field: 0})
+    
+    def other_user(self, user):
+        return self.user_high if self.user_low_id == user.id else self.user_low
+    
+    def unread_for(self, user):
+        return self.unread_low if self.user_low_id == user.id else self.unread_high
+
 class Announcement(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='announcements', null=True, blank=True)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
@@ -99,12 +212,41 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    is_broadcast = False
+    
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
+# Platform-wide notifications are stored once and merged into each user's inbox at read time
+class BroadcastNotification(models.Model):
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    link = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    is_broadcast = True
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Broadcast - {self.title}"
+
+class BroadcastReceipt(models.Model):
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name='receipts')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='broadcast_receipts')
+    read_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('broadcast', 'user')
+    
+    def __str__(self):
+        return f"{self.user.username} read {self.broadcast.title}"
+
 class ClubPost(models.Model):
     POST_TYPES = (
         ('event', 'Event'),
@@ -121,6 +263,7 @@ class ClubPost(models.Model):
     image = models.ImageField(upload_to='club_posts/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
+    like_count = models.PositiveIntegerField(default=0)
     
     class Meta:
         ordering = ['-created_at']
@@ -129,7 +272,7 @@ class ClubPost(models.Model):
         return f"{self.club.name} - {self.title}"
     
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
 class MemberPoints(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='member_points')
@@ -141,10 +284,53 @@ class MemberPoints(models.Model):
     class Meta:
         unique_together = ('user', 'club')
         ordering = ['-points']
+        # Rank order within a club; see clubs/ranking.py
+        indexes = [models.Index(fields=['club', '-points', 'user'])]
     
     def __str__(self):
         return f"{self.user.username} - {self.club.name}: {self.points} pts"
 
+# Each user's points summed over every club, kept in step with MemberPoints by
+# clubs/points.py so the cross-club leaderboard can rank on an index
+class UserPoints(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='total_points')
+    points = models.IntegerField(default=0)
+    
+    class Meta:
+        indexes = [models.Index(fields=['-points', 'user'])]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.points} pts"
+
+# Append-only record of every award. MemberPoints holds the running totals,
+# folded in from here in batches; see clubs/points.py
+class PointsLedgerEntry(models.Model):
+    REASONS = (
+        ('event_checkin', 'Event check-in'),
+        ('survey_response', 'Survey response'),
+        ('club_post', 'Club post'),
+        ('opening_balance', 'Opening balance'),
+    )
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='points_ledger')
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='points_ledger')
+    reason = models.CharField(max_length=30, choices=REASONS)
+    source_type = models.CharField(max_length=30)
+    source_id = models.PositiveBigIntegerField()
+    points = models.IntegerField()
+    participation_count = models.PositiveIntegerField(default=0)
+    contribution_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    rolled_up = models.BooleanField(default=False)
+    
+    class Meta:
+        # One award per user, club, reason and source object makes awarding idempotent
+        unique_together = ('user', 'club', 'reason', 'source_type', 'source_id')
+        indexes = [models.Index(fields=['rolled_up', 'club'])]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.club.name}: {self.points:+d} ({self.reason})"
+
 class Survey(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='surveys')
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -152,6 +338,8 @@ class Survey(models.Model):
     description = models.TextField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized, kept in step by clubs/surveys.py and corrected by reconcile_counters
+    respondent_count = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return self.title
@@ -188,11 +376,35 @@ class SurveyResponse(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.survey.title}"
 
+# Running totals per question, updated with F() on every submission so the
+# results page never reads individual responses; see clubs/surveys.py
+class SurveyQuestionStats(models.Model):
+    question = models.OneToOneField(SurveyQuestion, on_delete=models.CASCADE, related_name='stats')
+    answer_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.question} ({self.answer_count} answers)"
+
+# How many respondents picked each choice (or each star rating) of a question
+class SurveyAnswerCount(models.Model):
+    question = models.ForeignKey(SurveyQuestion, on_delete=models.CASCADE, related_name='answer_counts')
+    value = models.CharField(max_length=200)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('question', 'value')
+    
+    def __str__(self):
+        return f"{self.question} - {self.value}: {self.count}"
+
 class EventAttendance(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='attendances')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     checked_in_at = models.DateTimeField(auto_now_add=True)
     checked_in_via_qr = models.BooleanField(default=False)
+    # When the door scanner read the student's code, which may be before an offline sync
+    scanned_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         unique_together = ('event', 'user')
@@ -270,6 +482,10 @@ class ClubMeeting(models.Model):
     
     class Meta:
         ordering = ['-scheduled_time']
+        indexes = [
+            # /metrics counts the started meetings on every scrape
+            models.Index(fields=['status']),
+        ]
     
     def __str__(self):
         return f"{self.club.name} - {self.title}"
@@ -304,3 +520,118 @@ class ClubMeeting(models.Model):
         """Check if meeting is in the future"""
         from django.utils import timezone
         return self.scheduled_time > timezone.now() and self.status != 'ended'
+
+# One row per searchable object. SQLite mirrors these rows into an FTS5 table
+# and Postgres into a tsvector column; see clubs/search.py.
+class SearchDocument(models.Model):
+    OBJECT_TYPES = (
+        ('club', 'Club'),
+        ('event', 'Event'),
+        ('announcement', 'Announcement'),
+        ('user', 'User'),
+    )
+    
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=300)
+    tags = models.CharField(max_length=300, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('object_type', 'object_id')
+    
+    def __str__(self):
+        return f"{self.object_type} {self.object_id} - {self.title}"
+
+# Precomputed by the compute_recommendations command; see clubs/recommendations.py
+class ClubRecommendation(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='club_recommendations')
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='recommendations')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ('user', 'club')
+        indexes = [models.Index(fields=['user', 'rank'])]
+        ordering = ['rank']
+    
+    def __str__(self):
+        return f"{self.user.username} -> {self.club.name} (#{self.rank})"
+
+# Picked once a week by the select_featured_club command; see clubs/featured.py
+class FeaturedClub(models.Model):
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='featured_weeks')
+    valid_from = models.DateTimeField(unique=True)
+    valid_until = models.DateTimeField()
+    score = models.FloatField(default=0)
+    selected_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-valid_from']
+    
+    def __str__(self):
+        return f"{self.club.name} ({self.valid_from:%Y-%m-%d})"
+
+# Materialized activity timeline, one row per announcement, event and post,
+# written by the signal handlers in clubs/signals.py; see clubs/activity.py
+class ActivityItem(models.Model):
+    ITEM_TYPES = (
+        ('announcement', 'Announcement'),
+        ('event', 'Event'),
+        ('post', 'Post'),
+    )
+    
+    item_type = models.CharField(max_length=20, choices=ITEM_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, null=True, blank=True, related_name='activity_items')
+    title = models.CharField(max_length=200)
+    summary = models.TextField(blank=True)
+    location = models.CharField(max_length=200, blank=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ('item_type', 'object_id')
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['club', '-created_at', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.item_type} {self.object_id} - {self.title}"
+
+# Background work queued by views and run by `manage.py run_tasks`; see clubs/taskqueue.py
+class Task(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Random token written by the worker that claimed the task
+    claim = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+            models.Index(fields=['claim']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+from . import signals  # noqa: E402,F401  (connects the search index and other model signals)
@@ -0,0 +1,177 @@
+"""
+Member points: an append-only ledger folded into running totals.
+
+Awarding points is a single INSERT into ``PointsLedgerEntry``. The unique key
+(user, club, reason, source) makes it idempotent, so a double-clicked check-in
+or a retried request can't award twice, and nothing is read or locked first.
+``MemberPoints`` keeps the per-member totals the club leaderboards rank on, and
+``UserPoints`` each user's total over every club for the cross-club one. Both
+are brought up to date by ``rollup_points``, which takes unrolled entries in
+batches, adds them with one F() UPDATE per member (and per user) and marks them
+rolled up in the same transaction. Leaderboard pages only read the totals;
+the ``rollup_points`` command folds in new entries, once or every few seconds
+with ``--interval``.
+
+``rebuild_member_points`` recomputes every total from the ledger, for drift or
+after bulk loads.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, F, OuterRef, Q, Sum
+
+from .models import MemberPoints, PointsLedgerEntry, UserPoints
+
+# reason: (points, participation_count, contribution_count)
+AWARDS = {
+    'event_checkin': (10, 1, 0),
+    'survey_response': (5, 0, 1),
+    'club_post': (3, 0, 1),
+}
+ROLLUP_BATCH_SIZE = 1000
+
+
+def award_points(user, club, reason, source):
+    """Award the points for ``reason`` once per ``source`` object; False if already awarded"""
+    points, participation, contribution = AWARDS[reason]
+    try:
+        with transaction.atomic():
+            PointsLedgerEntry.objects.create(
+                user=user, club=club, reason=reason,
+                source_type=source._meta.model_name, source_id=source.pk, points=points,
+                participation_count=participation, contribution_count=contribution,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def award_points_bulk(user_ids, club, reason, source):
+    """award_points for many users with one INSERT; users already awarded for ``source`` are skipped"""
+    points, participation, contribution = AWARDS[reason]
+    PointsLedgerEntry.objects.bulk_create([
+        PointsLedgerEntry(
+            user_id=user_id, club=club, reason=reason,
+            source_type=source._meta.model_name, source_id=source.pk, points=points,
+            participation_count=participation, contribution_count=contribution,
+        )
+        for user_id in user_ids
+    ], ignore_conflicts=True)
+
+
+def rollup_batch(club=None, batch_size=ROLLUP_BATCH_SIZE):
+    """Fold one batch of unrolled entries into MemberPoints; returns how many were folded"""
+    pending = PointsLedgerEntry.objects.filter(rolled_up=False)
+    if club is not None:
+        pending = pending.filter(club=club)
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent rollups take disjoint batches instead of waiting on each other
+            pending = pending.select_for_update(skip_locked=True)
+        entries = list(
+            pending.order_by('pk').values_list(
+                'pk', 'user_id', 'club_id', 'points', 'participation_count', 'contribution_count'
+            )[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        totals = {}
+        for _, user_id, club_id, points, participation, contribution in entries:
+            total = totals.setdefault((user_id, club_id), [0, 0, 0])
+            total[0] += points
+            total[1] += participation
+            total[2] += contribution
+        MemberPoints.objects.bulk_create(
+            [MemberPoints(user_id=user_id, club_id=club_id) for user_id, club_id in totals],
+            ignore_conflicts=True,
+        )
+        user_totals = {}
+        for (user_id, club_id), (points, participation, contribution) in totals.items():
+            MemberPoints.objects.filter(user_id=user_id, club_id=club_id).update(
+                points=F('points') + points,
+                participation_count=F('participation_count') + participation,
+                contribution_count=F('contribution_count') + contribution,
+            )
+            user_totals[user_id] = user_totals.get(user_id, 0) + points
+        UserPoints.objects.bulk_create(
+            [UserPoints(user_id=user_id) for user_id in user_totals], ignore_conflicts=True,
+        )
+        for user_id, points in user_totals.items():
+            if points:
+                UserPoints.objects.filter(user_id=user_id).update(points=F('points') + points)
+
+        ids = [entry[0] for entry in entries]
+        if PointsLedgerEntry.objects.filter(pk__in=ids, rolled_up=False).update(rolled_up=True) != len(ids):
+            # Another rollup got to some of these first; undo ours rather than count them twice
+            transaction.set_rollback(True)
+            return 0
+    return len(entries)
+
+
+def rollup_points(club=None, batch_size=ROLLUP_BATCH_SIZE, max_batches=None):
+    """Fold unrolled ledger entries (optionally one club's) into MemberPoints"""
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        folded = rollup_batch(club=club, batch_size=batch_size)
+        if not folded:
+            break
+        total += folded
+        batches += 1
+    return total
+
+
+def record_opening_balances():
+    """Ledger entries for MemberPoints totals that have none, e.g. after seeding or before the ledger existed"""
+    has_entries = PointsLedgerEntry.objects.filter(user=OuterRef('user'), club=OuterRef('club'))
+    entries = [
+        PointsLedgerEntry(
+            user_id=row.user_id, club_id=row.club_id, reason='opening_balance',
+            source_type='memberpoints', source_id=row.pk, points=row.points,
+            participation_count=row.participation_count, contribution_count=row.contribution_count,
+            rolled_up=True,
+        )
+        for row in MemberPoints.objects.filter(~Exists(has_entries)).iterator(chunk_size=2000)
+    ]
+    PointsLedgerEntry.objects.bulk_create(entries, batch_size=2000, ignore_conflicts=True)
+    return len(entries)
+
+
+def rebuild_member_points(batch_size=2000):
+    """Recompute every MemberPoints total from the full ledger; returns the number of totals"""
+    with transaction.atomic():
+        sums = (
+            PointsLedgerEntry.objects.values('user_id', 'club_id')
+            .annotate(total=Sum('points'), participation=Sum('participation_count'),
+                      contribution=Sum('contribution_count'))
+            .order_by()
+        )
+        rows = [
+            MemberPoints(user_id=row['user_id'], club_id=row['club_id'], points=row['total'],
+                         participation_count=row['participation'], contribution_count=row['contribution'])
+            for row in sums.iterator(chunk_size=batch_size)
+        ]
+        has_entries = PointsLedgerEntry.objects.filter(user=OuterRef('user'), club=OuterRef('club'))
+        MemberPoints.objects.filter(~Exists(has_entries)).filter(
+            ~Q(points=0) | ~Q(participation_count=0) | ~Q(contribution_count=0)
+        ).update(points=0, participation_count=0, contribution_count=0)
+        MemberPoints.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True, unique_fields=['user', 'club'],
+            update_fields=['points', 'participation_count', 'contribution_count'],
+        )
+        PointsLedgerEntry.objects.filter(rolled_up=False).update(rolled_up=True)
+        rebuild_user_points(batch_size=batch_size)
+    return len(rows)
+
+
+def rebuild_user_points(batch_size=2000):
+    """Recompute every UserPoints total from MemberPoints, e.g. after MemberPoints was bulk loaded"""
+    with transaction.atomic():
+        rows = [
+            UserPoints(user_id=row['user_id'], points=row['total'])
+            for row in MemberPoints.objects.values('user_id').annotate(total=Sum('points'))
+            .order_by().iterator(chunk_size=batch_size)
+        ]
+        UserPoints.objects.exclude(user_id__in=MemberPoints.objects.values('user_id')).update(points=0)
+        UserPoints.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True, unique_fields=['user'], update_fields=['points'],
+        )
+    return len(rows)
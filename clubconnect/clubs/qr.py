@@ -0,0 +1,95 @@
+"""
+QR code images, rendered once and kept on disk by content hash.
+
+``qr_png(data)`` looks for ``qr_cache/<sha256 of data>.png`` in the default
+storage and only renders with ``qrcode`` on a miss. Check-in tokens are
+deterministic per registration (clubs/checkin.py), so a student's code is
+rendered once however often it's downloaded, and the hash doubles as the
+response's ETag.
+
+Rendering is kept off request threads where possible: registering for an
+event queues a task (clubs/taskqueue.py) that renders the student's code, and
+the event's own code is generated the same way.
+The founder's ZIP of every registrant's code streams through
+clubs/streaming.py, holding one image at a time.
+"""
+import hashlib
+import time
+from io import BytesIO
+
+import qrcode
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, HttpResponseNotModified
+
+from dashboard import metrics
+from .models import Event
+from .taskqueue import task
+
+QR_CACHE_DIR = 'qr_cache'
+# Browsers may reuse a downloaded code this long without asking again
+QR_MAX_AGE = 60 * 60 * 24 * 30
+
+
+def content_hash(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def cache_path(digest):
+    return f'{QR_CACHE_DIR}/{digest[:2]}/{digest}.png'
+
+
+def render_qr(data):
+    started = time.perf_counter()
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    metrics.observe('clubconnect_qr_generation_seconds', time.perf_counter() - started)
+    return buffer.getvalue()
+
+
+def qr_png(data):
+    """PNG bytes of the QR code for ``data``, from the on-disk cache when it's been rendered before"""
+    path = cache_path(content_hash(data))
+    if default_storage.exists(path):
+        with default_storage.open(path, 'rb') as cached:
+            return cached.read()
+    png = render_qr(data)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(png))
+    return png
+
+
+def qr_response(request, data, filename):
+    """The QR code for ``data`` as a download, revalidated by its content hash"""
+    etag = f'"{content_hash(data)}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(qr_png(data), content_type='image/png')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    # Codes are per student, so only the student's own browser may keep one
+    response['Cache-Control'] = f'private, max-age={QR_MAX_AGE}'
+    return response
+
+
+@task
+def pregenerate(items):
+    """Render and cache the codes for ``items`` (strings)"""
+    for data in items:
+        qr_png(data)
+
+
+@task
+def save_event_qr(event_id, data):
+    event = Event.objects.filter(pk=event_id).first()
+    if event is not None:
+        event.qr_code.save(f'qr_event_{event.pk}.png', ContentFile(qr_png(data)), save=True)
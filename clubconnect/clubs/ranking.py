@@ -0,0 +1,103 @@
+"""
+Leaderboards ranked by the database, per club and across all clubs.
+
+A ``Leaderboard`` wraps the rows it ranks: a club's ``MemberPoints`` or every
+user's ``UserPoints`` (their points summed over all clubs, maintained by
+clubs/points.py). Both tables have an index in rank order, ``(-points, user)``
+(prefixed by club for ``MemberPoints``), so each question is an index range
+read rather than a sort or a board loaded into Python:
+
+- top N and a page of the board: ``ORDER BY points DESC, user_id LIMIT``
+- a member's rank: ``COUNT(*) WHERE points > theirs``, plus one
+- the members around them: a short range read on either side of their key
+
+Ties share a rank (1, 2, 2, 4). Nothing is cached, so every process sees the
+same standings as soon as a rollup commits.
+"""
+from django.db.models import Q
+
+from accounts.models import User
+from .models import MemberPoints, UserPoints
+
+
+class Leaderboard:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return self.rows.count()
+
+    def ordered(self):
+        return self.rows.order_by('-points', 'user_id').values_list('user_id', 'points')
+
+    def rank_for_points(self, points):
+        return self.rows.filter(points__gt=points).count() + 1
+
+    def points(self, user_id):
+        return self.rows.filter(user_id=user_id).values_list('points', flat=True).first()
+
+    def rank(self, user_id):
+        """1-based rank shared by tied members, or None if the user isn't on the board"""
+        points = self.points(user_id)
+        return None if points is None else self.rank_for_points(points)
+
+    def ranked(self, rows, start):
+        """``(rank, user_id, points)`` for consecutive ``(user_id, points)`` rows from board position ``start``"""
+        entries = []
+        for offset, (user_id, points) in enumerate(rows):
+            if not entries:
+                rank = self.rank_for_points(points)
+            elif points != entries[-1][2]:
+                rank = start + offset + 1
+            else:
+                rank = entries[-1][0]
+            entries.append((rank, user_id, points))
+        return entries
+
+    def entries(self, start, stop):
+        """``(rank, user_id, points)`` for board positions ``start`` to ``stop``"""
+        start = max(start, 0)
+        return self.ranked(list(self.ordered()[start:stop]), start)
+
+    def top(self, count):
+        return self.entries(0, count)
+
+    def neighbors(self, user_id, distance=2):
+        """Entries from ``distance`` places above the user to ``distance`` below"""
+        points = self.points(user_id)
+        if points is None:
+            return []
+        ahead = Q(points__gt=points) | Q(points=points, user_id__lt=user_id)
+        above = list(
+            self.rows.filter(ahead).order_by('points', '-user_id').values_list('user_id', 'points')[:distance]
+        )[::-1]
+        below = list(self.ordered().exclude(ahead).exclude(user_id=user_id)[:distance])
+        position = self.rows.filter(ahead).count()
+        return self.ranked(above + [(user_id, points)] + below, position - len(above))
+
+
+def get_board(club_id=None):
+    """The club's board, or the cross-club one when ``club_id`` is None"""
+    if club_id is None:
+        return Leaderboard(UserPoints.objects.all())
+    return Leaderboard(MemberPoints.objects.filter(club_id=club_id))
+
+
+def leaderboard_rows(entries, club=None):
+    """Template rows for ``(rank, user_id, points)`` entries, with users and (per club) counts"""
+    user_ids = [user_id for _, user_id, _ in entries]
+    users = User.objects.in_bulk(user_ids)
+    counts = {}
+    if club is not None:
+        counts = {
+            row[0]: row[1:] for row in MemberPoints.objects.filter(club=club, user_id__in=user_ids)
+            .values_list('user_id', 'participation_count', 'contribution_count')
+        }
+    return [
+        {
+            'rank': rank, 'user': users[user_id], 'total_points': points,
+            'participation_count': counts.get(user_id, (0, 0))[0],
+            'contribution_count': counts.get(user_id, (0, 0))[1],
+        }
+        for rank, user_id, points in entries if user_id in users
+    ]
@@ -0,0 +1,149 @@
+"""
+Batch club recommendations for students.
+
+Run periodically by the compute_recommendations command; the dashboard only
+reads the stored ``ClubRecommendation`` rows. The whole computation is sparse
+matrix algebra:
+
+- ``X`` is the user x club interaction matrix: approved and pending memberships,
+  favorites and event check-ins, weighted and log-damped.
+- Club-club similarity is the cosine between club columns of ``X``
+  (co-membership), blended with the cosine between the clubs' tag vectors.
+- A user's scores are their interaction row times that similarity matrix,
+  computed for a block of users at a time. Clubs the user already belongs to
+  (or asked to join) are excluded, and a tiny popularity prior breaks ties and
+  gives brand new students the most popular clubs.
+"""
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from .models import Club, ClubRecommendation, ClubTag, EventAttendance, Membership
+
+MEMBERSHIP_WEIGHT = {'approved': 3.0, 'pending': 1.0}
+FAVORITE_WEIGHT = 2.0
+ATTENDANCE_WEIGHT = 1.0
+# Share of the similarity that comes from tag overlap rather than co-membership
+TAG_WEIGHT = 0.3
+POPULARITY_PRIOR = 1e-6
+# Upper bound on the dense score block (users x clubs) held in memory at once
+MAX_BLOCK_CELLS = 2_000_000
+
+
+def positions(ids, index):
+    """Row/column positions of ``ids`` in the sorted id array ``index``"""
+    return np.searchsorted(index, np.asarray(ids, dtype=np.int64))
+
+
+def pairs(queryset, *fields):
+    rows = list(queryset.values_list(*fields))
+    if not rows:
+        return [np.empty(0, dtype=np.int64) for _ in fields]
+    return [np.array(column, dtype=np.int64) for column in zip(*rows)]
+
+
+def interaction_matrix(user_ids, club_ids):
+    users, clubs, weights = [], [], []
+    for status, weight in MEMBERSHIP_WEIGHT.items():
+        user_col, club_col = pairs(Membership.objects.filter(status=status), 'user_id', 'club_id')
+        users.append(user_col)
+        clubs.append(club_col)
+        weights.append(np.full(len(user_col), weight))
+    user_col, club_col = pairs(Club.favorited_by.through.objects.all(), 'user_id', 'club_id')
+    users.append(user_col)
+    clubs.append(club_col)
+    weights.append(np.full(len(user_col), FAVORITE_WEIGHT))
+    user_col, club_col = pairs(EventAttendance.objects.all(), 'user_id', 'event__club_id')
+    users.append(user_col)
+    clubs.append(club_col)
+    weights.append(np.full(len(user_col), ATTENDANCE_WEIGHT))
+
+    matrix = sparse.coo_matrix(
+        (np.concatenate(weights), (positions(np.concatenate(users), user_ids),
+                                   positions(np.concatenate(clubs), club_ids))),
+        shape=(len(user_ids), len(club_ids)),
+    ).tocsr()  # duplicates (repeat check-ins at one club) are summed here
+    # A hundred check-ins shouldn't outweigh everything else the user did
+    matrix.data = np.log1p(matrix.data)
+    return matrix
+
+
+def cosine_similarity(matrix):
+    """Cosine similarity between the columns of ``matrix``, without self-similarity"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sparse.diags(1.0 / norms)
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def tag_matrix(club_ids):
+    """Club x tag incidence matrix"""
+    club_col, tag_col = pairs(ClubTag.objects.all(), 'club_id', 'tag_id')
+    tag_ids = np.unique(tag_col)
+    return sparse.csr_matrix(
+        (np.ones(len(club_col)), (positions(club_col, club_ids), positions(tag_col, tag_ids))),
+        shape=(len(club_ids), len(tag_ids)),
+    )
+
+
+def popularity_prior(club_ids):
+    counts = dict(Club.objects.values_list('pk', 'approved_member_count'))
+    popularity = np.array([counts[pk] for pk in club_ids], dtype=np.float64)
+    if popularity.max(initial=0) > 0:
+        popularity /= popularity.max()
+    return popularity * POPULARITY_PRIOR
+
+
+def compute_recommendations(top_n=10, tag_weight=TAG_WEIGHT, batch_size=2000):
+    """Replace every student's stored recommendations; returns (students, rows written)"""
+    club_ids = np.array(Club.objects.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+    user_ids = np.array(User.objects.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+    students = np.array(
+        User.objects.filter(user_type='student').order_by('pk').values_list('pk', flat=True), dtype=np.int64
+    )
+    computed_at = timezone.now()
+    if not len(club_ids) or not len(students):
+        ClubRecommendation.objects.all().delete()
+        return len(students), 0
+
+    interactions = interaction_matrix(user_ids, club_ids)
+    similarity = (1 - tag_weight) * cosine_similarity(interactions)
+    similarity = similarity + tag_weight * cosine_similarity(tag_matrix(club_ids).T)
+    user_col, club_col = pairs(Membership.objects.all(), 'user_id', 'club_id')
+    joined = sparse.csr_matrix(
+        (np.ones(len(user_col)), (positions(user_col, user_ids), positions(club_col, club_ids))),
+        shape=interactions.shape,
+    )
+    prior = popularity_prior(club_ids)
+    top_n = min(top_n, len(club_ids))
+    block = max(1, MAX_BLOCK_CELLS // len(club_ids))
+
+    written = 0
+    with transaction.atomic():
+        ClubRecommendation.objects.all().delete()
+        for start in range(0, len(students), block):
+            rows = positions(students[start:start + block], user_ids)
+            scores = (interactions[rows] @ similarity).toarray() + prior
+            scores[joined[rows].nonzero()] = -np.inf
+            best = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1)
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+            batch = [
+                ClubRecommendation(user_id=int(user_id), club_id=int(club_ids[club]), rank=rank + 1,
+                                   score=float(score), computed_at=computed_at)
+                for user_id, clubs, user_scores in zip(students[start:start + block], best, best_scores)
+                for rank, (club, score) in enumerate(zip(clubs, user_scores))
+                if np.isfinite(score)
+            ]
+            ClubRecommendation.objects.bulk_create(batch, batch_size=batch_size)
+            written += len(batch)
+    return len(students), written
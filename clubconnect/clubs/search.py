@@ -0,0 +1,234 @@
+"""
+Ranked full-text search over clubs, events, announcements and users.
+
+Every searchable object has one ``SearchDocument`` row, kept current by the
+signal handlers in clubs/signals.py. The database does the matching and
+ranking through its own full-text index, so queries never scan the source
+tables:
+
+- SQLite: an external-content FTS5 table (``clubs_searchdocument_fts``) kept in
+  sync with ``clubs_searchdocument`` by triggers, ranked with bm25().
+- Postgres: a generated ``search_vector`` tsvector column with a GIN index,
+  ranked with ts_rank_cd().
+
+Other backends fall back to ``icontains`` on the document table.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from accounts.models import User
+from .models import Announcement, Club, Event, SearchDocument
+
+FTS_TABLE = 'clubs_searchdocument_fts'
+# Relative weight of title, tags and body matches
+WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def club_document(club):
+    return club.name, club.domain_tags, f'{club.short_description}\n{club.long_description}'
+
+
+def event_document(event):
+    return event.title, event.location, event.description
+
+
+def announcement_document(announcement):
+    return announcement.title, '', announcement.content
+
+
+def user_document(user):
+    full_name = f'{user.first_name} {user.last_name}'.strip()
+    return user.username, user.department or '', full_name
+
+
+# object_type -> (model, function returning (title, tags, body), fields that function reads)
+SEARCH_MODELS = {
+    'club': (Club, club_document, {'name', 'domain_tags', 'short_description', 'long_description'}),
+    'event': (Event, event_document, {'title', 'location', 'description'}),
+    'announcement': (Announcement, announcement_document, {'title', 'content'}),
+    'user': (User, user_document, {'username', 'department', 'first_name', 'last_name'}),
+}
+
+
+def object_type_for(model):
+    for object_type, (search_model, _, _) in SEARCH_MODELS.items():
+        if issubclass(model, search_model):
+            return object_type
+    return None
+
+
+def affects_document(instance, update_fields):
+    """False when a save only touched fields the search document doesn't use (e.g. last_login)"""
+    if update_fields is None:
+        return True
+    return bool(set(update_fields) & SEARCH_MODELS[object_type_for(type(instance))][2])
+
+
+def build_document(object_type, instance):
+    title, tags, body = SEARCH_MODELS[object_type][1](instance)
+    return SearchDocument(object_type=object_type, object_id=instance.pk, title=title[:300], tags=tags[:300],
+                          body=body)
+
+
+def index_object(instance):
+    object_type = object_type_for(type(instance))
+    document = build_document(object_type, instance)
+    SearchDocument.objects.update_or_create(
+        object_type=object_type, object_id=instance.pk,
+        defaults={'title': document.title, 'tags': document.tags, 'body': document.body},
+    )
+
+
+def remove_object(instance):
+    SearchDocument.objects.filter(object_type=object_type_for(type(instance)), object_id=instance.pk).delete()
+
+
+def query_terms(query):
+    return re.findall(r'\w+', query.lower())[:10]
+
+
+class SearchResults:
+    """
+    Lazily evaluated ranked hits, sliceable so it can be handed to a Paginator.
+
+    Slicing returns ``(object_type, object_id)`` pairs in rank order; ``count()``
+    counts matches through the same index. ``club_tag`` restricts the hits to
+    clubs carrying that tag slug.
+    """
+
+    def __init__(self, query, object_types=None, club_tag=None):
+        self.terms = query_terms(query)
+        self.object_types = list(object_types or SEARCH_MODELS)
+        self.club_tag = club_tag
+        self._count = None
+
+    def _type_filter(self, column):
+        placeholders = ', '.join(['%s'] * len(self.object_types))
+        sql, params = f'{column} IN ({placeholders})', list(self.object_types)
+        if self.club_tag:
+            id_column = column.replace('object_type', 'object_id')
+            sql += (
+                f" AND {column} = 'club' AND {id_column} IN (SELECT ct.club_id FROM clubs_clubtag ct "
+                "JOIN clubs_tag t ON t.id = ct.tag_id WHERE t.slug = %s)"
+            )
+            params.append(self.club_tag)
+        return sql, params
+
+    def _sqlite_match(self):
+        # Every term must match; the trailing * makes the last term a prefix as you type
+        quoted = [f'"{term}"' for term in self.terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def _postgres_query(self):
+        return ' & '.join(self.terms[:-1] + [f'{self.terms[-1]}:*'])
+
+    def _fallback(self):
+        queryset = SearchDocument.objects.filter(object_type__in=self.object_types)
+        if self.club_tag:
+            queryset = queryset.filter(
+                object_type='club',
+                object_id__in=Club.objects.filter(tags__slug=self.club_tag).values('pk'),
+            )
+        for term in self.terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(tags__icontains=term) | Q(body__icontains=term))
+        return queryset.order_by('title', 'pk')
+
+    def count(self):
+        if self._count is None:
+            if not self.terms:
+                self._count = 0
+            elif connection.vendor == 'sqlite':
+                type_sql, type_params = self._type_filter('d.object_type')
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(*) FROM {FTS_TABLE} JOIN clubs_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+                        f'WHERE {FTS_TABLE} MATCH %s AND {type_sql}',
+                        [self._sqlite_match()] + type_params,
+                    )
+                    self._count = cursor.fetchone()[0]
+            elif connection.vendor == 'postgresql':
+                type_sql, type_params = self._type_filter('object_type')
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM clubs_searchdocument "
+                        f"WHERE search_vector @@ to_tsquery('english', %s) AND {type_sql}",
+                        [self._postgres_query()] + type_params,
+                    )
+                    self._count = cursor.fetchone()[0]
+            else:
+                self._count = self._fallback().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        limit = (index.stop if index.stop is not None else self.count()) - start
+        if not self.terms or limit <= 0:
+            return []
+
+        if connection.vendor == 'sqlite':
+            type_sql, type_params = self._type_filter('d.object_type')
+            sql = (
+                f'SELECT d.object_type, d.object_id FROM {FTS_TABLE} '
+                f'JOIN clubs_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+                f'WHERE {FTS_TABLE} MATCH %s AND {type_sql} '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s, %s), d.id LIMIT %s OFFSET %s'
+            )
+            params = [self._sqlite_match()] + type_params + list(WEIGHTS) + [limit, start]
+        elif connection.vendor == 'postgresql':
+            type_sql, type_params = self._type_filter('object_type')
+            sql = (
+                "SELECT object_type, object_id FROM clubs_searchdocument, to_tsquery('english', %s) query "
+                f"WHERE search_vector @@ query AND {type_sql} "
+                "ORDER BY ts_rank_cd(search_vector, query) DESC, id LIMIT %s OFFSET %s"
+            )
+            params = [self._postgres_query()] + type_params + [limit, start]
+        else:
+            return list(self._fallback().values_list('object_type', 'object_id')[start:start + limit])
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def load_objects(hits):
+    """Turn ``(object_type, object_id)`` hits into model instances, keeping rank order"""
+    ids_by_type = {}
+    for object_type, object_id in hits:
+        ids_by_type.setdefault(object_type, []).append(object_id)
+    loaded = {
+        object_type: SEARCH_MODELS[object_type][0].objects.in_bulk(ids)
+        for object_type, ids in ids_by_type.items()
+    }
+    # A hit whose object vanished since the last index update is skipped
+    return [
+        (object_type, loaded[object_type][object_id])
+        for object_type, object_id in hits if object_id in loaded[object_type]
+    ]
+
+
+def rebuild_index(batch_size=2000):
+    """Replace every search document with one freshly built from its source row"""
+    SearchDocument.objects.all().delete()
+    total = 0
+    for object_type, (model, _, _) in SEARCH_MODELS.items():
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(build_document(object_type, instance))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        total += len(batch)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return total
@@ -0,0 +1,324 @@
+"""
+Deterministic synthetic data for benchmarks and load tests.
+
+``seed_dataset`` fills the database with a realistic graph of users, clubs and
+activity using ``bulk_create``. The same ``seed`` always produces the same rows,
+so benchmark runs against different code are comparable. Dates are offsets from
+a fixed ``EPOCH`` rather than the clock, for the same reason.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.core.management import call_command
+
+from accounts.models import User
+from .models import (
+    Announcement, BroadcastNotification, Club, ClubFeedback, ClubMeeting, ClubPost, Conversation, Event,
+    EventAttendance, MemberPoints, Membership, MentorSession, Message, Notification, Survey, SurveyQuestion,
+    SurveyResponse,
+)
+from .points import rebuild_user_points, record_opening_balances
+from .surveys import rebuild_survey_aggregates
+from .tags import rebuild_club_tags
+
+TAGS = [
+    'AI', 'Robotics', 'Music', 'Dance', 'Drama', 'Sports', 'Football', 'Chess', 'Coding', 'Design',
+    'Photography', 'Debate', 'Finance', 'Entrepreneurship', 'Art', 'Literature', 'Gaming', 'Volunteering',
+]
+WORDS = (
+    'club meeting event workshop hackathon talk session project team build learn share community '
+    'campus student weekly update practice match concert exhibition seminar guest speaker social'
+).split()
+
+# Seeded events, meetings and sessions fall within two months either side of this
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def counts_for_scale(rows):
+    """Split a rough total row budget across the tables the way real usage skews"""
+    return {
+        'users': max(12, rows // 25),
+        'clubs': max(3, rows // 500),
+        'memberships': max(10, rows // 8),
+        'favorites': max(5, rows // 40),
+        'events': max(3, rows // 200),
+        'attendances': max(10, rows // 10),
+        'posts': max(3, rows // 100),
+        'likes': max(10, rows // 10),
+        'announcements': max(2, rows // 200),
+        'surveys': max(1, rows // 1000),
+        'questions_per_survey': 4,
+        'survey_respondents': max(3, rows // 80),
+        'messages': max(10, rows // 5),
+        'notifications': max(10, rows // 5),
+        'broadcasts': max(1, rows // 2000),
+        'feedbacks': max(2, rows // 500),
+        'mentor_sessions': max(2, rows // 500),
+        'meetings': max(2, rows // 500),
+    }
+
+
+def usernames(counts):
+    """The usernames ``DatasetSeeder`` creates for ``counts``, grouped by user type"""
+    founder_count = max(2, counts['clubs'])
+    return {
+        'admin': [f'load_admin_{i}' for i in range(2)],
+        'founder': [f'load_founder_{i}' for i in range(founder_count)],
+        'student': [f'load_student_{i}' for i in range(max(10, counts['users'] - founder_count - 2))],
+    }
+
+
+class DatasetSeeder:
+    def __init__(self, counts, seed=0, batch_size=2000, stdout=None, passwords=None, epoch=EPOCH):
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.stdout = stdout
+        # username -> password hash; users without one get an unusable password
+        self.passwords = passwords or {}
+        self.epoch = epoch
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def text(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def skewed_index(self, size):
+        # Popularity follows a rough power law: a few clubs and users get most activity
+        return min(int(size * self.rng.random() ** 3), size - 1)
+
+    def event_times(self):
+        start = self.epoch + timedelta(days=self.rng.randint(-60, 60), hours=self.rng.randint(8, 20))
+        return start, start + timedelta(hours=self.rng.randint(1, 4))
+
+    def unique_pairs(self, count, left, right):
+        """``count`` distinct (left, right) pairs with popular items on the right preferred"""
+        count = min(count, len(left) * len(right))
+        pairs = set()
+        while len(pairs) < count:
+            pairs.add((self.rng.choice(left), right[self.skewed_index(len(right))]))
+        return sorted(pairs, key=lambda pair: (pair[0].pk, pair[1].pk))
+
+    def create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.log(f"  {model.__name__}: {len(created)}")
+        return created
+
+    def seed(self):
+        c = self.counts
+        self.log("Seeding dataset...")
+
+        names = usernames(c)
+        admins = self.create(User, [
+            User(username=name, email=f'{name}@example.com', password=self.passwords.get(name, '!'),
+                 user_type='admin', is_staff=True)
+            for name in names['admin']
+        ])
+        founders = self.create(User, [
+            User(username=name, email=f'{name}@example.com', password=self.passwords.get(name, '!'),
+                 user_type='founder', first_name=self.rng.choice(WORDS).title())
+            for name in names['founder']
+        ])
+        students = self.create(User, [
+            User(username=name, email=f'{name}@example.com', password=self.passwords.get(name, '!'),
+                 user_type='student', first_name=self.rng.choice(WORDS).title(),
+                 department=self.rng.choice(['CS', 'EE', 'ME', 'Arts', 'Business']))
+            for name in names['student']
+        ])
+        everyone = admins + founders + students
+
+        clubs = self.create(Club, [
+            Club(
+                name=f'{self.rng.choice(TAGS)} Club {i}',
+                short_description=self.text(8),
+                long_description=self.text(40),
+                domain_tags=', '.join(self.rng.sample(TAGS, 3)),
+                president=self.rng.choice(students),
+            )
+            for i in range(c['clubs'])
+        ])
+        Founders = Club.founders.through
+        Founders.objects.bulk_create([
+            Founders(club_id=club.pk, user_id=founders[i % len(founders)].pk) for i, club in enumerate(clubs)
+        ], batch_size=self.batch_size)
+        rebuild_club_tags(clubs)
+
+        memberships = self.create(Membership, [
+            Membership(user=user, club=club, status='approved' if self.rng.random() < 0.85 else 'pending')
+            for user, club in self.unique_pairs(c['memberships'], students, clubs)
+        ])
+        Favorites = Club.favorited_by.through
+        Favorites.objects.bulk_create([
+            Favorites(club_id=club.pk, user_id=user.pk)
+            for user, club in self.unique_pairs(c['favorites'], students, clubs)
+        ], batch_size=self.batch_size)
+
+        events = self.create(Event, [
+            Event(
+                club=clubs[self.skewed_index(len(clubs))],
+                title=self.text(3),
+                description=self.text(30),
+                location=f'Hall {self.rng.randint(1, 20)}',
+                start_time=start_time,
+                end_time=end_time,
+            )
+            for start_time, end_time in (self.event_times() for _ in range(c['events']))
+        ])
+        attendances = []
+        for user, event in self.unique_pairs(c['attendances'], students, events):
+            checked_in = self.rng.random() < 0.5
+            attendances.append(EventAttendance(
+                user=user, event=event, checked_in_via_qr=checked_in,
+                scanned_at=event.start_time if checked_in else None,
+            ))
+        self.create(EventAttendance, attendances)
+
+        posts = self.create(ClubPost, [
+            ClubPost(
+                club=clubs[self.skewed_index(len(clubs))],
+                author=self.rng.choice(founders),
+                post_type=self.rng.choice(['event', 'info', 'meme', 'general']),
+                title=self.text(4),
+                content=self.text(40),
+            )
+            for _ in range(c['posts'])
+        ])
+        Likes = ClubPost.likes.through
+        Likes.objects.bulk_create([
+            Likes(clubpost_id=post.pk, user_id=user.pk)
+            for user, post in self.unique_pairs(c['likes'], students, posts)
+        ], batch_size=self.batch_size)
+
+        self.create(Announcement, [
+            Announcement(
+                club=clubs[self.skewed_index(len(clubs))] if self.rng.random() < 0.8 else None,
+                author=self.rng.choice(founders),
+                title=self.text(4),
+                content=self.text(30),
+            )
+            for _ in range(c['announcements'])
+        ])
+
+        surveys = self.create(Survey, [
+            Survey(club=clubs[self.skewed_index(len(clubs))], creator=self.rng.choice(founders),
+                   title=self.text(4), description=self.text(15))
+            for _ in range(c['surveys'])
+        ])
+        question_types = ['choice', 'rating', 'text', 'choice']
+        questions = self.create(SurveyQuestion, [
+            SurveyQuestion(
+                survey=survey,
+                question_text=self.text(8) + '?',
+                question_type=question_types[order % len(question_types)],
+                choices='Yes, No, Maybe' if question_types[order % len(question_types)] == 'choice' else '',
+                order=order,
+            )
+            for survey in surveys for order in range(c['questions_per_survey'])
+        ])
+        questions_by_survey = {}
+        for question in questions:
+            questions_by_survey.setdefault(question.survey_id, []).append(question)
+        responses = []
+        for user, survey in self.unique_pairs(c['survey_respondents'], students, surveys):
+            for question in questions_by_survey[survey.pk]:
+                if question.question_type == 'choice':
+                    answer = self.rng.choice(['Yes', 'No', 'Maybe'])
+                elif question.question_type == 'rating':
+                    answer = str(self.rng.randint(1, 5))
+                else:
+                    answer = self.text(10)
+                responses.append(SurveyResponse(survey=survey, user=user, question=question, answer=answer))
+        self.create(SurveyResponse, responses)
+        rebuild_survey_aggregates()
+
+        messages = []
+        for _ in range(c['messages']):
+            sender = everyone[self.skewed_index(len(everyone))]
+            receiver = self.rng.choice(everyone)
+            if receiver.pk == sender.pk:
+                continue
+            messages.append(Message(sender=sender, receiver=receiver, content=self.text(12),
+                                    is_read=self.rng.random() < 0.7))
+        messages = self.create(Message, messages)
+        self.build_conversations(messages)
+
+        self.create(Notification, [
+            Notification(
+                user=everyone[self.skewed_index(len(everyone))],
+                notification_type=self.rng.choice(['announcement', 'event', 'membership', 'message', 'general']),
+                title=self.text(5),
+                message=self.text(15),
+                link='/dashboard/',
+                is_read=self.rng.random() < 0.6,
+            )
+            for _ in range(c['notifications'])
+        ])
+        self.create(BroadcastNotification, [
+            BroadcastNotification(notification_type='announcement', title=self.text(5), message=self.text(15),
+                                  link='/dashboard/')
+            for _ in range(c['broadcasts'])
+        ])
+
+        self.create(ClubFeedback, [
+            ClubFeedback(club=clubs[self.skewed_index(len(clubs))], student=self.rng.choice(students),
+                         title=self.text(4), description=self.text(20))
+            for _ in range(c['feedbacks'])
+        ])
+        self.create(MentorSession, [
+            MentorSession(club=clubs[self.skewed_index(len(clubs))], student=self.rng.choice(students),
+                          mentor_topic=self.text(3), description=self.text(15),
+                          preferred_date=self.epoch + timedelta(days=self.rng.randint(1, 30)))
+            for _ in range(c['mentor_sessions'])
+        ])
+        meetings = []
+        for _ in range(c['meetings']):
+            club = clubs[self.skewed_index(len(clubs))]
+            meetings.append(ClubMeeting(
+                club=club, title=self.text(3), description=self.text(15),
+                scheduled_time=self.epoch + timedelta(days=self.rng.randint(1, 30)),
+                created_by=self.rng.choice(founders),
+                meeting_link=f'/clubs/{club.pk}/meeting/{self.rng.getrandbits(48):012x}/',
+            ))
+        self.create(ClubMeeting, meetings)
+
+        approved = [m for m in memberships if m.status == 'approved']
+        self.create(MemberPoints, [
+            MemberPoints(user_id=m.user_id, club_id=m.club_id, points=self.rng.randint(0, 200),
+                         participation_count=self.rng.randint(0, 20), contribution_count=self.rng.randint(0, 20))
+            for m in approved
+        ])
+        record_opening_balances()
+        rebuild_user_points(batch_size=self.batch_size)
+
+        # bulk_create skips the model signals, so derived data is rebuilt in one pass
+        call_command('reconcile_counters', batch_size=self.batch_size, stdout=StringIO())
+        call_command('rebuild_search_index', batch_size=self.batch_size, stdout=StringIO())
+        call_command('build_autocomplete_index', stdout=StringIO())
+        call_command('rebuild_activity_feed', batch_size=self.batch_size, stdout=StringIO())
+        call_command('compute_recommendations', batch_size=self.batch_size, stdout=StringIO())
+        call_command('select_featured_club', stdout=StringIO())
+        self.log("Done.")
+
+    def build_conversations(self, messages):
+        conversations = {}
+        for message in messages:
+            low, high = Conversation.pair(message.sender_id, message.receiver_id)
+            conversation = conversations.setdefault(
+                (low, high), Conversation(user_low_id=low, user_high_id=high)
+            )
+            conversation.last_message_id = message.pk
+            conversation.last_message_preview = message.content[:200]
+            conversation.last_message_at = message.created_at
+            if not message.is_read:
+                if message.receiver_id == low:
+                    conversation.unread_low += 1
+                else:
+                    conversation.unread_high += 1
+        self.create(Conversation, list(conversations.values()))
+
+
+def seed_dataset(rows, seed=0, batch_size=2000, stdout=None, epoch=EPOCH):
+    DatasetSeeder(counts_for_scale(rows), seed=seed, batch_size=batch_size, stdout=stdout, epoch=epoch).seed()
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Announcement, Club, ClubPost, Event, Membership
+from . import activity, autocomplete, feed, search, tags
+
+
+@receiver(post_save, sender=Club)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and search.affects_document(instance, update_fields):
+        search.index_object(instance)
+
+
+@receiver(post_delete, sender=Club)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+@receiver(post_save, sender=Club)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_autocomplete_entry(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        autocomplete.record_save(instance, update_fields)
+
+
+@receiver(post_delete, sender=Club)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_autocomplete_entry(sender, instance, **kwargs):
+    autocomplete.record_delete(instance)
+
+
+@receiver(post_save, sender=Club)
+def update_club_tags(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or 'domain_tags' in update_fields):
+        tags.sync_club_tags(instance)
+
+
+@receiver(post_delete, sender=Club)
+def invalidate_club_tag_facets(sender, instance, **kwargs):
+    tags.invalidate_tag_facets()
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=ClubPost)
+def update_activity_item(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    recorded = activity.record_activity(instance, update_fields)
+    if recorded and recorded[1]:
+        feed.schedule_push(recorded[0])
+
+
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=ClubPost)
+def remove_activity_item(sender, instance, **kwargs):
+    activity.remove_activity(instance)
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_member_feed(sender, instance, **kwargs):
+    feed.invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Club.favorited_by.through)
+def invalidate_favorite_feeds(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # pk_set isn't provided for clears, so collect the affected users first
+        user_ids = [instance.pk] if reverse else list(instance.favorited_by.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        user_ids = [instance.pk] if reverse else pk_set
+    else:
+        return
+    for user_id in user_ids:
+        feed.invalidate_user(user_id)
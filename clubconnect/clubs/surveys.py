@@ -0,0 +1,184 @@
+"""
+Survey submission and pre-aggregated results.
+
+A submission is written in one transaction: every answer goes in with a single
+``bulk_create``, and the same transaction bumps the per-question running totals
+(``SurveyQuestionStats``, ``SurveyAnswerCount``) and the survey's respondent
+count with F() expressions. The results page reads only those totals, so its
+cost depends on the number of questions, not on how many people responded.
+Free text answers are the exception: only the latest few are shown.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Survey, SurveyAnswerCount, SurveyQuestionStats, SurveyResponse
+
+RATING_VALUES = ('1', '2', '3', '4', '5')
+# Latest free text answers listed per question on the results page
+TEXT_ANSWERS_SHOWN = 50
+
+
+def count_value(answer):
+    """The key an answer is counted under: SurveyAnswerCount.value holds at most 200 characters"""
+    return answer[:SurveyAnswerCount._meta.get_field('value').max_length]
+
+
+def choice_list(question):
+    return [choice.strip() for choice in question.choices.split(',') if choice.strip()]
+
+
+def clean_answer(question, answer):
+    """The answer to store, or None if it's empty or not one of the question's options"""
+    answer = (answer or '').strip()
+    if not answer:
+        return None
+    if question.question_type == 'choice' and answer not in choice_list(question):
+        return None
+    if question.question_type == 'rating' and answer not in RATING_VALUES:
+        return None
+    return answer
+
+
+def record_answers(answers):
+    """Add ``{question: answer}`` from one respondent to the running totals"""
+    if not answers:
+        return
+    SurveyQuestionStats.objects.bulk_create(
+        [SurveyQuestionStats(question=question) for question in answers], ignore_conflicts=True
+    )
+    # One UPDATE per distinct rating increment (0 for non-rating questions), at most six
+    by_increment = {}
+    for question, answer in answers.items():
+        increment = int(answer) if question.question_type == 'rating' else 0
+        by_increment.setdefault(increment, []).append(question.pk)
+    for increment, question_ids in by_increment.items():
+        SurveyQuestionStats.objects.filter(question_id__in=question_ids).update(
+            answer_count=F('answer_count') + 1, rating_sum=F('rating_sum') + increment,
+        )
+
+    counted = [
+        (question, count_value(answer)) for question, answer in answers.items() if question.question_type != 'text'
+    ]
+    if counted:
+        SurveyAnswerCount.objects.bulk_create(
+            [SurveyAnswerCount(question=question, value=answer) for question, answer in counted],
+            ignore_conflicts=True,
+        )
+        match = Q()
+        for question, answer in counted:
+            match |= Q(question=question, value=answer)
+        SurveyAnswerCount.objects.filter(match).update(count=F('count') + 1)
+
+
+def submit_survey(survey, user, answers):
+    """
+    Store one respondent's ``{question: raw answer}``; returns the saved responses.
+
+    Raises IntegrityError (with nothing written) if the user already responded.
+    """
+    cleaned = {}
+    for question, answer in answers.items():
+        answer = clean_answer(question, answer)
+        if answer is not None:
+            cleaned[question] = answer
+    responses = [
+        SurveyResponse(survey=survey, user=user, question=question, answer=answer)
+        for question, answer in cleaned.items()
+    ]
+    with transaction.atomic():
+        SurveyResponse.objects.bulk_create(responses)
+        record_answers(cleaned)
+        if responses:
+            Survey.objects.filter(pk=survey.pk).update(respondent_count=F('respondent_count') + 1)
+    return responses
+
+
+def percent(count, total):
+    return round(100 * count / total) if total else 0
+
+
+def survey_results(survey):
+    """One result dict per question, built from the running totals"""
+    questions = list(survey.questions.select_related('stats'))
+    counts = {}
+    for question_id, value, count in SurveyAnswerCount.objects.filter(
+        question__survey=survey
+    ).values_list('question_id', 'value', 'count'):
+        counts.setdefault(question_id, {})[value] = count
+
+    results = []
+    for question in questions:
+        stats = getattr(question, 'stats', None)
+        answered = stats.answer_count if stats else 0
+        result = {'question': question, 'answer_count': answered}
+        question_counts = counts.get(question.pk, {})
+        if question.question_type == 'choice':
+            result['choices'] = [
+                {'label': choice, 'count': question_counts.get(count_value(choice), 0),
+                 'percent': percent(question_counts.get(count_value(choice), 0), answered)}
+                for choice in choice_list(question)
+            ]
+        elif question.question_type == 'rating':
+            rated = sum(question_counts.get(value, 0) for value in RATING_VALUES)
+            result['average'] = stats.rating_sum / rated if stats and rated else 0
+            result['distribution'] = [
+                {'rating': int(value), 'count': question_counts.get(value, 0),
+                 'percent': percent(question_counts.get(value, 0), rated)}
+                for value in RATING_VALUES
+            ]
+        else:
+            result['responses'] = list(
+                SurveyResponse.objects.filter(question=question).order_by('-created_at', '-id')
+                .values_list('answer', flat=True)[:TEXT_ANSWERS_SHOWN]
+            )
+        results.append(result)
+    return results
+
+
+def tally_responses(responses, stats_model=SurveyQuestionStats, count_model=SurveyAnswerCount):
+    """
+    Unsaved running totals for the ``responses`` queryset: one ``stats_model``
+    row per question and one ``count_model`` row per counted value. The models
+    default to the app's and can be a migration's historical ones.
+    """
+    totals = dict(responses.values('question_id').annotate(n=Count('pk')).values_list('question_id', 'n'))
+    rating_sums = {}
+    value_counts = {}
+    for question_id, question_type, value, count in (
+        responses.exclude(question__question_type='text')
+        .values('question_id', 'question__question_type', 'answer').annotate(n=Count('pk'))
+        .values_list('question_id', 'question__question_type', 'answer', 'n')
+    ):
+        # Answers that only differ past the stored length share a count, as in record_answers
+        key = (question_id, count_value(value))
+        value_counts[key] = value_counts.get(key, 0) + count
+        if question_type == 'rating' and value in RATING_VALUES:
+            rating_sums[question_id] = rating_sums.get(question_id, 0) + int(value) * count
+    stats = [
+        stats_model(question_id=question_id, answer_count=total, rating_sum=rating_sums.get(question_id, 0))
+        for question_id, total in totals.items()
+    ]
+    counts = [
+        count_model(question_id=question_id, value=value, count=count)
+        for (question_id, value), count in value_counts.items()
+    ]
+    return stats, counts
+
+
+def rebuild_survey_aggregates(survey_ids=None):
+    """Recompute the running totals from the stored responses (after bulk loads or to fix drift)"""
+    responses = SurveyResponse.objects.all()
+    stats = SurveyQuestionStats.objects.all()
+    answer_counts = SurveyAnswerCount.objects.all()
+    if survey_ids is not None:
+        responses = responses.filter(survey_id__in=survey_ids)
+        stats = stats.filter(question__survey_id__in=survey_ids)
+        answer_counts = answer_counts.filter(question__survey_id__in=survey_ids)
+
+    with transaction.atomic():
+        stats.delete()
+        answer_counts.delete()
+        new_stats, new_counts = tally_responses(responses)
+        SurveyQuestionStats.objects.bulk_create(new_stats, batch_size=2000)
+        SurveyAnswerCount.objects.bulk_create(new_counts, batch_size=2000)
+    return len(new_stats)
@@ -0,0 +1,82 @@
+"""
+Normalized club tags.
+
+``Club.domain_tags`` stays the editable comma separated field; every save
+parses it into ``Tag`` rows linked through ``ClubTag``, so filtering by tag is
+an indexed join instead of a substring scan. Per-tag club counts for the facet
+lists are computed once and cached until a club's tags change.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils.text import slugify
+
+from .models import ClubTag, Tag
+
+TAG_FACETS_KEY = 'club_tag_facets'
+TAG_FACETS_TIMEOUT = 60 * 60
+
+
+def parse_tags(value):
+    """``{slug: display name}`` for a comma separated tag string, first spelling wins"""
+    tags = {}
+    for raw in (value or '').split(','):
+        name = ' '.join(raw.split())[:50]
+        slug = slugify(name)[:50]
+        if slug and slug not in tags:
+            tags[slug] = name
+    return tags
+
+
+def get_or_create_tags(tags):
+    """Map each slug in ``{slug: name}`` to its Tag id, creating missing tags"""
+    tag_ids = dict(Tag.objects.filter(slug__in=tags).values_list('slug', 'id'))
+    missing = [Tag(slug=slug, name=name) for slug, name in tags.items() if slug not in tag_ids]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(slug__in=tags).values_list('slug', 'id'))
+    return tag_ids
+
+
+def sync_club_tags(club):
+    wanted = set(get_or_create_tags(parse_tags(club.domain_tags)).values())
+    current = set(ClubTag.objects.filter(club=club).values_list('tag_id', flat=True))
+    if wanted == current:
+        return
+    ClubTag.objects.filter(club=club, tag_id__in=current - wanted).delete()
+    ClubTag.objects.bulk_create([ClubTag(club=club, tag_id=tag_id) for tag_id in wanted - current],
+                                ignore_conflicts=True)
+    invalidate_tag_facets()
+
+
+def rebuild_club_tags(clubs):
+    """Re-link every club in ``clubs`` from its domain_tags in bulk (after bulk_create skips signals)"""
+    parsed = {club.pk: parse_tags(club.domain_tags) for club in clubs}
+    all_tags = {}
+    for tags in parsed.values():
+        for slug, name in tags.items():
+            all_tags.setdefault(slug, name)
+    tag_ids = get_or_create_tags(all_tags)
+    ClubTag.objects.filter(club_id__in=parsed).delete()
+    ClubTag.objects.bulk_create([
+        ClubTag(club_id=club_id, tag_id=tag_ids[slug]) for club_id, tags in parsed.items() for slug in tags
+    ], batch_size=2000)
+    invalidate_tag_facets()
+
+
+def invalidate_tag_facets():
+    transaction.on_commit(lambda: cache.delete(TAG_FACETS_KEY))
+
+
+def get_tag_facets():
+    """Tags in use with their club counts, most used first"""
+    facets = cache.get(TAG_FACETS_KEY)
+    if facets is None:
+        facets = list(
+            Tag.objects.annotate(club_count=Count('club_links'))
+            .filter(club_count__gt=0)
+            .order_by('-club_count', 'name')
+            .values('slug', 'name', 'club_count')
+        )
+        cache.set(TAG_FACETS_KEY, facets, TAG_FACETS_TIMEOUT)
+    return facets
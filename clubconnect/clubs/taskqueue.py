@@ -0,0 +1,173 @@
+"""
+A small task queue kept in the database, so slow side effects leave the request.
+
+Decorate a function with ``@task`` and call ``func.delay(*args, **kwargs)``:
+that inserts a ``Task`` row (arguments must be JSON-serializable, so pass ids
+rather than model instances) in the caller's transaction, so the task exists
+only if the request's own writes commit. ``manage.py run_tasks`` claims due
+tasks and runs them on a thread or process pool.
+
+Claiming is a conditional UPDATE that stamps the rows with a random claim
+token, then reads back the rows carrying that token, so two workers can never
+claim the same task. On databases with ``SKIP LOCKED`` (Postgres) the
+candidates are picked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so workers
+don't even contend for them; SQLite serializes the UPDATEs instead.
+
+A failing task is retried ``max_attempts`` times with exponential backoff and
+jitter, then left as ``failed`` with its last traceback. A worker that dies
+mid-task leaves it ``running``; once its claim is older than ``LEASE`` it is
+queued again, so tasks must be safe to run twice.
+
+Tasks touch the cache and live updates like the views do, so workers need the
+shared cache (``REDIS_URL``); ``run_tasks`` warns when it finds a per-process
+one. For tests and local development, ``TASK_QUEUE_EAGER = True`` runs each
+task in-process once the enqueuing transaction commits instead. A task that
+fails there is queued for a worker to retry rather than failing the request.
+"""
+import functools
+import importlib
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+# Retry delays double from BACKOFF_BASE up to BACKOFF_MAX seconds
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+LEASE = timedelta(minutes=10)
+# Finished tasks are kept this long for inspection
+RETENTION = timedelta(days=7)
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue a run with these arguments; returns the Task (None in eager mode)"""
+        if getattr(settings, 'TASK_QUEUE_EAGER', False):
+            transaction.on_commit(lambda: self.run_eagerly(args, kwargs), robust=True)
+            return None
+        return Task.objects.create(name=self.name, args=list(args), kwargs=kwargs, max_attempts=self.max_attempts)
+
+    def run_eagerly(self, args, kwargs):
+        try:
+            self.func(*args, **kwargs)
+        except Exception:
+            # The request's own writes have committed; leave the retry to run_tasks
+            error = traceback.format_exc()
+            logger.warning("Task %s failed when run eagerly: %s",
+                           self.name, error.strip().splitlines()[-1])
+            retry = self.max_attempts > 1
+            Task.objects.create(
+                name=self.name, args=list(args), kwargs=kwargs, max_attempts=self.max_attempts,
+                status='queued' if retry else 'failed', attempts=1, last_error=error,
+                run_at=timezone.now() + backoff(1), finished_at=None if retry else timezone.now(),
+            )
+
+
+def task(func=None, *, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Make ``func`` queueable with ``func.delay(...)``; calling it directly still runs it inline"""
+    def register(func):
+        wrapped = TaskFunction(func, max_attempts)
+        registry[wrapped.name] = wrapped
+        return wrapped
+    return register(func) if func is not None else register
+
+
+def resolve(name):
+    """The task registered as ``name``, importing its module if the worker hasn't yet"""
+    if name not in registry:
+        importlib.import_module(name.rsplit('.', 1)[0])
+    return registry[name]
+
+
+def backoff(attempt):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_tasks(limit):
+    """Claim up to ``limit`` due tasks for this worker; returns ``[(task_id, claim), ...]``"""
+    now = timezone.now()
+    claim = uuid.uuid4().hex
+    due = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'pk')
+
+    def mark(candidates):
+        # Rows another worker claimed since they were read no longer match status='queued'
+        Task.objects.filter(pk__in=candidates, status='queued').update(
+            status='running', claim=claim, claimed_at=now, attempts=F('attempts') + 1,
+        )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            candidates = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            if candidates:
+                mark(candidates)
+    else:
+        # No row locks (SQLite): the single UPDATE is what makes the claim exclusive. Wrapping the
+        # read in a transaction would only make SQLite refuse the upgrade to a write lock when busy.
+        candidates = list(due.values_list('pk', flat=True)[:limit])
+        if candidates:
+            mark(candidates)
+    if not candidates:
+        return []
+    return [(task_id, claim) for task_id in Task.objects.filter(claim=claim).values_list('pk', flat=True)]
+
+
+def run_task(task_id, claim):
+    """Run one claimed task and record the outcome; returns the task's new status"""
+    close_old_connections()
+    try:
+        current = Task.objects.filter(pk=task_id, claim=claim, status='running').first()
+        if current is None:
+            # Requeued after its lease ran out and claimed by someone else
+            return 'lost'
+        try:
+            resolve(current.name).func(*current.args, **current.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if current.attempts < current.max_attempts:
+                status, outcome = 'queued', {'run_at': timezone.now() + backoff(current.attempts)}
+            else:
+                status, outcome = 'failed', {'finished_at': timezone.now()}
+            logger.warning("Task %s (%s) failed on attempt %d/%d: %s", task_id, current.name,
+                           current.attempts, current.max_attempts, error.strip().splitlines()[-1])
+            Task.objects.filter(pk=task_id, claim=claim).update(
+                status=status, claim='', last_error=error, **outcome
+            )
+            return status
+        Task.objects.filter(pk=task_id, claim=claim).update(status='done', claim='', finished_at=timezone.now())
+        return 'done'
+    finally:
+        close_old_connections()
+
+
+def requeue_stale():
+    """Queue again tasks whose worker has held them longer than LEASE; returns how many"""
+    return Task.objects.filter(status='running', claimed_at__lt=timezone.now() - LEASE).update(
+        status='queued', claim='', run_at=timezone.now(),
+    )
+
+
+def purge_finished():
+    return Task.objects.filter(status__in=('done', 'failed'), finished_at__lt=timezone.now() - RETENTION).delete()[0]
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from clubs.activity import activity_page, decode_cursor, encode_cursor
+from clubs.models import ActivityItem
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        created_at = timezone.now()
+        item = ActivityItem(pk=42, created_at=created_at)
+        self.assertEqual(decode_cursor(encode_cursor(item)), (created_at, 42))
+
+    def test_rejects_malformed(self):
+        for cursor in ['', 'abc', '123', '123.', '123.x', '123.0', '123.-1', f'123.{2 ** 63}', f'{10 ** 20}.1']:
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+class ActivityPageTests(TestCase):
+    def test_pages_cover_every_item_once(self):
+        created_at = timezone.now()
+        # Pairs share a timestamp, so the id breaks the tie across page boundaries
+        ActivityItem.objects.bulk_create([
+            ActivityItem(item_type='post', object_id=i, title=f'Post {i}', created_at=created_at - timedelta(seconds=i // 2))
+            for i in range(7)
+        ])
+        seen, cursor = [], None
+        while True:
+            page, cursor = activity_page(cursor=cursor, limit=3)
+            seen.extend(item.object_id for item in page)
+            if cursor is None:
+                break
+        expected = ActivityItem.objects.order_by('-created_at', '-id').values_list('object_id', flat=True)
+        self.assertEqual(seen, list(expected))
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import signing
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.checkin import (
+    CHECKIN_GRACE, CHECKIN_OPENS, CheckinToken, check_in, check_in_batch, checkin_token, read_checkin_token,
+)
+from clubs.models import Club, Event, EventAttendance, PointsLedgerEntry
+
+
+class CheckinTokenTests(SimpleTestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.event = Event(pk=7, club_id=3, start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1))
+        self.user = User(pk=11, username='ada')
+
+    def test_round_trip(self):
+        token = read_checkin_token(checkin_token(self.event, self.user), self.event.pk)
+        self.assertEqual((token.event_id, token.club_id, token.user_id, token.username), (7, 3, 11, 'ada'))
+
+    def test_same_registration_same_token(self):
+        self.assertEqual(checkin_token(self.event, self.user), checkin_token(self.event, self.user))
+
+    def test_rejects_another_event(self):
+        with self.assertRaises(signing.BadSignature):
+            read_checkin_token(checkin_token(self.event, self.user), 8)
+
+    def test_rejects_tampering(self):
+        token = checkin_token(self.event, self.user)
+        with self.assertRaises(signing.BadSignature):
+            read_checkin_token(token[:-1] + ('A' if token[-1] != 'A' else 'B'), self.event.pk)
+
+    def test_expires_after_grace(self):
+        self.event.end_time = timezone.now() - CHECKIN_GRACE - timedelta(minutes=1)
+        token = checkin_token(self.event, self.user)
+        with self.assertRaises(signing.SignatureExpired):
+            read_checkin_token(token, self.event.pk)
+        # Judged at the scan time, a scan queued during the event still counts
+        read_checkin_token(token, self.event.pk, scanned_at=self.event.end_time)
+
+
+class CheckInBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='Chess')
+        cls.event = Event.objects.create(
+            club=cls.club, title='Open night', description='', location='Hall 1',
+            start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+        )
+        cls.students = [User.objects.create(username=f'student{i}') for i in range(3)]
+        for student in cls.students[:2]:
+            EventAttendance.objects.create(event=cls.event, user=student)
+
+    def scan(self, user, scan_id, **extra):
+        return dict({'id': scan_id, 'token': checkin_token(self.event, user)}, **extra)
+
+    def test_statuses(self):
+        first, second, unregistered = self.students
+        early = (self.event.start_time - CHECKIN_OPENS - timedelta(minutes=1)).isoformat()
+        results = check_in_batch(self.event, [
+            self.scan(first, 1),
+            self.scan(first, 2),
+            self.scan(unregistered, 3),
+            {'id': 4, 'token': 'garbage'},
+            self.scan(second, 5, scanned_at=early),
+        ])
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['checked_in', 'duplicate', 'not_registered', 'invalid', 'too_early'],
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.checked_in_count, 1)
+        self.assertEqual(PointsLedgerEntry.objects.filter(reason='event_checkin').count(), 1)
+
+    def test_second_sync_counts_nothing(self):
+        scans = [self.scan(student, i) for i, student in enumerate(self.students[:2])]
+        check_in_batch(self.event, scans)
+        results = check_in_batch(self.event, scans)
+        self.assertEqual({result['status'] for result in results}, {'already_checked_in'})
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.checked_in_count, 2)
+        self.assertEqual(PointsLedgerEntry.objects.filter(reason='event_checkin').count(), 2)
+
+    def test_scanner_racing_the_batch(self):
+        first, second, _ = self.students
+        # What the batch reads: neither student checked in yet
+        stale = list(EventAttendance.objects.filter(event=self.event).only('pk', 'user_id', 'checked_in_via_qr'))
+        # Another door checks the first student in before the batch writes
+        check_in(CheckinToken(self.event.pk, self.club.pk, first.pk, first.username))
+
+        read = mock.MagicMock()
+        read.filter.return_value.only.return_value = stale
+        with mock.patch.object(EventAttendance.objects, 'select_for_update', return_value=read):
+            results = check_in_batch(self.event, [self.scan(first, 1), self.scan(second, 2)])
+
+        self.assertEqual([result['status'] for result in results], ['already_checked_in', 'checked_in'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.checked_in_count, 2)
+        self.assertEqual(PointsLedgerEntry.objects.filter(reason='event_checkin').count(), 2)
+        self.assertEqual(EventAttendance.objects.filter(event=self.event, checked_in_via_qr=True).count(), 2)
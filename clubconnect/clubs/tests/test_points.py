@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Club, Event, MemberPoints, PointsLedgerEntry, UserPoints
+from clubs.points import award_points, award_points_bulk, rebuild_member_points, rollup_points
+
+
+class PointsLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.clubs = [
+            Club.objects.create(name=name, short_description='', long_description='', domain_tags=name)
+            for name in ('Chess', 'Drama')
+        ]
+        cls.events = [
+            Event.objects.create(club=club, title='Meetup', description='', location='Hall 1',
+                                 start_time=now, end_time=now + timedelta(hours=2))
+            for club in cls.clubs
+        ]
+        cls.ada, cls.bob = User.objects.create(username='ada'), User.objects.create(username='bob')
+
+    def totals(self):
+        return {
+            (row.user_id, row.club_id): (row.points, row.participation_count, row.contribution_count)
+            for row in MemberPoints.objects.all()
+        }
+
+    def test_award_is_idempotent(self):
+        chess, _ = self.clubs
+        self.assertTrue(award_points(self.ada, chess, 'event_checkin', self.events[0]))
+        self.assertFalse(award_points(self.ada, chess, 'event_checkin', self.events[0]))
+        award_points_bulk([self.ada.pk, self.bob.pk], chess, 'event_checkin', self.events[0])
+        self.assertEqual(PointsLedgerEntry.objects.filter(user=self.ada).count(), 1)
+        self.assertEqual(PointsLedgerEntry.objects.filter(user=self.bob).count(), 1)
+
+    def test_rollup_folds_each_entry_once(self):
+        chess, drama = self.clubs
+        award_points(self.ada, chess, 'event_checkin', self.events[0])
+        award_points(self.ada, drama, 'event_checkin', self.events[1])
+        award_points(self.bob, chess, 'event_checkin', self.events[0])
+        self.assertEqual(rollup_points(batch_size=2), 3)
+        self.assertEqual(rollup_points(), 0)
+
+        award_points(self.ada, chess, 'club_post', self.events[0])
+        self.assertEqual(rollup_points(), 1)
+
+        self.assertEqual(self.totals(), {
+            (self.ada.pk, chess.pk): (13, 1, 1),
+            (self.ada.pk, drama.pk): (10, 1, 0),
+            (self.bob.pk, chess.pk): (10, 1, 0),
+        })
+        self.assertEqual(dict(UserPoints.objects.values_list('user_id', 'points')), {self.ada.pk: 23, self.bob.pk: 10})
+        self.assertFalse(PointsLedgerEntry.objects.filter(rolled_up=False).exists())
+
+    def test_rebuild_matches_rollup(self):
+        chess, drama = self.clubs
+        award_points(self.ada, chess, 'event_checkin', self.events[0])
+        award_points(self.bob, drama, 'event_checkin', self.events[1])
+        rollup_points()
+        rolled_up = self.totals()
+        MemberPoints.objects.update(points=999)
+        rebuild_member_points()
+        self.assertEqual(self.totals(), rolled_up)
+        self.assertEqual(dict(UserPoints.objects.values_list('user_id', 'points')), {self.ada.pk: 10, self.bob.pk: 10})
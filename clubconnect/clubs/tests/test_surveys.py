@@ -0,0 +1,65 @@
+from django.db import IntegrityError
+from django.test import TestCase
+
+from accounts.models import User
+from clubs.models import Club, Survey, SurveyAnswerCount, SurveyQuestion, SurveyQuestionStats
+from clubs.surveys import count_value, rebuild_survey_aggregates, submit_survey, survey_results
+
+LONG_CHOICE = 'x' * 250
+
+
+class SurveyAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.founder = User.objects.create(username='founder')
+        club = Club.objects.create(name='Chess', short_description='', long_description='', domain_tags='Chess')
+        cls.survey = Survey.objects.create(club=club, creator=cls.founder, title='Feedback', description='')
+        cls.choice = SurveyQuestion.objects.create(
+            survey=cls.survey, question_text='Night?', question_type='choice', choices=f'Mon, Tue, {LONG_CHOICE}',
+        )
+        cls.rating = SurveyQuestion.objects.create(survey=cls.survey, question_text='Rate', question_type='rating')
+        cls.text = SurveyQuestion.objects.create(survey=cls.survey, question_text='Else?', question_type='text')
+        cls.students = [User.objects.create(username=f'student{i}') for i in range(4)]
+
+    def submit(self, student, choice, rating, text=''):
+        return submit_survey(self.survey, student, {self.choice: choice, self.rating: rating, self.text: text})
+
+    def snapshot(self):
+        return (
+            sorted(SurveyQuestionStats.objects.values_list('question_id', 'answer_count', 'rating_sum')),
+            sorted(SurveyAnswerCount.objects.values_list('question_id', 'value', 'count')),
+        )
+
+    def test_results_from_running_totals(self):
+        self.submit(self.students[0], 'Mon', '5', 'More boards')
+        self.submit(self.students[1], 'Mon', '3')
+        self.submit(self.students[2], LONG_CHOICE, '4')
+        # Neither answer is one of the options, so nothing is recorded
+        self.submit(self.students[3], 'Sun', '9')
+
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.respondent_count, 3)
+        choice, rating, text = survey_results(self.survey)
+        self.assertEqual([(row['label'], row['count']) for row in choice['choices']],
+                         [('Mon', 2), ('Tue', 0), (LONG_CHOICE, 1)])
+        self.assertEqual(rating['average'], 4)
+        self.assertEqual(text['responses'], ['More boards'])
+
+    def test_second_submission_writes_nothing(self):
+        self.submit(self.students[0], 'Mon', '5')
+        before = self.snapshot()
+        with self.assertRaises(IntegrityError):
+            self.submit(self.students[0], 'Tue', '1')
+        self.assertEqual(self.snapshot(), before)
+
+    def test_rebuild_matches_running_totals(self):
+        self.submit(self.students[0], 'Mon', '5', 'More boards')
+        self.submit(self.students[1], LONG_CHOICE, '2')
+        self.submit(self.students[2], LONG_CHOICE, '2')
+        running = self.snapshot()
+        self.assertIn((self.choice.pk, count_value(LONG_CHOICE), 2), running[1])
+
+        SurveyAnswerCount.objects.all().delete()
+        SurveyQuestionStats.objects.update(answer_count=0, rating_sum=0)
+        rebuild_survey_aggregates([self.survey.pk])
+        self.assertEqual(self.snapshot(), running)
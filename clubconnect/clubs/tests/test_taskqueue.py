@@ -0,0 +1,41 @@
+from django.test import TestCase, override_settings
+
+from clubs.models import Task
+from clubs.taskqueue import claim_tasks, run_task, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def flaky(value):
+    calls.append(value)
+    if len(calls) < 2:
+        raise RuntimeError("first try fails")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_a_task(self):
+        queued = flaky.delay(1)
+        self.assertEqual((queued.name, queued.args, queued.status), (flaky.name, [1], 'queued'))
+        self.assertEqual(calls, [])
+
+    def test_retries_then_succeeds(self):
+        flaky.delay(1)
+        [(task_id, claim)] = claim_tasks(5)
+        with self.assertLogs('clubs.taskqueue', 'WARNING'):
+            self.assertEqual(run_task(task_id, claim), 'queued')
+        Task.objects.filter(pk=task_id).update(run_at=Task.objects.get(pk=task_id).created_at)
+        [(task_id, claim)] = claim_tasks(5)
+        self.assertEqual(run_task(task_id, claim), 'done')
+        self.assertEqual(calls, [1, 1])
+
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_failure_is_queued_for_retry(self):
+        with self.assertLogs('clubs.taskqueue', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(flaky.delay(1))
+        retry = Task.objects.get()
+        self.assertEqual((retry.status, retry.attempts), ('queued', 1))
+        self.assertIn('first try fails', retry.last_error)
@@ -20,18 +20,25 @@ urlpatterns = [
     
     path('event/<int:event_id>/generate-qr/', views.generate_event_qr, name='generate_event_qr'),
     path('event/<int:event_id>/checkin/', views.event_checkin, name='event_checkin'),
+    path('event/<int:event_id>/scan/', views.scan_checkin, name='scan_checkin'),
+    path('event/<int:event_id>/scan/sync/', views.sync_checkins, name='sync_checkins'),
     path('event/<int:event_id>/register/', views.event_register, name='event_register'),
     path('event/<int:event_id>/download-qr/', views.download_event_qr, name='download_event_qr'),
+    path('event/<int:event_id>/download-qr-codes/', views.download_event_qr_codes, name='download_event_qr_codes'),
     path('event/<int:event_id>/manage-attendance/', views.manage_event_attendance, name='manage_event_attendance'),
+    path('event/<int:event_id>/export-attendance/', views.export_event_attendance, name='export_event_attendance'),
     
     path('<int:club_id>/create-survey/', views.create_survey, name='create_survey'),
     path('survey/<int:survey_id>/', views.view_survey, name='view_survey'),
     path('survey/<int:survey_id>/results/', views.survey_results, name='survey_results'),
+    path('survey/<int:survey_id>/export/', views.export_survey_responses, name='export_survey_responses'),
     
     path('<int:club_id>/create-post/', views.create_club_post, name='create_club_post'),
     path('post/<int:post_id>/like/', views.like_post, name='like_post'),
     
     path('<int:club_id>/leaderboard/', views.club_leaderboard, name='club_leaderboard'),
+    path('leaderboard/', views.global_leaderboard, name='global_leaderboard'),
+    path('<int:club_id>/export-members/', views.export_club_members, name='export_club_members'),
     
     path('<int:club_id>/toggle-favorite/', views.toggle_favorite_club, name='toggle_favorite_club'),
     
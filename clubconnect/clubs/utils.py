@@ -1,19 +1,18 @@
-import qrcode
-from io import BytesIO
-from django.core.files import File
-from .models import Notification
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from dashboard import metrics
+from dashboard.live import publish, BROADCAST_CHANNEL
+from accounts.models import User
+from .models import Notification, BroadcastNotification, BroadcastReceipt, Message, Conversation
+from .taskqueue import task
 
 
 def generate_qr_code_for_event(event, request=None):
+    """Queue the event's check-in QR code; the task worker renders it and saves it to ``event.qr_code``"""
     from django.conf import settings
     import os
-    
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
+    from .qr import save_event_qr
     
     checkin_path = event.get_qr_code_url()
     
@@ -26,17 +25,45 @@ def generate_qr_code_for_event(event, request=None):
         else:
             absolute_url = f"http://localhost:5000{checkin_path}"
     
-    qr.add_data(absolute_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    filename = f'qr_event_{event.id}.png'
-    event.qr_code.save(filename, File(buffer), save=True)
-    buffer.close()
+    save_event_qr.delay(event.pk, absolute_url)
+
+
+# Unread notification counters live in the cache so the navbar badge and the
+# polling endpoint never have to COUNT(*) the notifications table. A missing
+# key means the cache is cold and the value is rebuilt from the database.
+# Increments must reach every process, so multi-process deployments need the
+# shared cache (REDIS_URL in settings), whose incr/decr are atomic.
+UNREAD_COUNTER_TIMEOUT = 60 * 60 * 24
+BROADCAST_TOTAL_KEY = 'broadcast_notification_total'
+
+
+def unread_notifications_key(user_id):
+    return f'unread_notifications_{user_id}'
+
+
+def broadcast_offset_key(user_id):
+    # Broadcasts that do not count as unread for this user: sent before they
+    # joined, or already read. Unread broadcasts = total - offset.
+    return f'broadcast_offset_{user_id}'
+
+
+def _incr_counter(key, delta):
+    try:
+        if delta >= 0:
+            cache.incr(key, delta)
+        else:
+            cache.decr(key, -delta)
+    except ValueError:
+        # Key is cold; the next read rebuilds it from the database
+        pass
+
+
+def adjust_unread_notification_count(user_ids, delta=1):
+    def apply():
+        for user_id in user_ids:
+            _incr_counter(unread_notifications_key(user_id), delta)
+            publish(user_id, 'notifications', {'delta': delta})
+    transaction.on_commit(apply)
 
 
 def create_notification(users, notification_type, title, message, link=''):
@@ -51,10 +78,137 @@ def create_notification(users, notification_type, title, message, link=''):
         )
         notifications.append(notification)
     Notification.objects.bulk_create(notifications)
+    adjust_unread_notification_count([n.user_id for n in notifications])
+    metrics.observe('clubconnect_notification_fanout_size', len(notifications))
+
+
+@task
+def send_notifications(user_ids, notification_type, title, message, link=''):
+    create_notification([User(pk=user_id) for user_id in user_ids], notification_type, title, message, link)
+
+
+def queue_notification(users, notification_type, title, message, link=''):
+    """create_notification, run by the task worker instead of in the request"""
+    send_notifications.delay([user.pk for user in users], notification_type, title, message, link)
+
+
+@task
+def notify_club_audience(club_id, audience, notification_type, title, message, link=''):
+    from clubs.models import Club, Membership
+    if audience == 'favorites':
+        user_ids = Club.favorited_by.through.objects.filter(club_id=club_id).values_list('user_id', flat=True)
+    else:
+        user_ids = Membership.objects.filter(club_id=club_id, status='approved').values_list('user_id', flat=True)
+    user_ids = list(user_ids)
+    if user_ids:
+        create_notification([User(pk=user_id) for user_id in user_ids], notification_type, title, message, link)
 
 
 def notify_club_members(club, notification_type, title, message, link=''):
-    from clubs.models import Membership
-    members = Membership.objects.filter(club=club, status='approved').select_related('user')
-    users = [m.user for m in members]
-    create_notification(users, notification_type, title, message, link)
+    """Queue a notification to every approved member of ``club``"""
+    notify_club_audience.delay(club.pk, 'members', notification_type, title, message, link)
+
+
+def notify_club_favorites(club, notification_type, title, message, link=''):
+    """Queue a notification to everyone who favorited ``club``"""
+    notify_club_audience.delay(club.pk, 'favorites', notification_type, title, message, link)
+
+
+def create_broadcast_notification(notification_type, title, message, link=''):
+    # One row regardless of how many users exist; inboxes pick it up at read time
+    broadcast = BroadcastNotification.objects.create(
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        link=link
+    )
+    def apply():
+        _incr_counter(BROADCAST_TOTAL_KEY, 1)
+        publish(BROADCAST_CHANNEL, 'notifications', {'delta': 1})
+    transaction.on_commit(apply)
+    return broadcast
+
+
+def get_unread_broadcasts(user):
+    # Users only see broadcasts sent after they joined, matching the old per-user fan-out
+    return BroadcastNotification.objects.filter(
+        created_at__gte=user.date_joined
+    ).exclude(receipts__user=user)
+
+
+def get_unread_notification_count(user):
+    """Serve the unread count from cached counters, rebuilding any cold ones"""
+    personal_key = unread_notifications_key(user.pk)
+    offset_key = broadcast_offset_key(user.pk)
+    cached = cache.get_many([personal_key, offset_key, BROADCAST_TOTAL_KEY])
+
+    broadcast_total = cached.get(BROADCAST_TOTAL_KEY)
+    if broadcast_total is None:
+        broadcast_total = BroadcastNotification.objects.count()
+        cache.set(BROADCAST_TOTAL_KEY, broadcast_total, UNREAD_COUNTER_TIMEOUT)
+
+    personal = cached.get(personal_key)
+    if personal is None:
+        personal = Notification.objects.filter(user=user, is_read=False).count()
+        cache.set(personal_key, personal, UNREAD_COUNTER_TIMEOUT)
+
+    offset = cached.get(offset_key)
+    if offset is None:
+        offset = broadcast_total - get_unread_broadcasts(user).count()
+        cache.set(offset_key, offset, UNREAD_COUNTER_TIMEOUT)
+
+    return personal + max(broadcast_total - offset, 0)
+
+
+def mark_notification_read(user, notification_id):
+    # The conditional update makes the decrement happen exactly once even if
+    # the same notification is marked read from two tabs at the same time
+    updated = Notification.objects.filter(id=notification_id, user=user, is_read=False).update(is_read=True)
+    if updated:
+        adjust_unread_notification_count([user.pk], -1)
+    return updated
+
+
+def get_user_notifications(user, limit=20):
+    """Merge the user's own notifications with broadcasts, newest first"""
+    personal = list(Notification.objects.filter(user=user).order_by('-created_at')[:limit])
+    broadcasts = list(
+        BroadcastNotification.objects.filter(created_at__gte=user.date_joined)
+        .annotate(is_read=Exists(BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), user=user)))
+        .order_by('-created_at')[:limit]
+    )
+    merged = sorted(personal + broadcasts, key=lambda n: n.created_at, reverse=True)
+    return merged[:limit]
+
+
+def mark_broadcast_read(user, broadcast):
+    _, created = BroadcastReceipt.objects.get_or_create(broadcast=broadcast, user=user)
+    if created:
+        def apply():
+            _incr_counter(broadcast_offset_key(user.pk), 1)
+            publish(user.pk, 'notifications', {'delta': -1})
+        transaction.on_commit(apply)
+
+
+def send_direct_message(sender, receiver, content, club=None):
+    """Create a message and keep the conversation index and live counts in step"""
+    with transaction.atomic():
+        message = Message.objects.create(
+            sender=sender,
+            receiver=receiver,
+            club=club,
+            content=content,
+            is_read=False
+        )
+        Conversation.record_message(message)
+    publish(receiver.id, 'messages', {'delta': 1, 'sender': sender.id})
+    return message
+
+
+def mark_conversation_read(reader, other_user):
+    with transaction.atomic():
+        marked = Message.objects.filter(sender=other_user, receiver=reader, is_read=False).update(is_read=True)
+        Conversation.mark_read(reader.id, other_user.id)
+    if marked:
+        publish(reader.id, 'messages', {'delta': -marked, 'sender': other_user.id})
+    return marked
@@ -1,17 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F
 from django.http import HttpResponseForbidden
 from django.views.decorators.http import require_POST
+from . import feed
 from .models import Club, Event, Membership, Message, Announcement
 from accounts.models import User
 from .forms import ClubForm, EventForm, ClubRegistrationForm, MessageForm, AnnouncementForm
 
 @login_required
 def clubs_list(request):
+    from .tags import get_tag_facets
     clubs = Club.objects.all()
-    return render(request, 'clubs/clubs_list.html', {'clubs': clubs})
+    active_tag = request.GET.get('tag', '').strip()
+    if active_tag:
+        clubs = clubs.filter(tags__slug=active_tag)
+    context = {
+        'clubs': clubs,
+        'tag_facets': get_tag_facets(),
+        'active_tag': active_tag,
+    }
+    return render(request, 'clubs/clubs_list.html', context)
 
 # Admin-only club creation
 @login_required
@@ -76,7 +88,7 @@ def assign_founder(request, club_id):
 # Club detail view
 def club_detail(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    events = Event.objects.filter(club=club).order_by('start_time').prefetch_related('attendances__user')
+    events = Event.objects.filter(club=club).order_by('start_time')
     founders = club.founders.all()
     announcements = Announcement.objects.filter(club=club).order_by('-created_at')[:5]
     is_member = False
@@ -89,12 +101,16 @@ def club_detail(request, club_id):
     active_surveys = Survey.objects.filter(club=club, is_active=True)
     
     user_registered_events = []
+    liked_post_ids = set()
     if request.user.is_authenticated:
         from .models import EventAttendance
         user_registered_events = EventAttendance.objects.filter(
             event__club=club, 
             user=request.user
         ).values_list('event_id', flat=True)
+        liked_post_ids = set(ClubPost.likes.through.objects.filter(
+            clubpost__in=recent_posts, user=request.user
+        ).values_list('clubpost_id', flat=True))
     
     context = {
         'club': club,
@@ -105,24 +121,33 @@ def club_detail(request, club_id):
         'recent_posts': recent_posts,
         'active_surveys': active_surveys,
         'user_registered_events': user_registered_events,
+        'liked_post_ids': liked_post_ids,
     }
     return render(request, 'clubs/club_detail.html', context)
 
 # Search clubs
 def search_clubs(request):
+    from .search import SearchResults, load_objects
+    from .tags import get_tag_facets
     query = request.GET.get('q', '')
+    active_tag = request.GET.get('tag', '').strip()
     clubs = Club.objects.all()
+    if active_tag:
+        clubs = clubs.filter(tags__slug=active_tag)
+    page_obj = None
     
     if query:
-        clubs = clubs.filter(
-            Q(name__icontains=query) | 
-            Q(short_description__icontains=query) |
-            Q(domain_tags__icontains=query)
-        )
+        # Matches name, tags and descriptions through the full-text index, best match first
+        results = SearchResults(query, object_types=['club'], club_tag=active_tag or None)
+        page_obj = Paginator(results, 20).get_page(request.GET.get('page'))
+        clubs = [club for _, club in load_objects(page_obj.object_list)]
     
     context = {
         'clubs': clubs,
         'query': query,
+        'page_obj': page_obj,
+        'tag_facets': get_tag_facets(),
+        'active_tag': active_tag,
     }
     return render(request, 'clubs/search_results.html', context)
 
@@ -174,13 +199,7 @@ def send_message_to_founder(request, club_id):
         
         if founder_id and content:
             founder = get_object_or_404(User, id=founder_id)
-            message = Message(
-                sender=request.user,
-                receiver=founder,
-                content=content,
-                is_read=False
-            )
-            message.save()
+            send_direct_message(request.user, founder, content)
             messages.success(request, "Your message has been sent to the club founder.")
             return redirect('club_detail', club_id=club_id)
     
@@ -218,17 +237,14 @@ def create_event(request, club_id):
             event.club = club
             event.save()
             
-            from .models import Notification
-            from .utils import create_notification
-            favorited_users = list(club.favorited_by.all())
-            if favorited_users:
-                create_notification(
-                    favorited_users,
-                    'event',
-                    f'New Event in {club.name}!',
-                    f'{event.title} - {event.description[:100]}...',
-                    f'/clubs/{club.id}/'
-                )
+            from .utils import notify_club_favorites
+            notify_club_favorites(
+                club,
+                'event',
+                f'New Event in {club.name}!',
+                f'{event.title} - {event.description[:100]}...',
+                f'/clubs/{club.id}/'
+            )
             
             notify_club_members(
                 club,
@@ -273,13 +289,7 @@ def club_chat(request, club_id):
         content = request.POST.get('content')
         if receiver_id and content:
             receiver = get_object_or_404(User, id=receiver_id)
-            Message.objects.create(
-                sender=request.user,
-                receiver=receiver,
-                club=club,
-                content=content.strip(),
-                is_read=False,
-            )
+            send_direct_message(request.user, receiver, content.strip(), club=club)
             messages.success(request, 'Message sent.')
             return redirect('club_chat', club_id=club_id)
         messages.error(request, 'Please select a recipient and enter a message.')
@@ -306,8 +316,13 @@ def approve_membership(request, membership_id):
         messages.error(request, "Only club founders can approve memberships.")
         return redirect('club_detail', club_id=club.id)
 
-    membership.status = 'approved'
-    membership.save()
+    with transaction.atomic():
+        # Only count the member once, even if the approve link is clicked twice
+        approved = Membership.objects.filter(id=membership.id).exclude(status='approved').update(status='approved')
+        if approved:
+            Club.objects.filter(id=club.id).update(approved_member_count=F('approved_member_count') + 1)
+            # update() sends no post_save, so the membership signal can't drop the cached feed
+            feed.invalidate_user(membership.user_id)
     messages.success(request, f"Membership for {membership.user.username} has been approved.")
     return redirect('founder_dashboard')
 
@@ -317,7 +332,10 @@ def leave_club(request, club_id):
     membership = get_object_or_404(Membership, user=request.user, club=club)
 
     if request.method == 'POST':
-        membership.delete()
+        with transaction.atomic():
+            deleted, _ = Membership.objects.filter(id=membership.id).delete()
+            if deleted and membership.status == 'approved':
+                Club.objects.filter(id=club.id).update(approved_member_count=F('approved_member_count') - 1)
         messages.success(request, f"You have left {club.name}.")
         return redirect('club_detail', club_id=club.id)
 
@@ -333,8 +351,13 @@ def reject_membership(request, membership_id):
         messages.error(request, "Only club founders can reject memberships.")
         return redirect('club_detail', club_id=club.id)
 
-    membership.status = 'rejected'
-    membership.save()
+    with transaction.atomic():
+        was_approved = Membership.objects.filter(id=membership.id, status='approved').update(status='rejected')
+        if was_approved:
+            Club.objects.filter(id=club.id).update(approved_member_count=F('approved_member_count') - 1)
+            feed.invalidate_user(membership.user_id)
+        else:
+            Membership.objects.filter(id=membership.id).update(status='rejected')
     messages.success(request, f"Membership for {membership.user.username} has been rejected.")
     return redirect('founder_dashboard')
 
@@ -385,9 +408,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from .models import Event, EventAttendance, Survey, SurveyQuestion, SurveyResponse, ClubPost, MemberPoints, Club, Membership
-from .utils import generate_qr_code_for_event, notify_club_members
+from .models import Event, EventAttendance, Survey, SurveyQuestion, SurveyResponse, ClubPost, Club, Membership
+from .points import award_points
+from .utils import generate_qr_code_for_event, notify_club_members, send_direct_message
 from accounts.models import User
 
 
@@ -402,91 +427,40 @@ def generate_event_qr(request, event_id):
     
     if not event.qr_code:
         generate_qr_code_for_event(event, request)
-        messages.success(request, "QR code generated successfully!")
+        messages.success(request, "QR code is being generated and will appear shortly.")
     
     return redirect('club_detail', club_id=club.id)
 
 
 @login_required
 def event_checkin(request, event_id):
-    """Student-side or founder-initiated check-in"""
+    """Where the event's posted QR code leads; only door staff scanning a student's own code check them in"""
     event = get_object_or_404(Event, id=event_id)
-    user_id = request.GET.get('user_id')
-    
-    # If user_id is provided and requester is authorized, check in that user
-    is_authorized = (
-        event.club.founders.filter(id=request.user.id).exists() or
-        request.user == event.club.president or
-        request.user == event.club.vice_president or
-        request.user.is_admin()
-    )
-    
-    if user_id and is_authorized:
-        user_to_checkin = get_object_or_404(User, id=user_id)
-        attendance = EventAttendance.objects.filter(event=event, user=user_to_checkin).first()
-        
-        if attendance and not attendance.checked_in_via_qr:
-            attendance.checked_in_via_qr = True
-            attendance.save()
-            
-            member_points, _ = MemberPoints.objects.get_or_create(
-                user=user_to_checkin,
-                club=event.club
-            )
-            member_points.participation_count += 1
-            member_points.points += 10
-            member_points.save()
-            
-            messages.success(request, f"Successfully checked in {user_to_checkin.username} to {event.title}!")
-        elif attendance and attendance.checked_in_via_qr:
-            messages.info(request, f"{user_to_checkin.username} is already checked in.")
-        else:
-            messages.error(request, f"{user_to_checkin.username} is not registered for this event.")
-        
-        return redirect('manage_event_attendance', event_id=event.id)
-    
-    # Regular student check-in
-    attendance, created = EventAttendance.objects.get_or_create(
-        event=event,
-        user=request.user,
-        defaults={'checked_in_via_qr': True}
-    )
-    
-    if not created and not attendance.checked_in_via_qr:
-        attendance.checked_in_via_qr = True
-        attendance.save()
-        created = True
-    
-    if created or not attendance.checked_in_via_qr:
-        member_points, _ = MemberPoints.objects.get_or_create(
-            user=request.user,
-            club=event.club
-        )
-        member_points.participation_count += 1
-        member_points.points += 10
-        member_points.save()
-        
-        messages.success(request, f"Successfully checked in to {event.title}! You earned 10 points.")
-    else:
-        messages.info(request, "You have already checked in to this event.")
-    
-    return redirect('club_detail', club_id=event.club.id)
+    messages.info(request, f"To check in to {event.title}, show the QR code from your registration to the door staff.")
+    return redirect('club_detail', club_id=event.club_id)
 
 @login_required
 def event_register(request, event_id):
     event = get_object_or_404(Event, id=event_id)
     
-    attendance, created = EventAttendance.objects.get_or_create(
-        event=event,
-        user=request.user,
-        defaults={'checked_in_via_qr': False}
-    )
+    with transaction.atomic():
+        attendance, created = EventAttendance.objects.get_or_create(
+            event=event,
+            user=request.user,
+            defaults={'checked_in_via_qr': False}
+        )
+        if created:
+            Event.objects.filter(id=event.id).update(registration_count=F('registration_count') + 1)
     
     if created:
+        from .checkin import checkin_url
         from .models import Notification
-        from .utils import create_notification
+        from .qr import pregenerate
+        from .utils import queue_notification
+        # Render the student's check-in code now, off this request, so downloading it is a file read
+        pregenerate.delay([checkin_url(event, request.user, request)])
         representatives = event.club.get_representatives()
-        create_notification(
+        queue_notification(
             representatives,
             'event',
             f'New Registration for {event.title}',
@@ -502,43 +476,46 @@ def event_register(request, event_id):
 
 @login_required
 def download_event_qr(request, event_id):
-    """Generate and download QR code for student's event registration"""
-    from .models import EventAttendance
+    """Download the student's check-in QR code for an event they registered for"""
+    from .checkin import checkin_url
+    from .qr import qr_response
     
     event = get_object_or_404(Event, id=event_id)
     
-    attendance = EventAttendance.objects.filter(event=event, user=request.user).first()
-    if not attendance:
+    if not EventAttendance.objects.filter(event=event, user=request.user).exists():
         messages.error(request, "You are not registered for this event.")
         return redirect('club_detail', club_id=event.club.id)
     
-    import qrcode
-    from io import BytesIO
-    from django.http import HttpResponse
-    
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+    return qr_response(
+        request, checkin_url(event, request.user, request), f'event_qr_{event.id}_{request.user.username}.png'
     )
+
+
+@login_required
+def download_event_qr_codes(request, event_id):
+    """Founder download of every registrant's check-in code for an event, streamed as a ZIP"""
+    from django.http import StreamingHttpResponse
+    from .checkin import checkin_url
+    from .qr import qr_png
+    from .streaming import CONTENT_TYPES, stream_zip
+    event = get_object_or_404(Event.objects.select_related('club'), id=event_id)
+    club = event.club
     
-    checkin_url = request.build_absolute_uri(
-        f'/clubs/event/{event.id}/checkin/?user_id={request.user.id}'
-    )
-    
-    qr.add_data(checkin_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
+    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president and not request.user.is_admin():
+        messages.error(request, "Only club representatives can download registrants' QR codes.")
+        return redirect('club_detail', club_id=club.id)
     
-    response = HttpResponse(buffer, content_type='image/png')
-    response['Content-Disposition'] = f'attachment; filename="event_qr_{event.id}_{request.user.username}.png"'
+    def codes():
+        attendances = (
+            EventAttendance.objects.filter(event=event).select_related('user').only('user__id', 'user__username')
+            .order_by('pk').iterator(chunk_size=500)
+        )
+        for attendance in attendances:
+            user = attendance.user
+            yield f'{user.username}.png', qr_png(checkin_url(event, user, request))
     
+    response = StreamingHttpResponse(stream_zip(codes()), content_type=CONTENT_TYPES['zip'])
+    response['Content-Disposition'] = f'attachment; filename="event_{event.id}_qr_codes.zip"'
     return response
 
 
@@ -593,30 +570,26 @@ def create_survey(request, club_id):
 
 @login_required
 def view_survey(request, survey_id):
+    from django.db import IntegrityError
+    from .surveys import choice_list, submit_survey
     survey = get_object_or_404(Survey, id=survey_id)
-    questions = survey.questions.all()
+    questions = list(survey.questions.all())
+    for question in questions:
+        question.options = choice_list(question)
     
-    user_responses = SurveyResponse.objects.filter(survey=survey, user=request.user)
-    has_responded = user_responses.exists()
+    has_responded = SurveyResponse.objects.filter(survey=survey, user=request.user).exists()
     
     if request.method == 'POST' and not has_responded:
-        for question in questions:
-            answer = request.POST.get(f'question_{question.id}')
-            if answer:
-                SurveyResponse.objects.create(
-                    survey=survey,
-                    user=request.user,
-                    question=question,
-                    answer=answer
-                )
-        
-        member_points, _ = MemberPoints.objects.get_or_create(
-            user=request.user,
-            club=survey.club
-        )
-        member_points.contribution_count += 1
-        member_points.points += 5
-        member_points.save()
+        answers = {question: request.POST.get(f'answer_{question.id}') for question in questions}
+        try:
+            # Answers, result totals and points are written together or not at all
+            with transaction.atomic():
+                submit_survey(survey, request.user, answers)
+                award_points(request.user, survey.club, 'survey_response', survey)
+        except IntegrityError:
+            # A second submission raced this one in
+            messages.info(request, "You have already completed this survey.")
+            return redirect('club_detail', club_id=survey.club_id)
         
         messages.success(request, "Thank you for completing the survey! You earned 5 points.")
         return redirect('club_detail', club_id=survey.club.id)
@@ -631,58 +604,37 @@ def view_survey(request, survey_id):
 
 @login_required
 def survey_results(request, survey_id):
+    from .surveys import survey_results as build_results
     survey = get_object_or_404(Survey, id=survey_id)
     
     if not survey.club.founders.filter(id=request.user.id).exists() and not request.user.is_admin():
         messages.error(request, "Only club founders can view survey results.")
         return redirect('club_detail', club_id=survey.club.id)
     
-    questions = survey.questions.all()
-    results = []
-    
-    for question in questions:
-        question_responses = SurveyResponse.objects.filter(question=question)
-        
-        if question.question_type == 'choice':
-            choices = [c.strip() for c in question.choices.split(',')]
-            choice_counts = {choice: 0 for choice in choices}
-            
-            for response in question_responses:
-                if response.answer in choice_counts:
-                    choice_counts[response.answer] += 1
-            
-            results.append({
-                'question': question.question_text,
-                'type': 'choice',
-                'data': choice_counts,
-            })
-        elif question.question_type == 'rating':
-            ratings = [int(r.answer) for r in question_responses if r.answer.isdigit()]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
-            rating_counts = {i: ratings.count(i) for i in range(1, 6)}
-            
-            results.append({
-                'question': question.question_text,
-                'type': 'rating',
-                'average': round(avg_rating, 2),
-                'data': rating_counts,
-            })
-        else:
-            text_responses = [r.answer for r in question_responses]
-            results.append({
-                'question': question.question_text,
-                'type': 'text',
-                'responses': text_responses,
-            })
-    
+    # Read from the per-question totals kept by clubs/surveys.py, never the raw responses
     context = {
         'survey': survey,
-        'results': results,
-        'total_responses': SurveyResponse.objects.filter(survey=survey).values('user').distinct().count(),
+        'results': build_results(survey),
+        'total_responses': survey.respondent_count,
     }
     return render(request, 'clubs/survey_results.html', context)
 
 
+@login_required
+def export_survey_responses(request, survey_id):
+    from .exports import survey_export
+    from .streaming import streaming_export
+    survey = get_object_or_404(Survey, id=survey_id)
+    
+    if not survey.club.founders.filter(id=request.user.id).exists() and not request.user.is_admin():
+        messages.error(request, "Only club founders can export survey responses.")
+        return redirect('club_detail', club_id=survey.club_id)
+    
+    header, rows = survey_export(survey)
+    return streaming_export(f'survey-{survey.id}-responses', header, rows,
+                            file_format=request.GET.get('format', 'csv'), sheet_name=survey.title)
+
+
 @login_required
 def create_club_post(request, club_id):
     club = get_object_or_404(Club, id=club_id)
@@ -719,13 +671,7 @@ def create_club_post(request, club_id):
                 f'/clubs/{club.id}/'
             )
             
-            member_points, _ = MemberPoints.objects.get_or_create(
-                user=request.user,
-                club=club
-            )
-            member_points.contribution_count += 1
-            member_points.points += 3
-            member_points.save()
+            award_points(request.user, club, 'club_post', post)
             
             messages.success(request, "Post created successfully!")
             return redirect('club_detail', club_id=club.id)
@@ -737,12 +683,22 @@ def create_club_post(request, club_id):
 def like_post(request, post_id):
     post = get_object_or_404(ClubPost, id=post_id)
     
-    if request.user in post.likes.all():
-        post.likes.remove(request.user)
-        liked = False
-    else:
-        post.likes.add(request.user)
-        liked = True
+    with transaction.atomic():
+        unliked, _ = ClubPost.likes.through.objects.filter(clubpost=post, user=request.user).delete()
+        if unliked:
+            ClubPost.objects.filter(id=post.id).update(like_count=F('like_count') - 1)
+            liked = False
+        else:
+            try:
+                with transaction.atomic():
+                    ClubPost.likes.through.objects.create(clubpost=post, user=request.user)
+            except IntegrityError:
+                # A simultaneous like got there first and counted itself
+                pass
+            else:
+                ClubPost.objects.filter(id=post.id).update(like_count=F('like_count') + 1)
+            liked = True
+    post.refresh_from_db(fields=['like_count'])
     
     return JsonResponse({
         'liked': liked,
@@ -750,18 +706,61 @@ def like_post(request, post_id):
     })
 
 
+LEADERBOARD_SIZE = 20
+GLOBAL_LEADERBOARD_PAGE_SIZE = 50
+
+
+def my_standing(board, user, shown):
+    """The viewer's rank and the members around them, unless they're already on screen"""
+    if any(row['user'] == user for row in shown):
+        return None, []
+    return board.rank(user.id), board.neighbors(user.id)
+
+
 @login_required
 def club_leaderboard(request, club_id):
+    from .ranking import get_board, leaderboard_rows
     club = get_object_or_404(Club, id=club_id)
-    leaderboard = MemberPoints.objects.filter(club=club).select_related('user')[:20]
+    board = get_board(club.id)
+    rankings = leaderboard_rows(board.top(LEADERBOARD_SIZE), club=club)
+    my_rank, neighbors = my_standing(board, request.user, rankings)
     
     context = {
         'club': club,
-        'leaderboard': leaderboard,
+        'rankings': rankings,
+        'my_rank': my_rank,
+        'neighbors': leaderboard_rows(neighbors, club=club),
+        'member_count': len(board),
     }
     return render(request, 'clubs/leaderboard.html', context)
 
 
+@login_required
+def global_leaderboard(request):
+    """Standings across every club, by each member's points summed over their clubs"""
+    from .ranking import get_board, leaderboard_rows
+    board = get_board()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    start = (page - 1) * GLOBAL_LEADERBOARD_PAGE_SIZE
+    rankings = leaderboard_rows(board.entries(start, start + GLOBAL_LEADERBOARD_PAGE_SIZE))
+    my_rank, neighbors = my_standing(board, request.user, rankings)
+    member_count = len(board)
+    
+    context = {
+        'rankings': rankings,
+        'my_rank': my_rank,
+        'neighbors': leaderboard_rows(neighbors),
+        'member_count': member_count,
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if start + GLOBAL_LEADERBOARD_PAGE_SIZE < member_count else None,
+    }
+    return render(request, 'clubs/global_leaderboard.html', context)
+
+
 @login_required
 def toggle_favorite_club(request, club_id):
     club = get_object_or_404(Club, id=club_id)
@@ -800,9 +799,9 @@ def submit_club_feedback(request, club_id):
             )
             
             from .models import Notification
-            from .utils import create_notification
+            from .utils import queue_notification
             representatives = club.get_representatives()
-            create_notification(
+            queue_notification(
                 representatives,
                 'general',
                 f'New {feedback.get_feedback_type_display()} from {request.user.username}',
@@ -848,8 +847,8 @@ def update_feedback_status(request, feedback_id):
             feedback.save()
             
             from .models import Notification
-            from .utils import create_notification
-            create_notification(
+            from .utils import queue_notification
+            queue_notification(
                 [feedback.student],
                 'general',
                 f'Feedback Status Updated: {feedback.title}',
@@ -893,9 +892,9 @@ def book_mentor_session(request, club_id):
             )
             
             from .models import Notification
-            from .utils import create_notification
+            from .utils import queue_notification
             representatives = club.get_representatives()
-            create_notification(
+            queue_notification(
                 representatives,
                 'general',
                 f'New Mentor Session Request from {request.user.username}',
@@ -944,8 +943,8 @@ def update_mentor_session(request, session_id):
             session.save()
             
             from .models import Notification
-            from .utils import create_notification
-            create_notification(
+            from .utils import queue_notification
+            queue_notification(
                 [session.student],
                 'general',
                 f'Mentor Session {status.title()}: {session.mentor_topic}',
@@ -1090,6 +1089,7 @@ def end_club_meeting(request, meeting_id):
 @login_required
 def manage_event_attendance(request, event_id):
     """Founder view to manage event attendance and check in students"""
+    from .checkin import checkin_url, set_scanner_credential
     event = get_object_or_404(Event, id=event_id)
     club = event.club
     
@@ -1098,8 +1098,11 @@ def manage_event_attendance(request, event_id):
         return redirect('club_detail', club_id=club.id)
     
     # Get all registrations for this event
-    registrations = EventAttendance.objects.filter(event=event).select_related('user')
-    checked_in_count = registrations.filter(checked_in_via_qr=True).count()
+    registrations = list(EventAttendance.objects.filter(event=event).select_related('user'))
+    for attendance in registrations:
+        if not attendance.checked_in_via_qr:
+            attendance.scan_url = checkin_url(event, attendance.user)
+    checked_in_count = event.checked_in_count
     
     context = {
         'event': event,
@@ -1107,4 +1110,85 @@ def manage_event_attendance(request, event_id):
         'registrations': registrations,
         'checked_in_count': checked_in_count,
     }
-    return render(request, 'clubs/manage_attendance.html', context)
+    response = render(request, 'clubs/manage_attendance.html', context)
+    # This browser can now check in scanned tokens for the event without further lookups
+    set_scanner_credential(request, response, event)
+    return response
+
+
+def scan_checkin(request, event_id):
+    """Check in the holder of a signed QR token; the scanner is authorized by its signed credential"""
+    from django.core import signing
+    from django.http import HttpResponse
+    from django.template.loader import render_to_string
+    from .checkin import check_in, read_checkin_token, scanner_id
+    
+    def result(status=200, **context):
+        # Rendered without the request so no context processor queries the database
+        return HttpResponse(render_to_string('clubs/scan_result.html', {'event_id': event_id, **context}), status=status)
+    
+    if scanner_id(request, event_id) is None:
+        return result(403, error="Open this event's attendance page on this device before scanning.")
+    try:
+        token = read_checkin_token(request.GET.get('token', ''), event_id)
+    except signing.SignatureExpired:
+        return result(400, error="This check-in code has expired.")
+    except signing.BadSignature:
+        return result(400, error="This is not a valid check-in code for this event.")
+    
+    return result(username=token.username, checked_in=check_in(token))
+
+
+def sync_checkins(request, event_id):
+    """Batch check-in for a door scanner's offline queue: JSON ``{"scans": [...]}`` in, per-scan results out"""
+    import json
+    from .checkin import SYNC_BATCH_LIMIT, check_in_batch, scanner_id
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    if scanner_id(request, event_id) is None:
+        return JsonResponse({'error': 'No scanner credential for this event'}, status=403)
+    try:
+        scans = json.loads(request.body).get('scans')
+    except (ValueError, AttributeError):
+        scans = None
+    if not isinstance(scans, list) or len(scans) > SYNC_BATCH_LIMIT:
+        return JsonResponse({'error': f'Expected a list of at most {SYNC_BATCH_LIMIT} scans'}, status=400)
+    
+    event = get_object_or_404(Event.objects.only('id', 'club_id', 'start_time', 'end_time'), id=event_id)
+    results = check_in_batch(event, scans)
+    return JsonResponse({
+        'results': results,
+        'checked_in': sum(result['status'] == 'checked_in' for result in results),
+    })
+
+
+@login_required
+def export_event_attendance(request, event_id):
+    from .exports import attendance_export
+    from .streaming import streaming_export
+    event = get_object_or_404(Event.objects.select_related('club'), id=event_id)
+    club = event.club
+    
+    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president and not request.user.is_admin():
+        messages.error(request, "Only club representatives can export event attendance.")
+        return redirect('club_detail', club_id=club.id)
+    
+    header, rows = attendance_export(event)
+    return streaming_export(f'event-{event.id}-attendance', header, rows,
+                            file_format=request.GET.get('format', 'csv'), sheet_name=event.title)
+
+
+@login_required
+def export_club_members(request, club_id):
+    from .exports import roster_export
+    from .streaming import streaming_export
+    club = get_object_or_404(Club, id=club_id)
+    
+    if not club.founders.filter(id=request.user.id).exists() and request.user != club.president and request.user != club.vice_president and not request.user.is_admin():
+        messages.error(request, "Only club representatives can export the member roster.")
+        return redirect('club_detail', club_id=club.id)
+    
+    header, rows = roster_export(club, status=request.GET.get('status'))
+    return streaming_export(f'club-{club.id}-members', header, rows,
+                            file_format=request.GET.get('format', 'csv'), sheet_name=club.name)
@@ -1,8 +1,8 @@
-from clubs.models import Notification
+from clubs.utils import get_unread_notification_count
 
 def notification_count(request):
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+        unread_count = get_unread_notification_count(request.user)
         return {
             'unread_notification_count': unread_count
         }
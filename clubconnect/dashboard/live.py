@@ -0,0 +1,183 @@
+"""
+Publish/subscribe plumbing for the live updates stream.
+
+Code that changes a user's unread counts calls ``publish(user_id, event, data)``
+and the ``live_updates`` SSE view forwards it to that user's open tabs. The
+backend is chosen with the LIVE_UPDATES_BACKEND setting:
+
+- ``LocalPubSub`` delivers within the current process only (single worker).
+- ``CachePubSub`` goes through the configured cache, so every worker process
+  sharing that cache (Redis, Memcached) sees every event.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+# Events published to this channel are delivered to every subscriber
+BROADCAST_CHANNEL = '*'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class LocalPubSub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                pass
+
+    def subscribe(self, channels):
+        return LocalSubscription(self, channels)
+
+    def _add(self, channels, entry):
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(entry)
+
+    def _remove(self, channels, entry):
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class LocalSubscription:
+    def __init__(self, backend, channels):
+        self.backend = backend
+        self.channels = list(channels)
+        self.queue = asyncio.Queue()
+        self.entry = (asyncio.get_running_loop(), self.queue)
+        backend._add(self.channels, self.entry)
+
+    async def start(self):
+        # Registered with the backend on creation; nothing to wait for
+        pass
+
+    async def get(self, timeout):
+        """Wait up to ``timeout`` seconds and return the pending events"""
+        events = []
+        if self.queue.empty():
+            if timeout <= 0:
+                return events
+            try:
+                events.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return events
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    def close(self):
+        self.backend._remove(self.channels, self.entry)
+
+
+class CachePubSub:
+    # Each channel is a sequence counter plus one short-lived cache entry per
+    # event; subscribers poll the counters and fetch whatever they missed.
+    EVENT_TIMEOUT = 60
+    POLL_INTERVAL = 1.0
+
+    def publish(self, channel, event):
+        seq_key = f'live_seq_{channel}'
+        if cache.add(seq_key, 1, None):
+            seq = 1
+        else:
+            try:
+                seq = cache.incr(seq_key)
+            except ValueError:
+                cache.set(seq_key, 1, None)
+                seq = 1
+        cache.set(f'live_event_{channel}_{seq}', event, self.EVENT_TIMEOUT)
+
+    def subscribe(self, channels):
+        return CacheSubscription(self, channels)
+
+
+class CacheSubscription:
+    def __init__(self, backend, channels):
+        self.backend = backend
+        self.channels = list(channels)
+        self.last_seen = None
+
+    def _read_sequences(self):
+        keys = {f'live_seq_{channel}': channel for channel in self.channels}
+        values = cache.get_many(keys)
+        return {channel: values.get(key, 0) for key, channel in keys.items()}
+
+    def _poll(self):
+        current = self._read_sequences()
+        if self.last_seen is None:
+            # Only deliver events published after the subscription started
+            self.last_seen = current
+            return []
+        wanted = []
+        for channel, seq in current.items():
+            start = self.last_seen.get(channel, 0)
+            if seq < start:
+                # The counter expired or was reset; start again from here
+                start = 0
+            wanted.extend(f'live_event_{channel}_{n}' for n in range(start + 1, seq + 1))
+        self.last_seen = current
+        if not wanted:
+            return []
+        found = cache.get_many(wanted)
+        return [found[key] for key in wanted if key in found]
+
+    async def start(self):
+        """Note the current sequences, so everything published from now on is delivered"""
+        if self.last_seen is None:
+            await sync_to_async(self._poll)()
+
+    async def get(self, timeout):
+        poll = sync_to_async(self._poll)
+        await self.start()
+        waited = 0.0
+        while True:
+            events = await poll()
+            if events or waited >= timeout:
+                return events
+            await asyncio.sleep(self.backend.POLL_INTERVAL)
+            waited += self.backend.POLL_INTERVAL
+
+    def close(self):
+        pass
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'LIVE_UPDATES_BACKEND', 'dashboard.live.LocalPubSub')
+                _backend = import_string(path)()
+    return _backend
+
+
+def publish(user_id, event, data):
+    """Send ``data`` as an ``event`` to one user, or to everyone with BROADCAST_CHANNEL"""
+    channel = BROADCAST_CHANNEL if user_id == BROADCAST_CHANNEL else user_channel(user_id)
+    get_backend().publish(channel, {'event': event, 'data': data})
+
+
+def subscribe(user_id):
+    return get_backend().subscribe([user_channel(user_id), BROADCAST_CHANNEL])
@@ -0,0 +1,87 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory
+
+from accounts.models import User
+from clubs.models import Message
+from dashboard.views import get_messages
+
+
+def legacy_history(user, other_user):
+    # The pre-pagination implementation: whole history, sender/receiver loaded per message
+    messages = Message.objects.filter(
+        (Q(sender=user, receiver=other_user) | Q(sender=other_user, receiver=user))
+    ).order_by('created_at')
+    return {'messages': [{
+        'id': message.id,
+        'sender': message.sender.username,
+        'receiver': message.receiver.username,
+        'content': message.content,
+        'created_at': message.created_at.isoformat()
+    } for message in messages]}
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and latency of full-history and cursor-paginated message fetches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=10000, help='Messages in the benchmark conversation')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, label, fetch, repeat):
+        timings = []
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        for _ in range(repeat):
+            queries.clear()
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                payload = fetch()
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.stdout.write(
+            f"{label:<28} {len(payload) / 1024:>9.1f} KB {timings[len(timings) // 2] * 1000:>9.1f} ms "
+            f"{len(queries):>6} queries"
+        )
+        return payload
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        count = options['messages']
+        repeat = options['repeat']
+
+        # Everything runs inside a transaction that is rolled back, so the real data is untouched
+        with transaction.atomic():
+            alice = User.objects.create(username='bench_history_alice', password='!')
+            bob = User.objects.create(username='bench_history_bob', password='!')
+            Message.objects.bulk_create([
+                Message(
+                    sender=alice if i % 2 else bob,
+                    receiver=bob if i % 2 else alice,
+                    content=f'Benchmark message number {i} with a little padding text',
+                    is_read=True
+                )
+                for i in range(count)
+            ], batch_size=2000)
+
+            def fetch(**params):
+                request = factory.get('/ajax/messages/', params)
+                request.user = alice
+                return get_messages(request, bob.id).content
+
+            self.stdout.write(f"Conversation with {count} messages")
+            self.stdout.write(f"{'':<28} {'payload':>12} {'median':>12} {'SQL':>13}")
+            self.measure('full history (legacy)', lambda: json.dumps(legacy_history(alice, bob)).encode(), repeat)
+            latest = json.loads(self.measure('latest page', fetch, repeat))
+            self.measure('poll, nothing new', lambda: fetch(after_id=latest['newest_id']), repeat)
+            self.measure('scroll back one page', lambda: fetch(before_id=latest['oldest_id']), repeat)
+
+            transaction.set_rollback(True)
@@ -0,0 +1,251 @@
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from accounts.models import User
+from clubs import urls as clubs_urls
+from clubs.models import (
+    Announcement, Club, ClubFeedback, ClubMeeting, ClubPost, Event, Membership, MentorSession, Message, Notification,
+    BroadcastNotification, Survey,
+)
+from clubs.seeding import seed_dataset
+from dashboard import metrics
+from dashboard import urls as dashboard_urls
+
+DEFAULT_SCALES = '100,10000,100000'
+DEFAULT_QUERY_BUDGET = 25
+DEFAULT_P95_MS = 500
+
+# Per-view overrides of DEFAULT_QUERY_BUDGET
+QUERY_BUDGETS = {
+    'club_detail': 30,
+    'dashboard': 30,
+    'home': 30,
+}
+
+# A view may issue a few more queries on a bigger dataset (a page that was
+# empty now has rows); anything beyond this means it queries per row.
+GROWTH_ALLOWANCE = 3
+
+SKIPPED_ROUTES = {
+    'live_updates': 'holds the connection open as a Server-Sent Events stream',
+}
+
+ROLES = ('student', 'founder', 'admin')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database at several sizes, request every clubs and dashboard URL as each role "
+        "and enforce per-view SQL query budgets and p95 latency ceilings"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default=DEFAULT_SCALES, help='Comma separated dataset sizes in rows')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per route and role')
+        parser.add_argument('--p95-ms', type=float, default=DEFAULT_P95_MS, help='Latency ceiling per request')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--route', action='append', dest='routes', help='Only check these URL names')
+
+    def handle(self, *args, **options):
+        scales = sorted(int(scale) for scale in options['scales'].split(','))
+        routes = [
+            pattern for pattern in clubs_urls.urlpatterns + dashboard_urls.urlpatterns
+            if not options['routes'] or pattern.name in options['routes']
+        ]
+
+        # 4xx/5xx responses are reported in the summary instead of being logged per request
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+
+        try:
+            with tempfile.TemporaryDirectory() as scratch:
+                results = self.run_isolated(Path(scratch), scales, routes, options)
+        finally:
+            request_logger.setLevel(log_level)
+
+        failures = self.report(scales, results, options['p95_ms'])
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f"{len(failures)} query budget check(s) failed")
+        self.stdout.write(self.style.SUCCESS("All views within budget"))
+
+    def run_isolated(self, scratch, scales, routes, options):
+        """Measure every scale against a throwaway database, cache, autocomplete snapshot and metrics directory"""
+        isolated = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budget'}},
+            LIVE_UPDATES_BACKEND='dashboard.live.LocalPubSub',
+            AUTOCOMPLETE_SNAPSHOT=scratch / 'autocomplete.pickle',
+            METRICS_DIR=scratch / 'metrics',
+        )
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            with isolated:
+                results = {}
+                for scale in scales:
+                    self.stdout.write(f"Seeding {scale} rows...")
+                    call_command('flush', interactive=False, verbosity=0)
+                    cache.clear()
+                    seed_dataset(scale, seed=options['seed'])
+                    self.run_scale(scale, routes, options, results)
+                # Otherwise the exit flush would write these requests into the real METRICS_DIR
+                metrics.registry.discard()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        return results
+
+    def fixtures(self):
+        """Pick the busiest club and its people so each view sees as much data as the scale allows"""
+        club = Club.objects.order_by('-approved_member_count', 'pk').first()
+        founder = club.founders.order_by('pk').first()
+        student = User.objects.filter(
+            membership__club=club, membership__status='approved'
+        ).annotate(sent=Count('sent_messages')).order_by('-sent', 'pk').first()
+        admin = User.objects.filter(user_type='admin').order_by('pk').first()
+        event = club.events.order_by('-registration_count', 'pk').first() or Event.objects.order_by('pk').first()
+
+        meeting = ClubMeeting.objects.filter(club=club).order_by('pk').first()
+        if meeting is None:
+            meeting = ClubMeeting.objects.create(
+                club=club, title='Budget check', description='', scheduled_time=event.start_time,
+                created_by=founder, meeting_link=f'/clubs/{club.id}/meeting/budgetcheck0/'
+            )
+        ClubMeeting.objects.filter(pk=meeting.pk).update(status='started', is_active=True)
+
+        shared = {
+            'club_id': club.id,
+            'event_id': event.id,
+            'membership_id': (
+                Membership.objects.filter(club=club, status='pending').order_by('pk').values_list('pk', flat=True)
+                .first() or Membership.objects.filter(club=club).order_by('pk').values_list('pk', flat=True).first()
+            ),
+            'announcement_id': (
+                Announcement.objects.filter(club=club).order_by('pk').values_list('pk', flat=True).first()
+                or Announcement.objects.order_by('pk').values_list('pk', flat=True).first()
+            ),
+            'survey_id': (
+                Survey.objects.filter(club=club).order_by('pk').values_list('pk', flat=True).first()
+                or Survey.objects.order_by('pk').values_list('pk', flat=True).first()
+            ),
+            'post_id': ClubPost.objects.filter(club=club).order_by('-like_count', 'pk').values_list('pk', flat=True)
+            .first() or ClubPost.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'feedback_id': ClubFeedback.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'session_id': MentorSession.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'meeting_id': meeting.id,
+            'meeting_link': meeting.meeting_link.rstrip('/').rsplit('/', 1)[-1],
+            'broadcast_id': BroadcastNotification.objects.order_by('pk').values_list('pk', flat=True).first(),
+        }
+
+        users = {'student': student, 'founder': founder, 'admin': admin}
+        per_role = {}
+        for role, user in users.items():
+            partner = (
+                Message.objects.filter(Q(sender=user) | Q(receiver=user)).exclude(sender=user)
+                .values('sender').annotate(total=Count('pk')).order_by('-total', 'sender')
+                .values_list('sender', flat=True).first()
+            ) or next(other.pk for other in users.values() if other.pk != user.pk)
+            per_role[role] = dict(
+                shared,
+                user_id=partner,
+                message_id=Message.objects.filter(sender=user).order_by('-pk').values_list('pk', flat=True).first()
+                or 0,
+                notification_id=Notification.objects.filter(user=user).order_by('-pk')
+                .values_list('pk', flat=True).first() or 0,
+            )
+        return users, per_role
+
+    def measure(self, client, url, repeat):
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # One unmeasured request first so cold caches (counters, sessions) don't count
+        self.request(client, url)
+        counts, timings, status = [], [], None
+        for _ in range(repeat):
+            queries.clear()
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                status = self.request(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            counts.append(len(queries))
+        return {'queries': max(counts), 'p95': percentile(timings, 0.95), 'status': status}
+
+    def request(self, client, url):
+        response = client.get(url)
+        if getattr(response, 'streaming', False):
+            response.close()
+        return response.status_code
+
+    def run_scale(self, scale, routes, options, results):
+        users, per_role = self.fixtures()
+        clients = {}
+        for role, user in users.items():
+            clients[role] = Client(raise_request_exception=False)
+            clients[role].force_login(user)
+
+        for pattern in routes:
+            if pattern.name in SKIPPED_ROUTES:
+                continue
+            for role in ROLES:
+                kwargs = {name: per_role[role][name] for name in pattern.pattern.converters}
+                url = reverse(pattern.name, kwargs=kwargs)
+                results.setdefault((pattern.name, role), {})[scale] = self.measure(
+                    clients[role], url, options['repeat']
+                )
+
+    def report(self, scales, results, p95_ceiling):
+        failures = []
+        header = f"{'view':<28} {'role':<8}" + ''.join(f" {scale:>9}" for scale in scales) + f" {'p95 ms':>9}  status"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for (name, role), by_scale in sorted(results.items()):
+            budget = QUERY_BUDGETS.get(name, DEFAULT_QUERY_BUDGET)
+            counts = [by_scale[scale]['queries'] for scale in scales]
+            largest = by_scale[scales[-1]]
+            problems = []
+
+            if max(counts) > budget:
+                problems.append(f"{max(counts)} queries, budget {budget}")
+            if len(scales) > 1 and counts[-1] - counts[0] > GROWTH_ALLOWANCE:
+                problems.append(f"queries grow with data ({counts[0]} -> {counts[-1]})")
+            if largest['p95'] > p95_ceiling:
+                problems.append(f"p95 {largest['p95']:.0f} ms over {p95_ceiling:.0f} ms")
+            errors = [scale for scale in scales if by_scale[scale]['status'] >= 500]
+            if errors:
+                problems.append(f"server error at {', '.join(map(str, errors))} rows")
+
+            line = f"{name:<28} {role:<8}" + ''.join(f" {count:>9}" for count in counts)
+            line += f" {largest['p95']:>9.1f}  {largest['status']}"
+            if problems:
+                line = self.style.ERROR(line)
+                failures.extend(f"{name} as {role}: {problem}" for problem in problems)
+            self.stdout.write(line)
+
+        skipped = ', '.join(f"{name} ({reason})" for name, reason in SKIPPED_ROUTES.items())
+        self.stdout.write(f"Skipped: {skipped}")
+        return failures
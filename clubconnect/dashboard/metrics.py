@@ -0,0 +1,266 @@
+"""
+Application metrics in the Prometheus text format.
+
+Each worker process keeps its counters and histograms in memory and writes a
+snapshot to ``METRICS_DIR/<pid>-<start>.json`` every few seconds. The
+``/metrics`` view merges every snapshot in the directory, so whichever worker
+serves the scrape reports totals for the whole host. Nothing is computed from
+the database at scrape time except two indexed, briefly cached meeting counts.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends import locmem, redis
+
+HISTOGRAM_BUCKETS = {
+    'clubconnect_http_request_duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    'clubconnect_notification_fanout_size': (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+    'clubconnect_qr_generation_seconds': (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+}
+
+HELP = {
+    'clubconnect_http_requests_total': 'Requests served, by URL name, method and status',
+    'clubconnect_http_request_duration_seconds': 'Request latency by URL name',
+    'clubconnect_db_queries_total': 'SQL queries issued while serving requests, by URL name',
+    'clubconnect_db_query_seconds_total': 'Time spent in SQL while serving requests, by URL name',
+    'clubconnect_cache_requests_total': 'Default cache lookups by result',
+    'clubconnect_cache_hit_ratio': 'Share of default cache lookups that were hits',
+    'clubconnect_notification_fanout_size': 'Users notified per create_notification call',
+    'clubconnect_qr_generation_seconds': 'Time to render and store an event QR code',
+    'clubconnect_active_meetings': 'Club meetings currently started',
+    'clubconnect_active_meeting_participants': 'Participants of club meetings currently started',
+}
+
+FLUSH_INTERVAL = 5
+# Snapshots from processes that stopped this long ago are dropped
+STALE_SNAPSHOT_SECONDS = 60 * 60 * 24
+GAUGE_CACHE_TIMEOUT = 15
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in sorted(labels.items())
+    )
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'clubconnect-metrics')
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.started = int(time.time() * 1000)
+        self.counters = defaultdict(lambda: defaultdict(float))
+        # name -> labels -> [per-bucket counts..., +Inf count, sum, count]
+        self.histograms = defaultdict(dict)
+        self.last_flush = 0.0
+
+    def _check_fork(self):
+        # A forked worker inherits its parent's numbers; start from zero under its own file
+        if os.getpid() != self.pid:
+            self._reset()
+
+    def inc(self, name, labels=None, value=1):
+        with self.lock:
+            self._check_fork()
+            self.counters[name][format_labels(labels)] += value
+        self.maybe_flush()
+
+    def observe(self, name, value, labels=None):
+        bounds = HISTOGRAM_BUCKETS[name]
+        key = format_labels(labels)
+        with self.lock:
+            self._check_fork()
+            series = self.histograms[name].get(key)
+            if series is None:
+                series = self.histograms[name][key] = [0] * (len(bounds) + 1) + [0.0, 0]
+            series[bisect_left(bounds, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+        self.maybe_flush()
+
+    def discard(self):
+        """Forget everything recorded so far without writing it out"""
+        with self.lock:
+            self._reset()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self._check_fork()
+            self.last_flush = time.monotonic()
+            if not self.counters and not self.histograms:
+                return
+            snapshot = json.dumps({'counters': self.counters, 'histograms': self.histograms})
+            filename = f'{self.pid}-{self.started}.json'
+        directory = metrics_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, filename)
+            with open(path + '.tmp', 'w') as f:
+                f.write(snapshot)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            # Metrics must never break a request
+            pass
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def inc(name, labels=None, value=1):
+    registry.inc(name, labels, value)
+
+
+def observe(name, value, labels=None):
+    registry.observe(name, value, labels)
+
+
+def record_request(view, method, status, duration, queries, sql_duration):
+    labels = {'view': view}
+    registry.inc('clubconnect_http_requests_total', dict(labels, method=method, status=status))
+    registry.observe('clubconnect_http_request_duration_seconds', duration, labels)
+    registry.inc('clubconnect_db_queries_total', labels, queries)
+    registry.inc('clubconnect_db_query_seconds_total', labels, sql_duration)
+
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """Counts hits and misses on the cache it's mixed into; see the cache backends below"""
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        registry.inc('clubconnect_cache_requests_total', {'result': 'hit' if hit else 'miss'})
+        return value if hit else default
+
+
+# Backends for CACHES['default'] in settings. LocMemCache's get_many() loops
+# over get(), which is already counted; Redis fetches them in one round trip.
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(CacheMetricsMixin, redis.RedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        if found:
+            registry.inc('clubconnect_cache_requests_total', {'result': 'hit'}, len(found))
+        if len(keys) > len(found):
+            registry.inc('clubconnect_cache_requests_total', {'result': 'miss'}, len(keys) - len(found))
+        return found
+
+
+def collect():
+    """Merge the snapshots of every worker process"""
+    registry.flush()
+    counters = defaultdict(lambda: defaultdict(float))
+    histograms = defaultdict(dict)
+    directory = metrics_dir()
+    try:
+        filenames = [name for name in os.listdir(directory) if name.endswith('.json')]
+    except OSError:
+        filenames = []
+
+    now = time.time()
+    for filename in filenames:
+        path = os.path.join(directory, filename)
+        try:
+            if now - os.path.getmtime(path) > STALE_SNAPSHOT_SECONDS:
+                os.remove(path)
+                continue
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, series in snapshot.get('counters', {}).items():
+            for labels, value in series.items():
+                counters[name][labels] += value
+        for name, series in snapshot.get('histograms', {}).items():
+            for labels, values in series.items():
+                merged = histograms[name].get(labels)
+                if merged is None or len(merged) != len(values):
+                    histograms[name][labels] = list(values)
+                else:
+                    histograms[name][labels] = [a + b for a, b in zip(merged, values)]
+    return counters, histograms
+
+
+def meeting_gauges():
+    gauges = cache.get('metrics_meeting_gauges')
+    if gauges is None:
+        from clubs.models import ClubMeeting
+        active = ClubMeeting.objects.filter(status='started')
+        gauges = {
+            'clubconnect_active_meetings': active.count(),
+            'clubconnect_active_meeting_participants': ClubMeeting.participants.through.objects.filter(
+                clubmeeting__status='started'
+            ).count(),
+        }
+        cache.set('metrics_meeting_gauges', gauges, GAUGE_CACHE_TIMEOUT)
+    return gauges
+
+
+def _series(name, labels, value):
+    return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+
+    def header(name, kind):
+        lines.append(f'# HELP {name} {HELP.get(name, name)}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    for name in sorted(counters):
+        header(name, 'counter')
+        for labels, value in sorted(counters[name].items()):
+            lines.append(_series(name, labels, value))
+
+    for name in sorted(histograms):
+        header(name, 'histogram')
+        bounds = HISTOGRAM_BUCKETS.get(name, ())
+        for labels, values in sorted(histograms[name].items()):
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, count in zip(list(bounds) + ['+Inf'], values[:-2]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(_series(f'{name}_sum', labels, values[-2]))
+            lines.append(_series(f'{name}_count', labels, values[-1]))
+
+    cache_requests = counters.get('clubconnect_cache_requests_total', {})
+    hits = cache_requests.get(format_labels({'result': 'hit'}), 0)
+    lookups = hits + cache_requests.get(format_labels({'result': 'miss'}), 0)
+    header('clubconnect_cache_hit_ratio', 'gauge')
+    lines.append(_series('clubconnect_cache_hit_ratio', '', hits / lookups if lookups else 0))
+
+    for name, value in meeting_gauges().items():
+        header(name, 'gauge')
+        lines.append(_series(name, '', value))
+
+    return '\n'.join(lines) + '\n'
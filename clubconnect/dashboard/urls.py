@@ -13,11 +13,15 @@ urlpatterns = [
     path('ajax/unread_messages_count/', views.unread_messages_count, name='unread_messages_count'),
     path('my_week/', views.my_week, name='my_week'),
     path('search/', views.search, name='search'),
+    path('ajax/autocomplete/', views.autocomplete, name='autocomplete'),
     path('notifications/', views.notifications, name='notifications'),
     path('notifications/mark-read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/mark-broadcast-read/<int:broadcast_id>/', views.mark_broadcast_read, name='mark_broadcast_read'),
     path('ajax/unread_notifications_count/', views.get_unread_notifications_count, name='get_unread_notifications_count'),
+    path('live/', views.live_updates, name='live_updates'),
     path('ajax/admin_analytics/', views.admin_analytics_data, name='admin_analytics_data'),
     path('activity-feed/', views.activity_feed, name='activity_feed'),
+    path('ajax/activity-feed/', views.activity_feed_page, name='activity_feed_page'),
     path('my-clubs/', views.my_clubs, name='my_clubs'),
     path('home/', views.dashboard, name='home'),
     path('manage-users/', views.manage_users, name='manage_users'),
@@ -31,4 +35,5 @@ urlpatterns = [
     path('announcement/<int:announcement_id>/delete/', views.delete_announcement, name='delete_announcement'),
     path('reset-password/<int:user_id>/', views.reset_user_password, name='reset_user_password'),
     path('club-meetings/', views.student_club_meetings, name='student_club_meetings'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -2,9 +2,12 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
-from clubs.models import Club, Event, Membership, Message, Announcement
+from clubs.models import Club, Event, Membership, Message, Announcement, Conversation
+from clubs.utils import send_direct_message, mark_conversation_read
 from accounts.models import User
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.paginator import Paginator
 from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 import json
@@ -35,6 +38,9 @@ def profile(request):
     }
     return render(request, 'dashboard/profile.html', context)
 
+# Recommended clubs shown on the student dashboard
+RECOMMENDED_CLUBS = 6
+
 @login_required
 def dashboard(request):
     user = request.user
@@ -57,8 +63,9 @@ def dashboard(request):
     next_event = events.first()
     recent_messages = Message.objects.filter(receiver=user).order_by('-created_at')[:3]
     
-    # Gamification: Club of the Week
-    club_of_the_week = Club.objects.order_by('?').first()
+    # Gamification: Club of the Week, picked weekly by the select_featured_club command
+    from clubs.featured import get_featured_club
+    club_of_the_week = get_featured_club()
 
     context = {
         'clubs': clubs,
@@ -116,35 +123,33 @@ def dashboard(request):
         })
         return render(request, 'dashboard/founder_dashboard.html', context)
     else:  # Default to student dashboard
+        from clubs.models import ClubRecommendation
+        # Precomputed by the compute_recommendations command; never calculated here
+        recommendations = ClubRecommendation.objects.filter(user=user).select_related('club')[:RECOMMENDED_CLUBS]
+        context['recommended_clubs'] = [recommendation.club for recommendation in recommendations]
+        from clubs.tags import get_tag_facets
+        context['tag_facets'] = get_tag_facets()
         return render(request, 'dashboard/student_dashboard.html', context)
 
 @login_required
 def chat_view(request):
     user = request.user
-    # Get all conversations for the current user
-    conversations = Message.objects.filter(Q(sender=request.user) | Q(receiver=request.user)).order_by('-created_at')
+    # Conversations are maintained per user pair, so the inbox is one indexed query
+    conversations = Conversation.objects.filter(
+        Q(user_low=user) | Q(user_high=user)
+    ).select_related('user_low', 'user_high', 'last_message').order_by('-last_message_at')
 
-    # Get a unique list of users the current user has had conversations with
     users_with_last_message = []
-    users_in_conversations = []
-
-    for message in conversations:
-        other_user = None
-        if message.sender != request.user and message.sender not in users_in_conversations:
-            other_user = message.sender
-            users_in_conversations.append(other_user)
-        elif message.receiver != request.user and message.receiver not in users_in_conversations:
-            other_user = message.receiver
-            users_in_conversations.append(other_user)
-        
-        if other_user:
-            last_message = Message.objects.filter(
-                (Q(sender=request.user, receiver=other_user) | Q(sender=other_user, receiver=request.user))
-            ).latest('created_at')
-            users_with_last_message.append({
-                'user': other_user,
-                'last_message': last_message
-            })
+    users_in_conversations = set()
+
+    for conversation in conversations:
+        other_user = conversation.other_user(user)
+        users_in_conversations.add(other_user.id)
+        users_with_last_message.append({
+            'user': other_user,
+            'last_message': conversation.last_message,
+            'unread_count': conversation.unread_for(user),
+        })
 
     # Build recipient list based on role
     candidates = User.objects.exclude(id=user.id)
@@ -167,10 +172,11 @@ def chat_view(request):
 
     # Add users from allowed_recipients who are not in conversations yet
     for recipient in allowed_recipients:
-        if recipient not in users_in_conversations:
+        if recipient.id not in users_in_conversations:
             users_with_last_message.append({
                 'user': recipient,
-                'last_message': None
+                'last_message': None,
+                'unread_count': 0,
             })
 
     context = {
@@ -185,42 +191,45 @@ def chat_view(request):
 def my_week(request):
     return render(request, 'dashboard/my_week.html')
 
+SEARCH_PAGE_SIZE = 20
+
 @login_required
 def search(request):
+    from clubs.search import SearchResults, load_objects
     query = request.GET.get('q')
     results = {}
+    page_obj = None
     if query:
-        # Search users, clubs, events, and announcements
-        user_results = User.objects.filter(
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )
-        club_results = Club.objects.filter(name__icontains=query)
-        event_results = Event.objects.filter(title__icontains=query)
-        announcement_results = Announcement.objects.filter(title__icontains=query)
-
-        if user_results:
-            results['users'] = list(user_results)
-        if club_results:
-            results['clubs'] = list(club_results)
-        if event_results:
-            results['events'] = list(event_results)
-        if announcement_results:
-            results['announcements'] = list(announcement_results)
+        # Ranked across users, clubs, events and announcements by the full-text index
+        page_obj = Paginator(SearchResults(query), SEARCH_PAGE_SIZE).get_page(request.GET.get('page'))
+        for object_type, obj in load_objects(page_obj.object_list):
+            results.setdefault(f'{object_type}s', []).append(obj)
 
     context = {
         'query': query,
         'results': results,
+        'page_obj': page_obj,
     }
     return render(request, 'dashboard/search_results.html', context)
 
+AUTOCOMPLETE_LIMIT = 8
+
+@login_required
+def autocomplete(request):
+    """Prefix matches for the search box, served from the in-memory index"""
+    from clubs.autocomplete import KINDS, autocomplete as lookup
+    kinds = [kind for kind in request.GET.get('types', '').split(',') if kind in KINDS] or KINDS
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), 20)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    return JsonResponse({'results': lookup(request.GET.get('q', ''), kinds, limit)})
+
 @login_required
 def notifications(request):
-    from clubs.models import Notification
-    all_notifications = Notification.objects.filter(user=request.user)
-    unread_count = all_notifications.filter(is_read=False).count()
-    user_notifications = all_notifications.order_by('-created_at')[:20]
+    from clubs.utils import get_user_notifications, get_unread_notification_count
+    unread_count = get_unread_notification_count(request.user)
+    user_notifications = get_user_notifications(request.user, limit=20)
     
     context = {
         'notifications': user_notifications,
@@ -349,12 +358,9 @@ def create_announcement(request):
                 club=None
             )
             
-            from clubs.models import Notification
-            from clubs.utils import create_notification
+            from clubs.utils import create_broadcast_notification
             
-            all_users = User.objects.all()
-            create_notification(
-                all_users,
+            create_broadcast_notification(
                 'announcement',
                 f'New Announcement: {title}',
                 content,
@@ -422,6 +428,8 @@ def delete_announcement(request, announcement_id):
     return redirect(redirect_url)
 
 
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
 
 
 @login_required
@@ -430,25 +438,56 @@ def get_messages(request, user_id):
         return JsonResponse({'error': 'User not authenticated'}, status=401)
 
     other_user = get_object_or_404(User, id=user_id)
-    
-    # Mark messages as read
-    Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
 
-    messages = Message.objects.filter(
+    # Cursor pagination: after_id fetches messages newer than the client's last
+    # poll, before_id scrolls back through older history, neither returns the
+    # most recent page.
+    try:
+        after_id = int(request.GET['after_id']) if request.GET.get('after_id') else None
+        before_id = int(request.GET['before_id']) if request.GET.get('before_id') else None
+        limit = int(request.GET.get('limit', MESSAGE_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'after_id, before_id and limit must be integers'}, status=400)
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+
+    # Scrolling back through history does not mean the user has seen new messages
+    if before_id is None:
+        mark_conversation_read(request.user, other_user)
+
+    history = Message.objects.filter(
         (Q(sender=request.user, receiver=other_user) | Q(sender=other_user, receiver=request.user))
-    ).order_by('created_at')
-
+    )
+    if after_id is not None:
+        page = list(history.filter(id__gt=after_id).order_by('id')
+                    .values('id', 'sender_id', 'content', 'created_at')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+    else:
+        if before_id is not None:
+            history = history.filter(id__lt=before_id)
+        page = list(history.order_by('-id').values('id', 'sender_id', 'content', 'created_at')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+
+    # Only two people take part, so usernames come from memory instead of joins
+    usernames = {request.user.id: request.user.username, other_user.id: other_user.username}
     message_list = []
-    for message in messages:
+    for message in page:
+        receiver_id = other_user.id if message['sender_id'] == request.user.id else request.user.id
         message_list.append({
-            'id': message.id,
-            'sender': message.sender.username,
-            'receiver': message.receiver.username,
-            'content': message.content,
-            'created_at': message.created_at.isoformat()
+            'id': message['id'],
+            'sender': usernames[message['sender_id']],
+            'receiver': usernames[receiver_id],
+            'content': message['content'],
+            'created_at': message['created_at'].isoformat()
         })
 
-    return JsonResponse({'messages': message_list})
+    return JsonResponse({
+        'messages': message_list,
+        'has_more': has_more,
+        'oldest_id': message_list[0]['id'] if message_list else before_id,
+        'newest_id': message_list[-1]['id'] if message_list else after_id,
+    })
 
 @require_POST
 @login_required
@@ -460,6 +499,7 @@ def edit_message(request, message_id):
     if new_content:
         message.content = new_content
         message.save()
+        Conversation.refresh_preview(message)
         return JsonResponse({'status': 'Message edited'})
     return JsonResponse({'error': 'No content provided'}, status=400)
 
@@ -469,13 +509,14 @@ def unsend_message(request, message_id):
     message = get_object_or_404(Message, id=message_id, sender=request.user)
     message.content = "This message was unsent."
     message.save()
+    Conversation.refresh_preview(message)
     return JsonResponse({'status': 'Message unsent'})
 
 @require_POST
 @login_required
 def mark_messages_as_read(request, user_id):
     other_user = get_object_or_404(User, id=user_id)
-    Message.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
+    mark_conversation_read(request.user, other_user)
     return JsonResponse({'status': 'ok'})
 
 @login_required
@@ -504,11 +545,7 @@ def send_message(request):
             return JsonResponse({'error': 'Missing receiver_id or content'}, status=400)
 
         receiver = get_object_or_404(User, id=receiver_id)
-        message = Message.objects.create(
-            sender=request.user,
-            receiver=receiver,
-            content=content
-        )
+        send_direct_message(request.user, receiver, content)
 
         return JsonResponse({'status': 'Message sent'})
 
@@ -518,19 +555,78 @@ def send_message(request):
 @login_required
 def mark_notification_read(request, notification_id):
     from clubs.models import Notification
+    from clubs.utils import mark_notification_read as mark_read
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    mark_read(request.user, notification.id)
+    return JsonResponse({'status': 'success'})
+
+
+@login_required
+def mark_broadcast_read(request, broadcast_id):
+    from clubs.models import BroadcastNotification
+    from clubs.utils import mark_broadcast_read as record_receipt
+    broadcast = get_object_or_404(BroadcastNotification, id=broadcast_id)
+    record_receipt(request.user, broadcast)
     return JsonResponse({'status': 'success'})
 
 
 @login_required
 def get_unread_notifications_count(request):
-    from clubs.models import Notification
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    from clubs.utils import get_unread_notification_count
+    unread_count = get_unread_notification_count(request.user)
     return JsonResponse({'unread_count': unread_count})
 
 
+def _unread_counts(user):
+    from clubs.utils import get_unread_notification_count
+    return {
+        'unread_notifications': get_unread_notification_count(user),
+        'unread_messages': Message.objects.filter(receiver=user, is_read=False).count(),
+    }
+
+
+@login_required
+async def live_updates(request):
+    """Server-Sent Events stream of unread notification and message deltas"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream and never send a byte,
+        # holding a thread per open tab. 204 tells EventSource not to reconnect,
+        # and live_updates.js polls the JSON count endpoints instead.
+        return HttpResponse(status=204)
+
+    from asgiref.sync import sync_to_async
+    from .live import subscribe
+
+    user = await request.auser()
+
+    async def stream():
+        # Subscribe before reading the counts so nothing published in between is lost
+        subscription = subscribe(user.id)
+        try:
+            await subscription.start()
+            for _ in range(3):
+                snapshot = await sync_to_async(_unread_counts)(user)
+                # Deltas that arrived while the counts were read may or may not be in
+                # them; drop them and read again so the snapshot isn't off by one
+                if not await subscription.get(timeout=0):
+                    break
+            yield f"retry: 5000\nevent: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                events = await subscription.get(timeout=15)
+                if not events:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                for item in events:
+                    yield f"event: {item['event']}\ndata: {json.dumps(item['data'])}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def admin_analytics_data(request):
     if not request.user.is_admin():
@@ -587,52 +683,48 @@ def admin_analytics_data(request):
     })
 
 
+ACTIVITY_PAGE_SIZE = 20
+
+
+def activity_feed_items(request, cursor=None):
+    """``(scope, items, next_cursor)`` for the requested scope: the user's own clubs by default, or everything"""
+    from clubs.activity import activity_page
+    from clubs.feed import get_feed_list, personal_feed
+    scope = request.GET.get('scope')
+    if scope != 'all':
+        # Users who haven't joined anything yet get the campus-wide feed
+        scope = 'mine' if scope == 'mine' or get_feed_list(request.user.pk)['followed'] else 'all'
+    if scope == 'mine':
+        return (scope,) + personal_feed(request.user, cursor=cursor, limit=ACTIVITY_PAGE_SIZE)
+    return (scope,) + activity_page(cursor=cursor, limit=ACTIVITY_PAGE_SIZE)
+
+
 @login_required
 def activity_feed(request):
-    from clubs.models import ClubPost
-    from datetime import timedelta
-    
-    now = timezone.now()
-    recent_announcements = Announcement.objects.all().order_by('-created_at')[:10]
-    upcoming_events = Event.objects.filter(start_time__gte=now).order_by('start_time')[:10]
-    recent_posts = ClubPost.objects.all().order_by('-created_at')[:10]
-    
-    activity_items = []
-    
-    for announcement in recent_announcements:
-        activity_items.append({
-            'type': 'announcement',
-            'title': announcement.title,
-            'content': announcement.content,
-            'club': announcement.club.name if announcement.club else 'General',
-            'created_at': announcement.created_at,
-            'link': f'/clubs/{announcement.club.id}/' if announcement.club else '#',
-        })
-    
-    for event in upcoming_events:
-        activity_items.append({
-            'type': 'event',
-            'title': event.title,
-            'content': event.description,
-            'club': event.club.name,
-            'created_at': event.start_time,
-            'link': f'/clubs/{event.club.id}/',
-        })
+    scope, activities, next_cursor = activity_feed_items(request)
     
-    for post in recent_posts:
-        activity_items.append({
-            'type': 'post',
-            'title': post.title,
-            'content': post.content,
-            'club': post.club.name,
-            'created_at': post.created_at,
-            'link': f'/clubs/{post.club.id}/',
-        })
+    context = {
+        'activities': activities,
+        'next_cursor': next_cursor,
+        'scope': scope,
+    }
+    return render(request, 'dashboard/activity_feed.html', context)
+
+
+@login_required
+def activity_feed_page(request):
+    """Next page of the activity feed for infinite scroll, keyset paginated by ``cursor``"""
+    from clubs.activity import serialize_item
     
-    activity_items.sort(key=lambda x: x['created_at'], reverse=True)
-    activity_items = activity_items[:20]
+    try:
+        _, activities, next_cursor = activity_feed_items(request, cursor=request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
     
-    return render(request, 'dashboard/activity_feed.html', {'activity_items': activity_items})
+    return JsonResponse({
+        'activities': [serialize_item(item) for item in activities],
+        'next_cursor': next_cursor,
+    })
 
 
 @login_required
@@ -656,3 +748,15 @@ def student_club_meetings(request):
     }
     
     return render(request, 'dashboard/student_club_meetings.html', context)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, open to METRICS_ALLOWED_IPS and to admins"""
+    from django.conf import settings
+    from .metrics import render as render_metrics
+
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+    is_admin = request.user.is_authenticated and request.user.is_admin()
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not is_admin:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,82 @@
+class ActivityFeed {
+    constructor(options) {
+        this.list = document.querySelector(options.listSelector);
+        this.more = document.querySelector(options.moreSelector);
+        this.url = options.url;
+        this.loading = false;
+
+        if (!this.list || !this.more) {
+            return;
+        }
+        this.cursor = this.more.dataset.cursor;
+        this.observer = new IntersectionObserver((entries) => {
+            if (entries.some((entry) => entry.isIntersecting)) {
+                this.load();
+            }
+        }, {rootMargin: '400px'});
+        this.observer.observe(this.more);
+    }
+
+    async load() {
+        if (this.loading || !this.cursor) {
+            return;
+        }
+        this.loading = true;
+        try {
+            const response = await fetch(`${this.url}&cursor=${encodeURIComponent(this.cursor)}`);
+            const data = await response.json();
+            (data.activities || []).forEach((activity) => this.list.appendChild(this.render(activity)));
+            this.cursor = data.next_cursor;
+            if (!this.cursor) {
+                this.observer.disconnect();
+                this.more.remove();
+            }
+        } catch (error) {
+            console.error('Loading activity failed:', error);
+        } finally {
+            this.loading = false;
+        }
+    }
+
+    element(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) {
+            node.className = className;
+        }
+        if (text) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    render(activity) {
+        const icons = {
+            announcement: 'fa-bullhorn text-primary',
+            event: 'fa-calendar text-success',
+            post: 'fa-image text-warning',
+        };
+        const card = this.element('div', 'card mb-3');
+        const body = this.element('div', 'card-body');
+        const title = this.element('h5', 'card-title');
+        title.appendChild(this.element('i', `fas ${icons[activity.type]}`));
+        title.appendChild(document.createTextNode(` ${activity.title}`));
+        body.appendChild(title);
+        body.appendChild(this.element('p', 'card-text', activity.summary));
+        if (activity.type === 'event') {
+            body.appendChild(this.element('p', null, activity.location));
+            body.appendChild(this.element('p', null, new Date(activity.starts_at).toLocaleString()));
+        }
+        const meta = this.element('small', 'text-muted');
+        if (activity.link) {
+            const link = this.element('a', null, activity.club);
+            link.href = activity.link;
+            meta.appendChild(link);
+        } else {
+            meta.appendChild(document.createTextNode(activity.club));
+        }
+        meta.appendChild(document.createTextNode(` - ${new Date(activity.created_at).toLocaleString()}`));
+        body.appendChild(meta);
+        card.appendChild(body);
+        return card;
+    }
+}
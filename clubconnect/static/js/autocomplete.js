@@ -0,0 +1,103 @@
+class SearchAutocomplete {
+    constructor(options) {
+        this.input = document.querySelector(options.inputSelector);
+        this.url = options.url;
+        this.delay = options.delay || 120;
+        this.timer = null;
+        this.controller = null;
+        this.results = [];
+        this.active = -1;
+
+        if (!this.input) {
+            return;
+        }
+        this.input.setAttribute('autocomplete', 'off');
+
+        this.menu = document.createElement('ul');
+        this.menu.className = 'dropdown-menu';
+        this.input.parentNode.style.position = 'relative';
+        this.menu.style.top = '100%';
+        this.menu.style.left = '0';
+        this.input.parentNode.appendChild(this.menu);
+
+        this.input.addEventListener('input', () => this.schedule());
+        this.input.addEventListener('keydown', (e) => this.onKeyDown(e));
+        this.input.addEventListener('blur', () => setTimeout(() => this.hide(), 150));
+    }
+
+    schedule() {
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => this.fetch(), this.delay);
+    }
+
+    async fetch() {
+        const query = this.input.value.trim();
+        if (!query) {
+            this.hide();
+            return;
+        }
+        // Only the latest keystroke's response matters
+        if (this.controller) {
+            this.controller.abort();
+        }
+        this.controller = new AbortController();
+        try {
+            const response = await fetch(`${this.url}?q=${encodeURIComponent(query)}`, {
+                signal: this.controller.signal,
+            });
+            const data = await response.json();
+            this.render(data.results || []);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Autocomplete failed:', error);
+            }
+        }
+    }
+
+    render(results) {
+        this.results = results;
+        this.active = -1;
+        this.menu.innerHTML = '';
+        if (!results.length) {
+            this.hide();
+            return;
+        }
+        const icons = {club: 'fa-users', event: 'fa-calendar', user: 'fa-user'};
+        results.forEach((result) => {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            link.className = 'dropdown-item';
+            link.href = result.url;
+            const icon = document.createElement('i');
+            icon.className = `fas ${icons[result.kind] || 'fa-search'} me-2`;
+            link.appendChild(icon);
+            link.appendChild(document.createTextNode(result.label));
+            item.appendChild(link);
+            this.menu.appendChild(item);
+        });
+        this.menu.classList.add('show');
+    }
+
+    hide() {
+        this.menu.classList.remove('show');
+        this.active = -1;
+    }
+
+    onKeyDown(e) {
+        const items = this.menu.querySelectorAll('.dropdown-item');
+        if (!this.menu.classList.contains('show') || !items.length) {
+            return;
+        }
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            const step = e.key === 'ArrowDown' ? 1 : -1;
+            this.active = (this.active + step + items.length) % items.length;
+            items.forEach((item, i) => item.classList.toggle('active', i === this.active));
+        } else if (e.key === 'Enter' && this.active >= 0) {
+            e.preventDefault();
+            window.location.href = this.results[this.active].url;
+        } else if (e.key === 'Escape') {
+            this.hide();
+        }
+    }
+}
@@ -0,0 +1,133 @@
+class CheckinQueue {
+    constructor(options) {
+        this.form = document.querySelector(options.formSelector);
+        this.input = document.querySelector(options.inputSelector);
+        this.status = document.querySelector(options.statusSelector);
+        this.results = document.querySelector(options.resultsSelector);
+        this.url = options.url;
+        this.csrfToken = options.csrfToken;
+        this.storageKey = options.storageKey;
+        this.batchSize = options.batchSize || 200;
+        this.syncing = false;
+        // Set when the server refuses this scanner; retrying can't help until the page is reopened
+        this.refused = null;
+
+        if (!this.form || !this.input) {
+            return;
+        }
+        this.form.addEventListener('submit', (event) => {
+            event.preventDefault();
+            this.add(this.input.value);
+            this.input.value = '';
+            this.input.focus();
+        });
+        window.addEventListener('online', () => this.sync());
+        this.timer = setInterval(() => this.sync(), options.interval || 5000);
+        this.render();
+        this.sync();
+    }
+
+    load() {
+        try {
+            return JSON.parse(localStorage.getItem(this.storageKey)) || [];
+        } catch (error) {
+            return [];
+        }
+    }
+
+    save(queue) {
+        localStorage.setItem(this.storageKey, JSON.stringify(queue));
+        this.render();
+    }
+
+    add(scanned) {
+        // Scanners read the whole check-in URL; only its token is queued
+        const text = scanned.trim();
+        if (!text) {
+            return;
+        }
+        let token = text;
+        try {
+            token = new URL(text, window.location.origin).searchParams.get('token') || text;
+        } catch (error) {
+            // Not a URL, so it's the bare token
+        }
+        const queue = this.load();
+        queue.push({
+            id: `${Date.now()}-${Math.random().toString(36).slice(2, 8)}`,
+            token: token,
+            scanned_at: new Date().toISOString(),
+        });
+        this.save(queue);
+        this.sync();
+    }
+
+    async sync() {
+        const batch = this.load().slice(0, this.batchSize);
+        if (this.refused || this.syncing || !batch.length || !navigator.onLine) {
+            return;
+        }
+        this.syncing = true;
+        try {
+            const response = await fetch(this.url, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json', 'X-CSRFToken': this.csrfToken},
+                body: JSON.stringify({scans: batch}),
+            });
+            if (response.status === 403) {
+                // The scanner credential expired or is missing; keep the queue for a later sync
+                this.refused = 'This scanner is no longer authorized. Reopen the attendance page to sync the queued scans.';
+                clearInterval(this.timer);
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(`Sync failed with status ${response.status}`);
+            }
+            const data = await response.json();
+            const synced = new Set(batch.map((scan) => scan.id));
+            this.save(this.load().filter((scan) => !synced.has(scan.id)));
+            data.results.forEach((result) => this.show(result));
+        } catch (error) {
+            // Left in the queue for the next attempt
+            console.error('Check-in sync failed:', error);
+        } finally {
+            this.syncing = false;
+            this.render();
+        }
+    }
+
+    show(result) {
+        if (!this.results) {
+            return;
+        }
+        const labels = {
+            checked_in: ['list-group-item-success', 'checked in'],
+            already_checked_in: ['list-group-item-info', 'already checked in'],
+            duplicate: ['list-group-item-info', 'scanned twice'],
+            not_registered: ['list-group-item-warning', 'not registered for this event'],
+            expired: ['list-group-item-danger', 'code expired'],
+            too_early: ['list-group-item-danger', 'scanned before check-in opened'],
+            invalid: ['list-group-item-danger', 'invalid code'],
+        };
+        const [className, label] = labels[result.status] || labels.invalid;
+        const item = document.createElement('li');
+        item.className = `list-group-item ${className}`;
+        item.textContent = `${result.username || 'Unknown code'}: ${label}`;
+        this.results.prepend(item);
+    }
+
+    render() {
+        if (!this.status) {
+            return;
+        }
+        const pending = this.load().length;
+        const waiting = `${pending} scan${pending === 1 ? '' : 's'} waiting to sync`;
+        if (this.refused) {
+            this.status.textContent = `${waiting}. ${this.refused}`;
+            this.status.classList.add('text-danger');
+            return;
+        }
+        const state = navigator.onLine ? (this.syncing ? 'syncing' : 'online') : 'offline';
+        this.status.textContent = `${waiting} (${state})`;
+    }
+}
@@ -0,0 +1,105 @@
+class LiveUpdates {
+    constructor(options) {
+        this.streamUrl = options.streamUrl;
+        this.notificationsUrl = options.notificationsUrl;
+        this.messagesUrl = options.messagesUrl;
+        this.pollInterval = options.pollInterval || 30000;
+        this.pollTimer = null;
+        this.failures = 0;
+
+        this.unreadNotifications = 0;
+        this.unreadMessages = 0;
+
+        // Set once the server has answered the stream with 204 (no ASGI server)
+        this.unsupportedKey = 'liveUpdatesUnsupported';
+
+        if (window.EventSource && !sessionStorage.getItem(this.unsupportedKey)) {
+            this.connect();
+        } else {
+            this.startPolling();
+        }
+    }
+
+    connect() {
+        this.source = new EventSource(this.streamUrl);
+
+        this.source.addEventListener('snapshot', (e) => {
+            const data = JSON.parse(e.data);
+            this.failures = 0;
+            this.unreadNotifications = data.unread_notifications;
+            this.unreadMessages = data.unread_messages;
+            this.render();
+        });
+
+        this.source.addEventListener('notifications', (e) => {
+            this.unreadNotifications = Math.max(0, this.unreadNotifications + JSON.parse(e.data).delta);
+            this.render();
+        });
+
+        this.source.addEventListener('messages', (e) => {
+            this.unreadMessages = Math.max(0, this.unreadMessages + JSON.parse(e.data).delta);
+            this.render();
+        });
+
+        this.source.onerror = () => {
+            if (this.source.readyState === EventSource.CLOSED) {
+                // The server refused the stream (204 under WSGI, or an error status);
+                // the browser won't retry, so poll for the rest of this session
+                sessionStorage.setItem(this.unsupportedKey, '1');
+                this.startPolling();
+                return;
+            }
+            this.failures += 1;
+            // The browser reconnects on its own; give up after repeated failures
+            if (this.failures >= 3) {
+                this.source.close();
+                this.startPolling();
+            }
+        };
+    }
+
+    startPolling() {
+        if (this.pollTimer) {
+            return;
+        }
+        this.poll();
+        this.pollTimer = setInterval(() => this.poll(), this.pollInterval);
+    }
+
+    async poll() {
+        try {
+            const [notifications, messages] = await Promise.all([
+                fetch(this.notificationsUrl).then((r) => r.json()),
+                fetch(this.messagesUrl).then((r) => r.json()),
+            ]);
+            this.unreadNotifications = notifications.unread_count;
+            this.unreadMessages = messages.unread_count;
+            this.render();
+        } catch (error) {
+            console.error('Failed to refresh unread counts:', error);
+        }
+    }
+
+    render() {
+        this.updateBadge('.notification-icon', 'notification-badge', this.unreadNotifications);
+        this.updateBadge('.message-icon', 'message-badge', this.unreadMessages);
+    }
+
+    updateBadge(linkSelector, badgeClass, count) {
+        const link = document.querySelector(linkSelector);
+        if (!link) {
+            return;
+        }
+        let badge = link.querySelector('.' + badgeClass);
+        if (count > 0) {
+            if (!badge) {
+                badge = document.createElement('span');
+                badge.className = badgeClass;
+                link.appendChild(badge);
+            }
+            badge.textContent = count;
+        } else if (badge) {
+            badge.remove();
+        }
+    }
+}